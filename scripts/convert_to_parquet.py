@@ -0,0 +1,46 @@
+"""
+Convert cddb.tsv to Parquet once, so later runs skip parsing the TSV
+
+Usage
+    python scripts/convert_to_parquet.py
+    python scripts/convert_to_parquet.py --output ./data/input/cddb.parquet
+    python scripts/run_clean_cddb.py --input ./data/input/cddb.parquet
+
+The TSV is read and written in chunks of `--chunksize` rows, with every
+column as a string, so the Parquet file reads back to the same frame. Needs
+pyarrow.
+"""
+
+import argparse
+import logging
+import time
+
+from clean_cddb.formats import DEFAULT_CHUNKSIZE, convert_tsv_to_parquet
+
+INPUT_FILEPATH = "./data/input/cddb.tsv.zip"
+OUTPUT_FILEPATH = "./data/input/cddb.parquet"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--input",
+        default=INPUT_FILEPATH,
+        help="Path to cddb.tsv, optionally .zip, .gz or .zst.",
+    )
+    parser.add_argument(
+        "--output", default=OUTPUT_FILEPATH, help="Parquet file to write."
+    )
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(message)s")
+    start = time.perf_counter()
+    n_rows = convert_tsv_to_parquet(args.input, args.output, args.chunksize)
+    logging.info(
+        f"Wrote {n_rows} rows to {args.output} in {time.perf_counter() - start:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,380 @@
+"""
+Benchmark the cleaning pipeline on synthetic CDDB data
+
+The import time of `clean_cddb` (and of building the schema) is timed in
+fresh interpreters. Then, for each size, a synthetic data set is generated with
+`clean_cddb.synthetic.generate_cddb()` and the following are timed:
+- each check in `clean_cddb.checks`, element-wise and vectorized
+- each `clean_df_*` step of the cleaning chain, in order
+- full schema validation with `schema` and `vectorized_schema`, and
+  validation of distinct values with `distinct_failure_cases()`
+- the end-to-end `run_clean_cddb.py` script on the data written to a TSV,
+  including the per-stage times from its run report
+
+Results are saved to `data/output/benchmarks/benchmark_<timestamp>.json` (and
+`.csv`). With `--compare`, the best times are also compared with an earlier
+results file.
+
+Usage
+    python scripts/run_benchmarks.py
+    python scripts/run_benchmarks.py --sizes 10k 100k 1M 10M --repeat 3
+    python scripts/run_benchmarks.py --mojibake-rate 0.05 --short-id-rate 0.2
+    python scripts/run_benchmarks.py --compare data/output/benchmarks/<file>.json
+
+Element-wise checks and validation are skipped above `--max-element-wise-rows`
+and the end-to-end script above `--max-end-to-end-rows`, as they would take
+hours at 10M rows.
+"""
+
+import argparse
+import inspect
+import json
+import logging
+import os
+import shlex
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import pandas as pd
+import pandera as pa
+
+import clean_cddb
+from clean_cddb import checks, vectorized_checks
+from clean_cddb.distinct_validation import distinct_failure_cases
+from clean_cddb.id_index import IdIndex
+from clean_cddb.profiling import StageProfiler, environment
+from clean_cddb.synthetic import generate_cddb
+from clean_cddb.value_cache import DEFAULT_VALUE_CACHE_SIZE, set_value_cache_size
+
+OUTPUT_PATH = "./data/output/benchmarks"
+SCRIPT_PATH = Path(__file__).parent / "run_clean_cddb.py"
+
+DEFAULT_SIZES = ["10k", "100k"]
+DEFAULT_MAX_ELEMENT_WISE_ROWS = 1_000_000
+DEFAULT_MAX_END_TO_END_ROWS = 1_000_000
+
+# Column each check in `clean_cddb.checks` is benchmarked on
+CHECK_COLUMNS = {
+    "check_col_has_valid_characters": "artist",
+    "check_artist_is_valid": "artist",
+    "check_category_is_valid": "category",
+    "check_genre_is_valid": "genre",
+    "check_year_range_is_valid": "year",
+    "check_year_is_numeric": "year",
+    "check_track_has_numeric_prefix": "tracks",
+    "check_id_six_digit_starting_one": "id",
+}
+
+RESULT_KEYS = ["size", "group", "benchmark"]
+
+# Statements timed in a fresh interpreter by `benchmark_startup()`
+STARTUP_STATEMENTS = {
+    "import clean_cddb": "import clean_cddb",
+    "import clean_cddb.checks": "from clean_cddb import checks",
+    "import clean_cddb + build schema": "import clean_cddb; clean_cddb.schema.build()",
+    "import clean_cddb + cleaning steps": (
+        "import clean_cddb; clean_cddb.get_cleaning_steps()"
+    ),
+}
+
+
+def parse_size(size: str) -> int:
+    """Parse sizes like "10k", "1M" or "500"."""
+    multipliers = {"k": 1_000, "m": 1_000_000}
+    suffix = size[-1].lower()
+    if suffix in multipliers:
+        return int(float(size[:-1]) * multipliers[suffix])
+    return int(size)
+
+
+class Benchmarks:
+    """Time benchmarks with a `StageProfiler`, labelling each record."""
+
+    def __init__(self, repeat: int) -> None:
+        self.repeat = repeat
+        self.profiler = StageProfiler()
+
+    def time(
+        self, size: int, group: str, benchmark: str, func: Callable[[], Any]
+    ) -> None:
+        for repeat in range(self.repeat):
+            with self.profiler.stage(benchmark, rows=size) as record:
+                func()
+            record.update(size=size, group=group, benchmark=benchmark, repeat=repeat)
+            logging.info(
+                f"{size} rows | {group} | {benchmark}: "
+                f"{record['wall_seconds']:.3f}s"
+            )
+
+    def results(self) -> pd.DataFrame:
+        return pd.DataFrame(self.profiler.records).drop(columns=["stage", "chunk"])
+
+
+def benchmark_checks(
+    benchmarks: Benchmarks, source_df: pd.DataFrame, element_wise: bool
+) -> None:
+    for check_name, column_name in CHECK_COLUMNS.items():
+        values = source_df[column_name].dropna()
+        if element_wise:
+            check = getattr(checks, check_name)
+            benchmarks.time(
+                len(source_df),
+                "check (element-wise)",
+                check_name,
+                lambda: values.map(check),
+            )
+        vectorized_check = getattr(vectorized_checks, check_name)
+        benchmarks.time(
+            len(source_df),
+            "check (vectorized)",
+            check_name,
+            lambda: vectorized_check(values),
+        )
+
+
+def benchmark_cleaning_steps(benchmarks: Benchmarks, source_df: pd.DataFrame) -> None:
+    ids = IdIndex().update(source_df["id"])
+    for repeat in range(benchmarks.repeat):
+        # Start each repeat with empty value caches
+        set_value_cache_size(DEFAULT_VALUE_CACHE_SIZE)
+        df = source_df
+        for func, kwargs in clean_cddb.get_cleaning_steps(
+            ids=ids, reject_sentinel=True
+        ):
+            with benchmarks.profiler.stage(func.__name__, rows=len(df)) as record:
+                df = func(df, **kwargs)
+            record.update(
+                size=len(source_df),
+                group="cleaning step",
+                benchmark=func.__name__,
+                repeat=repeat,
+            )
+
+
+def benchmark_validation(
+    benchmarks: Benchmarks, source_df: pd.DataFrame, element_wise: bool
+) -> None:
+    schemas = {"vectorized_schema": clean_cddb.vectorized_schema}
+    if element_wise:
+        schemas["schema"] = clean_cddb.schema
+
+    for schema_name, schema in schemas.items():
+
+        def validate(schema: pa.DataFrameSchema = schema) -> None:
+            try:
+                schema(source_df, lazy=True)
+            except pa.errors.SchemaErrors:
+                pass
+
+        benchmarks.time(len(source_df), "validation", schema_name, validate)
+
+    benchmarks.time(
+        len(source_df),
+        "validation",
+        "distinct_failure_cases",
+        lambda: distinct_failure_cases(source_df, clean_cddb.schema),
+    )
+
+
+def benchmark_startup(benchmarks: Benchmarks) -> None:
+    """Time each of `STARTUP_STATEMENTS` in a new Python process."""
+    for benchmark, statement in STARTUP_STATEMENTS.items():
+        code = (
+            "import time; start = time.perf_counter(); "
+            f"{statement}; print(time.perf_counter() - start)"
+        )
+        for repeat in range(benchmarks.repeat):
+            output = subprocess.run(
+                [sys.executable, "-c", code],
+                check=True,
+                capture_output=True,
+                text=True,
+                env={**os.environ, "DISABLE_PANDERA_IMPORT_WARNING": "True"},
+            ).stdout
+            wall_seconds = float(output.split()[-1])
+            benchmarks.profiler.add_record(
+                benchmark,
+                wall_seconds=wall_seconds,
+                size=0,
+                group="startup",
+                benchmark=benchmark,
+                repeat=repeat,
+            )
+            logging.info(f"startup | {benchmark}: {wall_seconds:.3f}s")
+
+
+def benchmark_end_to_end(
+    benchmarks: Benchmarks, source_df: pd.DataFrame, script_args: List[str]
+) -> None:
+    """Run `run_clean_cddb.py` in a scratch directory on `source_df`."""
+    for repeat in range(benchmarks.repeat):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_path = Path(tmp_dir) / "data" / "output"
+            for sub_dir in ["csv", "sqlite_db", "logs"]:
+                (output_path / sub_dir).mkdir(parents=True)
+            input_path = Path(tmp_dir) / "cddb.tsv"
+            source_df.to_csv(input_path, sep="\t", index=False, encoding="latin1")
+
+            command = [sys.executable, str(SCRIPT_PATH.resolve())]
+            command += ["--input", str(input_path), "--no-repair-cache", *script_args]
+            with benchmarks.profiler.stage("run_clean_cddb.py") as record:
+                subprocess.run(
+                    command,
+                    cwd=tmp_dir,
+                    check=True,
+                    env={**os.environ, "DISABLE_PANDERA_IMPORT_WARNING": "True"},
+                )
+            record.update(
+                rows=len(source_df),
+                rows_per_second=len(source_df) / record["wall_seconds"],
+                # Spent in the child process; see the per-stage records instead
+                cpu_seconds=None,
+                size=len(source_df),
+                group="end-to-end",
+                benchmark="run_clean_cddb.py",
+                repeat=repeat,
+            )
+
+            with open(output_path / "logs" / "run_clean_cddb_report.json") as f:
+                run_report = json.load(f)
+            for stage in run_report["summary"]:
+                benchmarks.profiler.add_record(
+                    stage["stage"],
+                    **{
+                        key: stage[key]
+                        for key in ["rows", "wall_seconds", "cpu_seconds"]
+                        + ["rows_per_second", "max_rss_bytes"]
+                    },
+                    size=len(source_df),
+                    group="end-to-end stage",
+                    benchmark=stage["stage"],
+                    repeat=repeat,
+                )
+
+
+def best_times(results: pd.DataFrame) -> pd.DataFrame:
+    """Fastest repeat of each benchmark."""
+    return results.groupby(RESULT_KEYS, as_index=False, sort=False).agg(
+        wall_seconds=("wall_seconds", "min"),
+        cpu_seconds=("cpu_seconds", "min"),
+        rows_per_second=("rows_per_second", "max"),
+    )
+
+
+def compare_results(results: pd.DataFrame, baseline: pd.DataFrame) -> pd.DataFrame:
+    """Best wall times against a baseline run; ratio > 1 means slower now."""
+    comparison = best_times(results).merge(
+        best_times(baseline)[RESULT_KEYS + ["wall_seconds"]],
+        on=RESULT_KEYS,
+        how="left",
+        suffixes=("", "_baseline"),
+    )
+    comparison["ratio"] = (
+        comparison["wall_seconds"] / comparison["wall_seconds_baseline"]
+    )
+    return comparison[RESULT_KEYS + ["wall_seconds_baseline", "wall_seconds", "ratio"]]
+
+
+def load_results(path: str) -> pd.DataFrame:
+    with open(path) as f:
+        return pd.DataFrame(json.load(f)["results"])
+
+
+def save_results(
+    results: pd.DataFrame, metadata: Dict[str, Any], output_path: str
+) -> str:
+    Path(output_path).mkdir(parents=True, exist_ok=True)
+    stem = Path(output_path) / f"benchmark_{datetime.now():%Y%m%d-%H%M%S}"
+    report = {
+        "metadata": metadata,
+        "results": json.loads(results.to_json(orient="records")),
+    }
+    with open(f"{stem}.json", "w") as f:
+        json.dump(report, f, indent=2, default=str)
+    results.to_csv(f"{stem}.csv", index=False)
+    return f"{stem}.json"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        default=DEFAULT_SIZES,
+        help="Rows per synthetic data set, e.g. 10k 100k 1M 10M.",
+    )
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per benchmark.")
+    parser.add_argument("--seed", type=int, default=0)
+    # One option per rate of `generate_cddb()`, e.g. `--mojibake-rate`
+    rate_names: List[str] = []
+    for name, param in inspect.signature(generate_cddb).parameters.items():
+        if name.endswith("_rate"):
+            rate_names.append(name)
+            parser.add_argument(
+                f"--{name.replace('_', '-')}", type=float, default=param.default
+            )
+    parser.add_argument(
+        "--max-element-wise-rows",
+        type=int,
+        default=DEFAULT_MAX_ELEMENT_WISE_ROWS,
+        help="Skip element-wise checks and validation on larger data sets.",
+    )
+    parser.add_argument(
+        "--max-end-to-end-rows",
+        type=int,
+        default=DEFAULT_MAX_END_TO_END_ROWS,
+        help="Skip the end-to-end script on larger data sets.",
+    )
+    parser.add_argument(
+        "--script-args",
+        default="",
+        help='Extra arguments for run_clean_cddb.py, e.g. "--workers 4".',
+    )
+    parser.add_argument("--output", default=OUTPUT_PATH, help="Results directory.")
+    parser.add_argument(
+        "--compare", default=None, help="Earlier results file to compare with."
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(message)s")
+    pd.set_option("display.width", None)
+
+    rates: Dict[str, Any] = {name: getattr(args, name) for name in rate_names}
+    benchmarks = Benchmarks(args.repeat)
+    benchmark_startup(benchmarks)
+    for size in [parse_size(size) for size in args.sizes]:
+        logging.info(f"Generating {size} rows...")
+        with benchmarks.profiler.stage("generate_cddb", rows=size) as record:
+            source_df = generate_cddb(size, seed=args.seed, **rates)
+        record.update(size=size, group="setup", benchmark="generate_cddb", repeat=0)
+
+        element_wise = size <= args.max_element_wise_rows
+        benchmark_checks(benchmarks, source_df, element_wise)
+        benchmark_cleaning_steps(benchmarks, source_df)
+        benchmark_validation(benchmarks, source_df, element_wise)
+        if size <= args.max_end_to_end_rows:
+            benchmark_end_to_end(benchmarks, source_df, shlex.split(args.script_args))
+
+    results = benchmarks.results()
+    metadata = {
+        "started_at": benchmarks.profiler.started_at.isoformat(),
+        "argv": sys.argv[1:],
+        **environment(),
+        **vars(args),
+    }
+    results_path = save_results(results, metadata, args.output)
+    logging.info(f"Wrote: {results_path}")
+
+    if args.compare is None:
+        summary = best_times(results)
+    else:
+        summary = compare_results(results, load_results(args.compare))
+    print(summary.to_markdown(index=False, floatfmt=".3f"))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,292 +4,1505 @@ High-level steps
 - Apply cleaning transformations
 - Output album- and track-level data sets
 - Compare before/after cleaning with summary and detailed examples
+
+Usage
+    python scripts/run_clean_cddb.py
+    python scripts/run_clean_cddb.py --chunksize 100000
+    python scripts/run_clean_cddb.py --workers 4
+    python scripts/run_clean_cddb.py --no-repair-cache
+    python scripts/run_clean_cddb.py --incremental
+    python scripts/run_clean_cddb.py --trace-memory --profile-stages ./profiles
+    python scripts/run_clean_cddb.py --full-compare
+    python scripts/run_clean_cddb.py --compact
+    python scripts/run_clean_cddb.py --preflight --max-failure-rate 0.05
+    python scripts/run_clean_cddb.py --full-validation
+    python scripts/run_clean_cddb.py --chunksize 100000 --overlap-io
+    python scripts/run_clean_cddb.py --canonicalize-artists
+    python scripts/run_clean_cddb.py --duplicates collapse
+    python scripts/run_clean_cddb.py --input ./data/input/cddb.parquet --parquet
+
+With `--chunksize`, the TSV is read, validated, cleaned and exported one chunk
+at a time so peak memory is bounded by the chunk size. The id collision check
+in `clean_df_id_format` uses a global pre-pass over the "id" column, so both
+modes produce the same rows.
+
+With `--incremental`, only rows whose album id is new or whose contents
+changed since the last run are validated and cleaned; their rows in the
+SQLite tables are replaced and the summary tables recomputed. Row hashes of
+each run are kept in the `row_hashes` table. CSVs of row-level tables are
+only written by full runs.
+
+Each run writes a report of the wall time, CPU time, rows/sec and peak
+memory of every stage to `data/output/logs/run_clean_cddb_report.json` (and
+`.csv`). `--trace-memory` adds per-stage allocations from tracemalloc and
+`--profile-stages DIR` saves cProfile stats of each stage.
+
+With `--workers`, the cleaning chain runs on row partitions in a process pool
+and a per-step speedup report is logged; the output matches a serial run.
+
+The input is read from `data/input/cddb.tsv.zip` by default, decompressing
+it on the fly; `--input` also takes the extracted TSV (memory-mapped), a
+`.gz` or `.zst` TSV, or a Parquet or Arrow IPC copy of it (see
+`scripts/convert_to_parquet.py`). `--parquet` also writes the cleaned albums,
+tracks and failure cases as Parquet datasets under `data/output/parquet/`;
+these need pyarrow.
+
+SQLite tables are loaded in one transaction per export with bulk-load
+pragmas, and the row keys and join keys are indexed afterwards. The rows
+and load time of each table are appended to the `export_log` table.
+
+Failure cases are exported normalized: the `failure_checks` table holds the
+name and source code of each check once, and the failure-case tables refer
+to it by `check_id` (the `before_cleaning_failure_cases` and
+`after_cleaning_failure_cases` views join them back). The summary tables
+and `before_cleaning_failure_cases_summary_table.txt` are computed with
+aggregate queries over the exported failure cases.
+
+The cleaning chain runs as a `clean_cddb.pipeline.Pipeline`: consecutive
+steps that only transform the values of their columns are fused into one
+stage, and the plan is logged. The changes of each stage are logged by
+comparing only the columns the stage may change. `--full-compare` uses
+`DataFrame.compare` on the whole frame instead.
+
+With `--compact`, the artist, category and genre columns are cleaned as
+categoricals and the year as a small integer, which takes less memory; the
+memory use of each column before and after is logged. Outputs are the same.
+
+Each column is validated on its distinct values only, and the failure cases
+expanded back to the rows holding them; they are the same as with
+`--full-validation`, which has pandera validate every row, but ordered by
+column, check and row.
+
+With `--preflight`, only a stratified sample of `--sample-size` rows is
+validated, and the failure cases of the whole source are estimated with
+confidence intervals (written to `preflight_failure_estimates.csv`). The
+source is validated in full, and the summary table written, only if an
+estimated failure rate crosses `--max-failure-rate` (or the column's
+`--column-max-failure-rate`). Nothing is cleaned or exported.
+
+With `--overlap-io`, the next chunk is read in a background thread while the
+current one is validated and cleaned, and the CSV and Parquet files and the
+summary table are written by a bounded pool of `--write-workers` threads
+while the SQLite tables load and the next chunk is processed. Outputs are
+the same. The gain is bounded by the GIL: it is largest in whole-file runs,
+where the files are written while SQLite loads, and small in chunked runs,
+where writing CSV competes with cleaning. A range for the wall time saved
+is estimated and logged (see `clean_cddb.overlap`); to measure it, run
+`run_benchmarks.py --script-args "--overlap-io"` and `--compare` with a
+serial benchmark.
+
+With `--canonicalize-artists`, every spelling of an artist that differs only
+in case, accents or whitespace is cleaned to the most frequent valid
+spelling, before invalid artists are rejected (see `clean_cddb.artist_index`).
+Invalid spellings that are a close n-gram match (`--artist-similarity`) of a
+valid one with at least twice their rows are also cleaned to it, and so are
+valid spellings that are a very close match of one with at least three times
+their rows ("Presley Elvis" to "Elvis Presley").
+The index of spellings is built from every row first, so chunked and
+whole-file runs clean the same way; the changed spellings are exported as
+the `artist_mapping` table. It can't be combined with `--incremental`.
+
+With `--duplicates find`, albums submitted more than once under different
+ids are found by MinHash fingerprints of their tracks, artist and title,
+bucketed by locality-sensitive hashing and confirmed by their exact Jaccard
+similarity (`--duplicate-similarity`); see `clean_cddb.duplicates`. The
+clusters are exported as the `duplicate_clusters` table. `--duplicates
+collapse` also rejects every album of a cluster but its representative, as
+the last cleaning step; albums rejected by other steps are not picked as
+representatives. Albums are fingerprinted from every source row first, and
+those in a cluster cleaned, so chunked and whole-file runs find the same
+clusters and representatives. It can't be combined with `--incremental`.
+
+ftfy repairs of the "artist" column are cached across runs in a SQLite file
+(`--repair-cache`). The cache is cleared automatically when the ftfy version
+or the character rules change.
 """
 
+import argparse
+import functools
 import logging
 import sqlite3
+import sys
+from concurrent.futures import Executor, ProcessPoolExecutor
 from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 import pandera as pa
 
 import clean_cddb
+from clean_cddb import tracks
+from clean_cddb.artist_index import DEFAULT_SIMILARITY, MAPPING_TABLE, ArtistIndex
+from clean_cddb.compact import compact_frame, expand_frame, memory_report
+from clean_cddb.distinct_validation import distinct_failure_cases
+from clean_cddb.duplicates import DEFAULT_JACCARD, DUPLICATES_TABLE, DuplicateIndex
+from clean_cddb.failure_store import (
+    CHECKS_TABLE,
+    CheckDictionary,
+    create_view,
+    failure_counts,
+    normalize,
+)
+from clean_cddb.formats import (
+    read_source,
+    require_pyarrow,
+    source_format,
+    write_parquet_chunk,
+)
+from clean_cddb.id_index import IdIndex
+from clean_cddb.incremental import (
+    CHANGED,
+    DELETED,
+    NEW,
+    ROW_HASHES_TABLE,
+    UNCHANGED,
+    delete_rows,
+    diff_row_hashes,
+    drop_row_hashes,
+    hash_rows,
+    insert_df,
+    load_row_hashes,
+    lookup_rows,
+    move_rows,
+    save_row_hashes,
+)
+from clean_cddb.overlap import (
+    DEFAULT_WRITE_WORKERS,
+    BackgroundWriter,
+    OverlapReport,
+    prefetch,
+)
+from clean_cddb.parallel import run_steps_parallel
+from clean_cddb.profiling import StageProfiler
+from clean_cddb.repair_cache import RepairCache
+from clean_cddb.sampled_validation import (
+    DEFAULT_MAX_FAILURE_RATE,
+    DEFAULT_SAMPLE_SIZE,
+    crossed_thresholds,
+    estimate_failures,
+)
+from clean_cddb.sqlite_export import (
+    connect,
+    create_indexes,
+    ensure_index,
+    export_tables,
+    transaction,
+    write_table,
+)
+from clean_cddb.streaming import (
+    ColumnFailureCases,
+    collect_artists,
+    collect_duplicates,
+    collect_ids,
+    read_rows,
+    read_source_chunks,
+    write_csv_chunk,
+)
 from clean_cddb.utils import (
-    get_check_func_descriptions,
     get_failure_cases_summary_as_formatted_table,
+    get_fired_rules,
     log_df_change,
 )
+from clean_cddb.value_cache import (
+    DEFAULT_VALUE_CACHE_SIZE,
+    set_value_cache_size,
+    value_cache_info,
+)
 
+INPUT_FILEPATH = "./data/input/cddb.tsv.zip"
+OUTPUT_PATH = "./data/output"
+CSV_PATH = f"{OUTPUT_PATH}/csv"
+SQLITE_PATH = f"{OUTPUT_PATH}/sqlite_db"
+PARQUET_PATH = f"{OUTPUT_PATH}/parquet"
+SUMMARY_TABLE_PATH = f"{OUTPUT_PATH}/before_cleaning_failure_cases_summary_table.txt"
+REPAIR_CACHE_PATH = f"{OUTPUT_PATH}/cache/ftfy_repairs.sqlite"
+PREFLIGHT_ESTIMATES_PATH = f"{CSV_PATH}/preflight_failure_estimates.csv"
 
-def df_to_var(df: pd.DataFrame, var_name: str) -> pd.DataFrame:
-    globals()[var_name] = df
-    return df
+COLUMNS_TO_COMPARE = ["artist", "category", "genre", "title", "tracks", "year", "id"]
 
+# Row-level output tables and the column holding the source row position
+ROW_KEYED_TABLES = {
+    "source_df": "index",
+    "before_cleaning_failure_cases_df": "index",
+    "clean_df": "index",
+    "id_remap_report": "row_id",
+    "after_cleaning_failure_cases_df": "index",
+    "comps_df": "index",
+    "comps_df_formatted": "row_id",
+}
 
-pd.set_option("display.max_rows", 1000)
-pd.set_option("display.max_columns", None)
-pd.set_option("display.max_colwidth", None)
+# Normalized failure-case tables, and their views joined with the checks
+FAILURE_VIEWS = {
+    "before_cleaning_failure_cases_df": "before_cleaning_failure_cases",
+    "after_cleaning_failure_cases_df": "after_cleaning_failure_cases",
+}
 
-# Setup logging
-log_out_path = "./data/output/logs"
-Path(log_out_path).mkdir(exist_ok=True)
-module_name = Path(__file__).name.replace(".py", "")
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(process)d - %(levelname)s - %(message)s",
-    filename=f"{log_out_path}/{module_name}.log",
-    filemode="w",
-)
+# Indexed after export: row keys, and the join keys of scripts/sql/*.sql and
+# of the failure-case store
+SQL_INDEXES = [
+    *ROW_KEYED_TABLES.items(),
+    ("clean_df", "id"),
+    ("track_level_df", "album_row_id"),
+    *((df_name, "check_id") for df_name in FAILURE_VIEWS),
+    (CHECKS_TABLE, "column"),
+    (CHECKS_TABLE, "check"),
+]
 
-#######################
-# Import data
-#######################
+# Frames written as Parquet datasets with `--parquet`, and how
+PARQUET_TABLES: Dict[str, Dict[str, Any]] = {
+    "clean_df": {"partition_cols": ["category"], "index": True},
+    "before_cleaning_failure_cases_df": {"partition_cols": ["check_id"]},
+    "after_cleaning_failure_cases_df": {"partition_cols": ["check_id"]},
+    "track_level_df": {},
+}
+
+
+# Records the wall time, CPU time and memory of each stage; see `main()`
+profiler = StageProfiler()
 
-logging.info("Reading cddb.tsv...")
-filepath = "./data/input/cddb.tsv"
-source_df = pd.read_csv(filepath, sep="\t", dtype="str", encoding="latin1")
 
 #######################
-# Validation: source_df
+# Validation
 #######################
 
-logging.info("Validating source_df...")
-try:
-    validated_df = clean_cddb.schema(source_df, lazy=True)
-    logging.info("Validation success. No failure cases detected.")
-except pa.errors.SchemaErrors as err:
-    logging.info("Validation failure. Failure cases detected.")
-    logging.debug(err)
-    before_cleaning_failure_cases_df = err.failure_cases
-
-logging.info("Reporting on failure cases for source_df...")
-before_cleaning_failure_cases_df = before_cleaning_failure_cases_df.pipe(
-    get_check_func_descriptions, clean_cddb.schema
-)
 
-before_cleaning_failure_cases_summary = (
-    before_cleaning_failure_cases_df.groupby(["column", "check"], as_index=False)
-    .size()
-    .sort_values(by=["column", "check"])
-    .rename(columns={"size": "counts"})
-)
+def validate(df: pd.DataFrame, df_name: str, full: bool = False) -> pd.DataFrame:
+    """Apply the schema and return failure cases with the rules they broke.
+
+    Each column is validated on its distinct values and the failure cases
+    expanded back to rows (see `clean_cddb.distinct_validation`); with
+    `full`, pandera validates every row. The "rule" column names the rule of
+    `clean_cddb.rules` that each failure case broke, if any. Check source
+    code is kept once per check, in the check dictionary (see
+    `clean_cddb.failure_store`).
+    """
+    logging.info(f"Validating {df_name}...")
+    failure_cases_df = pd.DataFrame(
+        columns=["schema_context", "column", "check", "check_number"]
+        + ["failure_case", "index"]
+    )
+    with profiler.stage(f"validate {df_name}", rows=len(df)):
+        if full:
+            try:
+                clean_cddb.schema(df, lazy=True)
+            except pa.errors.SchemaErrors as err:
+                logging.debug(err)
+                failure_cases_df = err.failure_cases
+        else:
+            failure_cases_df = distinct_failure_cases(df, clean_cddb.schema)
+        if failure_cases_df.empty:
+            logging.info("Validation success. No failure cases detected.")
+        else:
+            logging.info("Validation failure. Failure cases detected.")
+
+        logging.info(f"Reporting on failure cases for {df_name}...")
+        return get_fired_rules(failure_cases_df)
+
+
+def preflight(
+    filepath: str,
+    sample_size: int = DEFAULT_SAMPLE_SIZE,
+    max_failure_rate: float = DEFAULT_MAX_FAILURE_RATE,
+    thresholds: Optional[Dict[str, float]] = None,
+    full_validation: bool = False,
+) -> None:
+    """Estimate the source's failure cases from a stratified sample.
+
+    The source is only validated in full (and the summary table written)
+    if an estimated failure rate crosses its column's threshold.
+    """
+    logging.info(f"Reading {filepath}...")
+    with profiler.stage("read") as record:
+        source_df = read_source(filepath)
+        record["rows"] = len(source_df)
+
+    logging.info(f"Estimating failure cases from {sample_size} sampled rows...")
+    with profiler.stage("estimate failures source_df", rows=len(source_df)):
+        estimates = estimate_failures(
+            source_df, clean_cddb.schema, sample_size=sample_size
+        )
+    logging.info(
+        "Estimated failure cases of source_df:\n"
+        f"{estimates.to_markdown(index=False, floatfmt='.4f')}"
+    )
+    estimates.to_csv(PREFLIGHT_ESTIMATES_PATH, index=False)
+    logging.info(f"Wrote: {PREFLIGHT_ESTIMATES_PATH}")
+
+    crossed = crossed_thresholds(estimates, max_failure_rate, thresholds)
+    if crossed.empty:
+        logging.info("No failure rate crosses its threshold. Skipping validation.")
+        return
+    logging.info(
+        "Failure rates crossing their thresholds:\n"
+        f"{crossed[['column', 'check', 'failure_rate']].to_markdown(index=False)}"
+    )
+    checks = CheckDictionary.from_schema(clean_cddb.schema)
+    failure_cases_df = normalize(
+        validate(source_df, "source_df", full=full_validation), checks
+    )
+    # Nothing is exported, so the summary is queried from an in-memory store
+    conn = sqlite3.connect(":memory:")
+    with transaction(conn):
+        write_table(conn, "before_cleaning_failure_cases_df", failure_cases_df)
+        write_table(conn, CHECKS_TABLE, checks.to_frame())
+    write_summary_table(conn)
+    conn.close()
 
-before_cleaning_failure_cases_summary_table = (
-    get_failure_cases_summary_as_formatted_table(before_cleaning_failure_cases_df)
-)
 
 #######################
 # Cleaning
 #######################
 
-clean_df_before_drops = pd.DataFrame()
-_df_before = pd.DataFrame()
-
-logging.info("Applying cleaning operations...")
-
-clean_df = (
-    source_df.pipe(df_to_var, "_df_before")
-    .pipe(clean_cddb.clean_df_standardize_various_artists)
-    .pipe(
-        log_df_change,
-        before_df=_df_before,
-        operation_label="Cleaning with 'clean_cddb.clean_df_try_to_fix_encoding_errors' procedure",  # noqa
-    )
-    .pipe(df_to_var, "_df_before")
-    .pipe(clean_cddb.clean_df_try_to_fix_encoding_errors, "artist")
-    .pipe(
-        log_df_change,
-        before_df=_df_before,
-        operation_label="Cleaning with 'clean_cddb.clean_df_try_to_fix_encoding_errors' procedure",  # noqa
-    )
-    .pipe(df_to_var, "_df_before")
-    .pipe(clean_cddb.clean_df_invalid_symbols)
-    .pipe(
-        log_df_change,
-        before_df=_df_before,
-        operation_label="Cleaning with 'clean_cddb.clean_df_invalid_symbols' procedure",
-    )
-    .pipe(df_to_var, "_df_before")
-    .pipe(clean_cddb.clean_df_invalid_categories)
-    .pipe(
-        log_df_change,
-        before_df=_df_before,
-        operation_label="Cleaning with 'clean_cddb.clean_df_invalid_categories' procedure",  # noqa
-    )
-    .pipe(df_to_var, "_df_before")
-    .pipe(clean_cddb.clean_df_id_zero_padding)
-    .pipe(
-        log_df_change,
-        before_df=_df_before,
-        operation_label="Cleaning with 'clean_cddb.clean_df_id_zero_padding' procedure",
-    )
-    .pipe(df_to_var, "_df_before")
-    .pipe(clean_cddb.clean_df_genre_invalid)
-    .pipe(
-        log_df_change,
-        before_df=_df_before,
-        operation_label="Cleaning with 'clean_cddb.clean_df_genre_invalid' procedure",
-    )
-    .pipe(df_to_var, "_df_before")
-    .pipe(clean_cddb.clean_df_year)
-    .pipe(
-        log_df_change,
-        before_df=_df_before,
-        operation_label="Cleaning with 'clean_cddb.clean_df_year' procedure",
-    )
-    .pipe(df_to_var, "_df_before")
-    .pipe(clean_cddb.clean_df_title)
-    .pipe(
-        log_df_change,
-        before_df=_df_before,
-        operation_label="Cleaning with 'clean_cddb.clean_df_title' procedure",
-    )
-    .pipe(df_to_var, "_df_before")
-    .pipe(clean_cddb.clean_df_genre_coalesce_with_category)
-    .pipe(
-        log_df_change,
-        before_df=_df_before,
-        operation_label="Cleaning with 'clean_cddb.clean_df_genre_coalesce_with_category' procedure",  # noqa
-    )
-    # Save an intermediate dataframe prior to dropping records
-    # so we can compare with source_df later
-    .pipe(df_to_var, "clean_df_before_drops")
-    # Drop rows with "REJECT_ROW*" prefix
-    .query("~id.str.contains('REJECT_ROW')")
-    .drop(columns=["merged_values"])
-)
 
-#######################
-# Validation: clean_df
-#######################
+def clean(
+    source_df: pd.DataFrame,
+    ids: Optional[IdIndex] = None,
+    workers: int = 1,
+    executor: Optional[Executor] = None,
+    repair_cache: Optional[RepairCache] = None,
+    full_compare: bool = False,
+    compact: bool = False,
+    artist_index: Optional[ArtistIndex] = None,
+    duplicates: Optional[DuplicateIndex] = None,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Apply the cleaning operations.
 
-logging.info("Validating clean_df...")
-# apply schema to clean_df
-try:
-    validated_df = clean_cddb.schema(clean_df, lazy=True)
-    logging.info("Validation success. No failure cases detected.")
-except pa.errors.SchemaErrors as err:
-    logging.info("Validation failure. Failure cases detected.")
-    logging.debug(err)
-    after_cleaning_failure_cases_df = err.failure_cases
-
-logging.info("Reporting on failure cases for clean_df...")
-after_cleaning_failure_cases_df = after_cleaning_failure_cases_df.pipe(
-    get_check_func_descriptions, clean_cddb.schema
-)
+    With `workers` > 1, the chain runs on partitions of `source_df` in a
+    process pool (`executor`, if given) and per-step changes are not logged.
+    Otherwise, see `clean_serial` for `full_compare`. With `artist_index`,
+    artists are canonicalized; with `duplicates`, duplicate albums rejected.
+
+    With `compact`, the chain runs on categorical text columns and a small
+    integer year (see `clean_cddb.compact`) and the memory saved is logged;
+    the returned frames have the usual dtypes.
+
+    Rejected rows are marked with "REJECT_ROW" sentinels, which the
+    before-vs-after comps report on.
+
+    Returns the cleaned frame before and after dropping rejected rows.
+    """
+    logging.info("Applying cleaning operations...")
+
+    if compact:
+        with profiler.stage("compact frame", rows=len(source_df)):
+            compact_df = compact_frame(source_df)
+        logging.info(
+            "Memory use of the compacted frame:\n"
+            f"{memory_report(source_df, compact_df).to_markdown(index=False)}"
+        )
+        source_df = compact_df
+
+    if workers > 1:
+        with profiler.stage("run_steps_parallel", rows=len(source_df)):
+            clean_df_before_drops, speedup_report = run_steps_parallel(
+                source_df,
+                clean_cddb.get_cleaning_pipeline(
+                    ids=ids,
+                    reject_sentinel=True,
+                    repair_cache=repair_cache,
+                    artist_index=artist_index,
+                    duplicates=duplicates,
+                ).steps(),
+                workers=workers,
+                executor=executor,
+            )
+        # CPU time of each step, summed over the workers
+        for step, cpu_seconds in speedup_report.iloc[:-1][
+            ["step", "cpu_seconds"]
+        ].values:
+            profiler.add_record(
+                f"{step} (workers)", rows=len(source_df), cpu_seconds=cpu_seconds
+            )
+        logging.info(
+            f"Parallel cleaning with {workers} workers:\n"
+            f"{speedup_report.to_markdown(index=False)}"
+        )
+    else:
+        clean_df_before_drops = clean_serial(
+            source_df,
+            ids=ids,
+            repair_cache=repair_cache,
+            full_compare=full_compare,
+            artist_index=artist_index,
+            duplicates=duplicates,
+        )
+
+    with profiler.stage("drop rejected rows", rows=len(clean_df_before_drops)):
+        clean_df = (
+            clean_df_before_drops
+            # Drop rows with "REJECT_ROW*" prefix
+            .query("~id.str.contains('REJECT_ROW')").drop(columns=["merged_values"])
+        )
+    if compact:
+        with profiler.stage("expand frame", rows=len(clean_df_before_drops)):
+            clean_df_before_drops = expand_frame(clean_df_before_drops)
+            clean_df = expand_frame(clean_df)
+    return clean_df_before_drops, clean_df
+
+
+def clean_serial(
+    source_df: pd.DataFrame,
+    ids: Optional[IdIndex] = None,
+    repair_cache: Optional[RepairCache] = None,
+    full_compare: bool = False,
+    artist_index: Optional[ArtistIndex] = None,
+    duplicates: Optional[DuplicateIndex] = None,
+) -> pd.DataFrame:
+    """Apply the cleaning pipeline in order, logging the changes of each stage.
+
+    Consecutive column-local steps run fused, as one stage (see
+    `clean_cddb.pipeline`). Changes are found by comparing only the columns
+    each stage may change; with `full_compare`, by `DataFrame.compare` on
+    the whole frame.
+    """
+    pipeline = clean_cddb.get_cleaning_pipeline(
+        ids=ids,
+        reject_sentinel=True,
+        repair_cache=repair_cache,
+        artist_index=artist_index,
+        duplicates=duplicates,
+    )
+    logging.info(
+        "Cleaning pipeline:\n" f"{pipeline.describe().to_markdown(index=False)}"
+    )
+    df = source_df
+    for stage in pipeline.plan():
+        before_df = df
+        df = profiler.wrap(stage, stage.name)(df)
+        profiler.wrap(log_df_change)(
+            df,
+            before_df=before_df,
+            operation_label=f"Cleaning with 'clean_cddb.{stage.name}' procedure",
+            columns=stage.changed_columns(),
+            full_compare=full_compare,
+        )
+    return df
+
+
+def log_artist_index(artist_index: ArtistIndex) -> None:
+    logging.info(
+        f"Canonical forms of {len(artist_index)} artist spellings:\n"
+        f"{artist_index.summary().to_markdown(index=False)}"
+    )
+
+
+def index_artists(
+    source_df: pd.DataFrame,
+    repair_cache: Optional[RepairCache] = None,
+    similarity: float = DEFAULT_SIMILARITY,
+) -> ArtistIndex:
+    """The `ArtistIndex` of the artists, as the cleaning chain sees them."""
+    with profiler.stage("index artists", rows=len(source_df)):
+        artist_index = (
+            ArtistIndex(similarity=similarity)
+            .update(clean_cddb.prepare_artists(source_df["artist"], repair_cache))
+            .build()
+        )
+    log_artist_index(artist_index)
+    return artist_index
+
+
+def log_duplicates(duplicates: DuplicateIndex) -> None:
+    logging.info(
+        f"Duplicate albums among {len(duplicates)} fingerprinted albums:\n"
+        f"{duplicates.summary().to_markdown(index=False)}"
+    )
+
+
+def find_duplicates(
+    source_df: pd.DataFrame,
+    similarity: float = DEFAULT_JACCARD,
+    ids: Optional[IdIndex] = None,
+    artist_index: Optional[ArtistIndex] = None,
+) -> DuplicateIndex:
+    """The `DuplicateIndex` of the source albums.
+
+    Albums the cleaning chain rejects are not picked as representatives.
+    """
+    with profiler.stage("find duplicates", rows=len(source_df)):
+        duplicates = clean_cddb.exclude_rejected_albums(
+            DuplicateIndex.from_albums(source_df, similarity=similarity),
+            source_df,
+            ids=ids,
+            artist_index=artist_index,
+        )
+    log_duplicates(duplicates)
+    return duplicates
+
+
+def report_id_remap(
+    source_df: pd.DataFrame, clean_df: pd.DataFrame, ids: IdIndex
+) -> pd.DataFrame:
+    """Short ids of the rows in `clean_df`, remapped or skipped on collision."""
+    return (
+        ids.remap(source_df.loc[clean_df.index, "id"])
+        .rename_axis("row_id")
+        .reset_index()
+    )
 
-after_cleaning_failure_cases_summary = (
-    after_cleaning_failure_cases_df.groupby(["column", "check"], as_index=False)
-    .size()
-    .sort_values(by=["column", "check"])
-    .rename(columns={"size": "counts"})
-)
 
 #######################
 # Evaluation
 #######################
 
-logging.info("Creating evaluation summary of before-vs-after cleaning...")
-evaluation_summary_df = before_cleaning_failure_cases_summary.merge(
-    after_cleaning_failure_cases_summary,
-    on=["column", "check"],
-    how="outer",
-    suffixes=["_before_cleaning", "_after_cleaning"],
-).fillna("")
-
-logging.info("Creating detailed row-level comps of before-vs-after cleaning...")
-comps_df: pd.DataFrame = (
-    source_df.compare(
-        clean_df_before_drops,  # type: ignore [arg-type]
-        result_names=("before_cleaning", "after_cleaning"),
-    )
-    .astype("object")  # type: ignore [arg-type]
-    .fillna("")
-)
 
-columns_to_compare = ["artist", "category", "genre", "title", "tracks", "year", "id"]
-comps_df_formatted = (
-    comps_df.astype(str)
-    .stack()
-    .reset_index()
-    .rename(columns={"level_0": "row_id", "level_1": "before_or_after"})
-    .drop(columns=["merged_values"])
-    .groupby(["row_id"], as_index=False)[columns_to_compare]
-    .agg(lambda row: "  =>  ".join(row))
-    .replace("^(  =>  )$", "", regex=True)
-)
+def evaluate(
+    before_cleaning_failure_cases_summary: pd.DataFrame,
+    after_cleaning_failure_cases_summary: pd.DataFrame,
+) -> pd.DataFrame:
+    logging.info("Creating evaluation summary of before-vs-after cleaning...")
+    return before_cleaning_failure_cases_summary.merge(
+        after_cleaning_failure_cases_summary,
+        on=["column", "check"],
+        how="outer",
+        suffixes=["_before_cleaning", "_after_cleaning"],
+    ).fillna("")
+
+
+@profiler.wrap
+def compare(
+    source_df: pd.DataFrame, clean_df_before_drops: pd.DataFrame
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Detailed row-level comps of before-vs-after cleaning."""
+    logging.info("Creating detailed row-level comps of before-vs-after cleaning...")
+    comps_df: pd.DataFrame = (
+        source_df.compare(
+            clean_df_before_drops,
+            result_names=("before_cleaning", "after_cleaning"),
+        )
+        .astype("object")
+        .fillna("")
+    )
+    # Keep the same columns for every chunk, even if a column has no changes
+    comps_df = comps_df.reindex(
+        columns=pd.MultiIndex.from_product(
+            [source_df.columns, ["before_cleaning", "after_cleaning"]]
+        ),
+        fill_value="",
+    )
+
+    comps_df_formatted = (
+        comps_df.astype(str)
+        .stack()
+        .reset_index()
+        .rename(columns={"level_0": "row_id", "level_1": "before_or_after"})
+        .drop(columns=["merged_values"])
+        .groupby(["row_id"], as_index=False)[COLUMNS_TO_COMPARE]
+        .agg(lambda row: "  =>  ".join(row))
+        .replace("^(  =>  )$", "", regex=True)
+    )
+    return comps_df, comps_df_formatted
+
 
 ################################
 # Transform to track-level data
 ################################
 
-track_level_df = (
-    # Start with original dataframe
-    clean_df
-    # Split 'tracks' on pipe into an array; we can "explode" it later
-    .pipe(lambda _df: _df.assign(tracks=_df["tracks"].str.split("|")))
-    # "explode"/expand from "tracks" array in to 1 observation per track
-    # perform a self-join to CD data set; the CD-level data will repeat for each track
-    .pipe(
-        lambda _df: _df.merge(
-            _df["tracks"].explode(), left_index=True, right_index=True
-        )
-    )
-    .pipe(df_to_var, "df_after_explode")
-    # Make new 'tracks' field; strip ' ' empty space track names to '' empty string
-    .pipe(lambda _df: _df.assign(tracks=_df["tracks_y"].str.strip()))
-    # Don't need these fields anymore
-    .drop(columns=["tracks_x", "tracks_y"])
-    # Filter out empty string track names
-    .query("tracks!=''")
-    .pipe(df_to_var, "df_after_empty_track_name_filter")
-    .reset_index(drop=True)
-    .loc[:, ["id", "tracks"]]
-    .reset_index()
-    .rename(
-        columns={
-            "id": "album_row_id",
-            "index": "track_id",
-            "tracks": "track_name",
-        }
-    )
-)
+
+@profiler.wrap
+def to_track_level(clean_df: pd.DataFrame, track_id_offset: int = 0) -> pd.DataFrame:
+    # One row per track, with the album's id but not its other columns
+    return tracks.to_track_level(clean_df, track_id_offset)
+
 
 #######################
 # Export data
 #######################
 
-dfs = {
-    "source_df": source_df,
-    "before_cleaning_failure_cases_df": before_cleaning_failure_cases_df,
-    "before_cleaning_failure_cases_summary": before_cleaning_failure_cases_summary,
-    "clean_df": clean_df,
-    "after_cleaning_failure_cases_df": after_cleaning_failure_cases_df,
-    "after_cleaning_failure_cases_summary": after_cleaning_failure_cases_summary,
-    "evaluation_summary_df": evaluation_summary_df,
-    "comps_df": comps_df,
-    "comps_df_formatted": comps_df_formatted,
-    "track_level_df": track_level_df,
-}
 
-Path("./data/output/csv").mkdir(exist_ok=True)
-Path("./data/output/sqlite_db").mkdir(exist_ok=True)
+def export(
+    dfs: Dict[str, pd.DataFrame],
+    conn: sqlite3.Connection,
+    append: bool = False,
+    parquet: bool = False,
+    part: int = 0,
+    writer: Optional[BackgroundWriter] = None,
+) -> None:
+    """Write each frame to SQLite (in one transaction) and CSV.
 
-conn = sqlite3.connect("./data/output/sqlite_db/cddb.db")
+    With `parquet`, `PARQUET_TABLES` are also written to Parquet; `part`
+    numbers the Parquet files of each chunk. With `writer`, the files are
+    written in its threads while the SQLite tables load.
+    """
+    file_writes: List[Tuple[str, int, Callable[[], None]]] = []
+    for df_name, df in dfs.items():
+        file_writes.append(
+            (
+                f"export {df_name} (csv)",
+                len(df),
+                functools.partial(
+                    write_csv_chunk, df, df_name, CSV_PATH, append=append
+                ),
+            )
+        )
+        if parquet and df_name in PARQUET_TABLES:
+            file_writes.append(
+                (
+                    f"export {df_name} (parquet)",
+                    len(df),
+                    functools.partial(
+                        write_parquet_chunk,
+                        df,
+                        f"{PARQUET_PATH}/{df_name}",
+                        part=part,
+                        append=append,
+                        **PARQUET_TABLES[df_name],
+                    ),
+                )
+            )
+    if writer is not None:
+        for name, rows, write_file in file_writes:
+            writer.submit(name, write_file, rows=rows, chunk=profiler.chunk)
 
-logging.info("Exporting data sets...")
-logging.info("Output directory: ./data/output/")
-for df_name, df in dfs.items():
-    df.to_sql(df_name, con=conn, if_exists="replace")
-    df.to_csv(f"./data/output/csv/{df_name}.csv", index=False)
+    export_log = export_tables(conn, dfs, append=append, chunk=profiler.chunk)
+    for table_name, rows, load_seconds in export_log[
+        ["table_name", "rows", "load_seconds"]
+    ].itertuples(index=False):
+        profiler.add_record(
+            f"export {table_name} (sqlite)",
+            rows=rows,
+            wall_seconds=load_seconds,
+            rows_per_second=rows / load_seconds if load_seconds > 0 else None,
+        )
+    logging.info(
+        "Loaded SQL tables:\n" f"{export_log.to_markdown(index=False, floatfmt='.3f')}"
+    )
+
+    if writer is None:
+        for name, rows, write_file in file_writes:
+            with profiler.stage(name, rows=rows):
+                write_file()
+
+
+def index_tables(conn: sqlite3.Connection) -> None:
+    """Index `SQL_INDEXES` once every table is loaded."""
+    with profiler.stage("create sql indexes"):
+        index_log = create_indexes(conn, SQL_INDEXES)
+    logging.info(
+        "Created SQL indexes:\n" f"{index_log.to_markdown(index=False, floatfmt='.3f')}"
+    )
+
+
+def create_views(conn: sqlite3.Connection) -> None:
+    """Create the `FAILURE_VIEWS` of the failure-case tables, if missing."""
+    with conn:
+        for df_name, view in FAILURE_VIEWS.items():
+            create_view(conn, df_name, view)
+
+
+def summarize_failure_cases(conn: sqlite3.Connection) -> Dict[str, pd.DataFrame]:
+    """Summary tables from aggregate queries over the stored failure cases."""
+    before_cleaning_failure_cases_summary = failure_counts(
+        conn, "before_cleaning_failure_cases_df"
+    )
+    after_cleaning_failure_cases_summary = failure_counts(
+        conn, "after_cleaning_failure_cases_df"
+    )
+    evaluation_summary_df = evaluate(
+        before_cleaning_failure_cases_summary, after_cleaning_failure_cases_summary
+    )
+    return {
+        "before_cleaning_failure_cases_summary": before_cleaning_failure_cases_summary,
+        "after_cleaning_failure_cases_summary": after_cleaning_failure_cases_summary,
+        "evaluation_summary_df": evaluation_summary_df,
+    }
+
+
+def write_summary_table(
+    conn: sqlite3.Connection, writer: Optional[BackgroundWriter] = None
+) -> None:
+    before_cleaning_failure_cases_summary_table = (
+        get_failure_cases_summary_as_formatted_table(
+            failure_counts(conn, "before_cleaning_failure_cases_df", source_code=True)
+        )
+    )
+
+    def write_text() -> None:
+        with open(SUMMARY_TABLE_PATH, "w") as f:
+            f.write(before_cleaning_failure_cases_summary_table)
+            f.write("\n")
+        logging.info(f"Wrote: {SUMMARY_TABLE_PATH}")
+
+    if writer is None:
+        write_text()
+    else:
+        writer.submit("write summary table", write_text)
+
+
+def record_row_hashes(
+    conn: sqlite3.Connection, source_df: pd.DataFrame, ids: IdIndex
+) -> bool:
+    """Save row hashes for the next `--incremental` run.
+
+    Returns False (and drops the saved hashes) if rows can't be keyed by id.
+    """
+    with transaction(conn):
+        try:
+            save_row_hashes(conn, hash_rows(source_df, ids))
+        except ValueError as err:
+            logging.warning(f"Not saving row hashes for incremental runs: {err}")
+            drop_row_hashes(conn)
+            return False
+    return True
+
+
+def row_hashes_count(conn: sqlite3.Connection) -> int:
+    count: int = conn.execute(f"SELECT COUNT(*) FROM {ROW_HASHES_TABLE}").fetchone()[0]
+    return count
+
+
+def run(
+    filepath: str,
+    workers: int = 1,
+    repair_cache: Optional[RepairCache] = None,
+    full_compare: bool = False,
+    compact: bool = False,
+    full_validation: bool = False,
+    parquet: bool = False,
+    writer: Optional[BackgroundWriter] = None,
+    canonicalize_artists: bool = False,
+    artist_similarity: float = DEFAULT_SIMILARITY,
+    duplicates_mode: Optional[str] = None,
+    duplicate_similarity: float = DEFAULT_JACCARD,
+) -> None:
+    """Process the whole file in memory.
+
+    With `writer`, output files are written in its threads (see `export`).
+    With `canonicalize_artists`, artists are cleaned to canonical forms and
+    the mapping is exported. With `duplicates_mode` "find", duplicate albums
+    are found and their clusters exported; with "collapse", also rejected.
+    """
+    logging.info(f"Reading {filepath}...")
+    with profiler.stage("read") as record:
+        source_df = read_source(filepath)
+        record["rows"] = len(source_df)
+
+    checks = CheckDictionary.from_schema(clean_cddb.schema)
+    before_cleaning_failure_cases_df = normalize(
+        validate(source_df, "source_df", full=full_validation), checks
+    )
+
+    # Check reformatted ids against every source id, as `run_chunked` does
+    ids = IdIndex().update(source_df["id"])
+    artist_index = (
+        index_artists(source_df, repair_cache, artist_similarity)
+        if canonicalize_artists
+        else None
+    )
+    duplicates = (
+        find_duplicates(source_df, duplicate_similarity, ids, artist_index)
+        if duplicates_mode is not None
+        else None
+    )
+    clean_df_before_drops, clean_df = clean(
+        source_df,
+        ids=ids,
+        workers=workers,
+        repair_cache=repair_cache,
+        full_compare=full_compare,
+        compact=compact,
+        artist_index=artist_index,
+        duplicates=duplicates if duplicates_mode == "collapse" else None,
+    )
+    id_remap_report = report_id_remap(source_df, clean_df, ids)
+
+    after_cleaning_failure_cases_df = normalize(
+        validate(clean_df, "clean_df", full=full_validation), checks
+    )
+    comps_df, comps_df_formatted = compare(source_df, clean_df_before_drops)
+    track_level_df = to_track_level(clean_df)
+
+    dfs = {
+        "source_df": source_df,
+        "before_cleaning_failure_cases_df": before_cleaning_failure_cases_df,
+        "clean_df": clean_df,
+        "id_remap_report": id_remap_report,
+        "after_cleaning_failure_cases_df": after_cleaning_failure_cases_df,
+        "comps_df": comps_df,
+        "comps_df_formatted": comps_df_formatted,
+        "track_level_df": track_level_df,
+        CHECKS_TABLE: checks.to_frame(),
+    }
+    if artist_index is not None:
+        dfs[MAPPING_TABLE] = artist_index.to_frame()
+    if duplicates is not None:
+        dfs[DUPLICATES_TABLE] = duplicates.to_frame()
+
+    conn = connect(f"{SQLITE_PATH}/cddb.db")
+
+    logging.info("Exporting data sets...")
+    logging.info(f"Output directory: {OUTPUT_PATH}/")
+    export(dfs, conn, parquet=parquet, writer=writer)
+    index_tables(conn)
+    create_views(conn)
+    summary_dfs = summarize_failure_cases(conn)
+    export(summary_dfs, conn, writer=writer)
+    write_summary_table(conn, writer)
+    with conn:
+        drop_row_hashes(conn)
+    record_row_hashes(conn, source_df, ids)
+    conn.close()
+
+    df_names = str([*dfs, *summary_dfs])
+    logging.info(
+        f"Created SQL tables and CSVs for to following dataframes:\n{df_names}"
+    )
+
+
+def run_chunked(
+    filepath: str,
+    chunksize: int,
+    workers: int = 1,
+    repair_cache: Optional[RepairCache] = None,
+    full_compare: bool = False,
+    compact: bool = False,
+    full_validation: bool = False,
+    parquet: bool = False,
+    writer: Optional[BackgroundWriter] = None,
+    canonicalize_artists: bool = False,
+    artist_similarity: float = DEFAULT_SIMILARITY,
+    duplicates_mode: Optional[str] = None,
+    duplicate_similarity: float = DEFAULT_JACCARD,
+) -> None:
+    """Process the file in chunks of `chunksize` rows, exporting as we go.
+
+    Failure cases of every chunk share one check dictionary; column-level
+    dtype failure cases are exported at the end, if a whole-file validation
+    would report them (see `ColumnFailureCases`). The summary and evaluation
+    tables are queried from the exported failure cases at the end.
+
+    With `writer`, the next chunk is read in a background thread while the
+    current one is processed, and output files are written in the writer's
+    threads (see `export`).
+
+    With `canonicalize_artists`, the artists of every chunk are indexed in a
+    pre-pass, as the ids are; with `duplicates_mode`, so are the albums.
+    """
+    logging.info(f"Collecting ids from {filepath}...")
+    with profiler.stage("collect_ids"):
+        ids = collect_ids(filepath, chunksize)
+    artist_index = None
+    if canonicalize_artists:
+        logging.info(f"Collecting artists from {filepath}...")
+        with profiler.stage("collect_artists"):
+            artist_index = collect_artists(
+                filepath,
+                chunksize,
+                prepare=functools.partial(
+                    clean_cddb.prepare_artists, repair_cache=repair_cache
+                ),
+                artist_index=ArtistIndex(similarity=artist_similarity),
+            ).build()
+        log_artist_index(artist_index)
+    duplicates = None
+    if duplicates_mode is not None:
+        logging.info(f"Fingerprinting albums from {filepath}...")
+        with profiler.stage("collect_duplicates"):
+            duplicates = collect_duplicates(
+                filepath,
+                chunksize,
+                DuplicateIndex(similarity=duplicate_similarity),
+            )
+            # Clean the albums in a cluster up front, to leave out the ones
+            # rejected as representatives
+            clean_cddb.exclude_rejected_albums(
+                duplicates,
+                read_rows(filepath, duplicates.to_frame()["index"], chunksize),
+                ids=ids,
+                artist_index=artist_index,
+            )
+        log_duplicates(duplicates)
+
+    conn = connect(f"{SQLITE_PATH}/cddb.db")
+    column_failure_cases = {
+        "before_cleaning_failure_cases_df": ColumnFailureCases(),
+        "after_cleaning_failure_cases_df": ColumnFailureCases(),
+    }
+    checks = CheckDictionary.from_schema(clean_cddb.schema)
+    track_id_offset = 0
+    total_rows = 0
+    with conn:
+        drop_row_hashes(conn)
+    saving_row_hashes = True
+    # Share one process pool across chunks
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+
+    logging.info(f"Reading {filepath} in chunks of {chunksize} rows...")
+    source_chunks = read_source_chunks(filepath, chunksize)
+    if writer is not None:
+        source_chunks = prefetch(source_chunks, report=writer.report)
+    source_dfs = profiler.iterate("read", source_chunks)
+    for chunk_number, source_df in enumerate(source_dfs):
+        logging.info(f"Processing chunk {chunk_number} (rows {source_df.index[0]}+)")
+        append = chunk_number > 0
+
+        before_cleaning_failure_cases_df = (
+            validate(source_df, "source_df", full=full_validation)
+            .pipe(column_failure_cases["before_cleaning_failure_cases_df"].update)
+            .pipe(normalize, checks)
+        )
+        clean_df_before_drops, clean_df = clean(
+            source_df,
+            ids=ids,
+            workers=workers,
+            executor=executor,
+            repair_cache=repair_cache,
+            full_compare=full_compare,
+            compact=compact,
+            artist_index=artist_index,
+            duplicates=duplicates if duplicates_mode == "collapse" else None,
+        )
+        after_cleaning_failure_cases_df = (
+            validate(clean_df, "clean_df", full=full_validation)
+            .pipe(column_failure_cases["after_cleaning_failure_cases_df"].update)
+            .pipe(normalize, checks)
+        )
+        comps_df, comps_df_formatted = compare(source_df, clean_df_before_drops)
+        track_level_df = to_track_level(clean_df, track_id_offset)
+        track_id_offset += len(track_level_df)
+
+        dfs = {
+            "source_df": source_df,
+            "before_cleaning_failure_cases_df": before_cleaning_failure_cases_df,
+            "clean_df": clean_df,
+            "id_remap_report": report_id_remap(source_df, clean_df, ids),
+            "after_cleaning_failure_cases_df": after_cleaning_failure_cases_df,
+            "comps_df": comps_df,
+            "comps_df_formatted": comps_df_formatted,
+            "track_level_df": track_level_df,
+        }
+        export(
+            dfs, conn, append=append, parquet=parquet, part=chunk_number, writer=writer
+        )
+        if saving_row_hashes:
+            saving_row_hashes = record_row_hashes(conn, source_df, ids)
+        total_rows += len(source_df)
+
+    # Column-level dtype failure cases, as a whole-file validation has them
+    export(
+        {
+            df_name: normalize(failure_cases.remaining(), checks)
+            for df_name, failure_cases in column_failure_cases.items()
+        },
+        conn,
+        append=True,
+        parquet=parquet,
+        part=chunk_number + 1,
+        writer=writer,
+    )
+    final_dfs = {CHECKS_TABLE: checks.to_frame()}
+    if artist_index is not None:
+        final_dfs[MAPPING_TABLE] = artist_index.to_frame()
+    if duplicates is not None:
+        final_dfs[DUPLICATES_TABLE] = duplicates.to_frame()
+    export(final_dfs, conn, writer=writer)
+    index_tables(conn)
+    create_views(conn)
+    export(summarize_failure_cases(conn), conn, writer=writer)
+    write_summary_table(conn, writer)
+    if not saving_row_hashes or row_hashes_count(conn) != total_rows:
+        logging.warning("Not saving row hashes for incremental runs: duplicate ids")
+        with conn:
+            drop_row_hashes(conn)
+    conn.close()
+    if executor is not None:
+        executor.shutdown()
+
+    logging.info(f"Exported {chunk_number + 1} chunks to {OUTPUT_PATH}/")
+
+
+def update_failure_cases(
+    conn: sqlite3.Connection, df_name: str, view: str, failure_cases_df: pd.DataFrame
+) -> pd.DataFrame:
+    """The failure cases of the changed rows to add to table `df_name`.
+
+    Column-level failure cases are reported as a whole-file validation would
+    (see `ColumnFailureCases`), given those stored for the unchanged rows.
+    Stored column-level dtype failure cases of columns that now have
+    element-level ones are deleted.
+    """
+    seen = {
+        (str(column), str(check), str(failure_case))
+        for column, check, failure_case in conn.execute(
+            f'SELECT "column", "check", failure_case FROM {view} WHERE "index" IS NULL'
+        )
+    }
+    element_level_dtype_columns = [
+        column
+        for (column,) in conn.execute(
+            f'SELECT DISTINCT "column" FROM {view} '
+            """WHERE "index" IS NOT NULL AND "check" LIKE 'dtype(%'"""
+        )
+    ]
+    column_failure_cases = ColumnFailureCases(seen, element_level_dtype_columns)
+    failure_cases_df = column_failure_cases.update(failure_cases_df)
+    columns = sorted(
+        column_failure_cases.element_level_dtype_columns.difference(
+            element_level_dtype_columns
+        )
+    )
+    if columns:
+        placeholders = ", ".join("?" * len(columns))
+        conn.execute(
+            f'DELETE FROM {df_name} WHERE "index" IS NULL AND check_id IN '
+            f"(SELECT check_id FROM {CHECKS_TABLE} "
+            f"""WHERE "check" LIKE 'dtype(%' AND "column" IN ({placeholders}))""",
+            columns,
+        )
+    remaining = column_failure_cases.remaining()
+    if remaining.empty:
+        return failure_cases_df
+    return pd.concat([failure_cases_df, remaining])
+
+
+def run_incremental(
+    filepath: str,
+    workers: int = 1,
+    repair_cache: Optional[RepairCache] = None,
+    full_compare: bool = False,
+    compact: bool = False,
+    full_validation: bool = False,
+    writer: Optional[BackgroundWriter] = None,
+) -> None:
+    """Clean only the rows that are new or changed since the last run.
+
+    Rows are matched with the previous run by album id and compared by hash.
+    The row-level SQLite tables are updated in place, in one transaction, and
+    the summary tables are recomputed from the stored failure cases. New
+    checks are added to the stored check dictionary. CSV exports of the
+    row-level tables are not updated. With `writer`, the summary CSVs and
+    table are written in its threads.
+    """
+    logging.info(f"Reading {filepath}...")
+    with profiler.stage("read") as record:
+        source_df = read_source(filepath)
+        record["rows"] = len(source_df)
+    ids = IdIndex().update(source_df["id"])
+    row_hashes = profiler.wrap(hash_rows)(source_df, ids)
+
+    conn = connect(f"{SQLITE_PATH}/cddb.db")
+    previous_row_hashes = load_row_hashes(conn)
+    checks = CheckDictionary.read(conn)
+    if previous_row_hashes is None or checks is None:
+        conn.close()
+        logging.info(
+            "No row hashes or checks from a previous run; processing the whole file"
+        )
+        run(
+            filepath,
+            workers=workers,
+            repair_cache=repair_cache,
+            full_compare=full_compare,
+            compact=compact,
+            full_validation=full_validation,
+            writer=writer,
+        )
+        return
+
+    delta = diff_row_hashes(row_hashes, previous_row_hashes)
+    logging.info(
+        "Rows by change since the last run:\n"
+        f"{delta['status'].value_counts().to_markdown()}"
+    )
+    is_stale = delta["status"].isin([CHANGED, DELETED])
+    is_moved = (delta["status"] == UNCHANGED) & (
+        delta["row_index"] != delta["row_index_previous"]
+    )
+    is_updated = delta["status"].isin([NEW, CHANGED]) | is_moved
+    stale_rows = delta.loc[is_stale, "row_index_previous"].astype(int).tolist()
+    moves = (
+        delta.loc[is_moved]
+        .set_index("row_index_previous")["row_index"]
+        .astype(int)
+        .rename(index=int)
+    )
+    changed_rows = np.sort(
+        delta.loc[delta["status"].isin([NEW, CHANGED]), "row_index"].astype(int)
+    )
+    delta_source_df = source_df.loc[changed_rows]
+
+    dfs: Dict[str, pd.DataFrame] = {}
+    if len(delta_source_df) > 0:
+        before_cleaning_failure_cases_df = validate(
+            delta_source_df, "source_df", full=full_validation
+        )
+        clean_df_before_drops, clean_df = clean(
+            delta_source_df,
+            ids=ids,
+            workers=workers,
+            repair_cache=repair_cache,
+            full_compare=full_compare,
+            compact=compact,
+        )
+        after_cleaning_failure_cases_df = validate(
+            clean_df, "clean_df", full=full_validation
+        )
+        comps_df, comps_df_formatted = compare(delta_source_df, clean_df_before_drops)
+        # Track ids continue after the largest one so far
+        (track_id_offset,) = conn.execute(
+            "SELECT COALESCE(MAX(track_id) + 1, 0) FROM track_level_df"
+        ).fetchone()
+        dfs = {
+            "source_df": delta_source_df,
+            "before_cleaning_failure_cases_df": before_cleaning_failure_cases_df,
+            "clean_df": clean_df,
+            "id_remap_report": report_id_remap(delta_source_df, clean_df, ids),
+            "after_cleaning_failure_cases_df": after_cleaning_failure_cases_df,
+            "comps_df": comps_df,
+            "comps_df_formatted": comps_df_formatted,
+            "track_level_df": to_track_level(clean_df, track_id_offset),
+        }
+
+    logging.info("Updating SQL tables...")
+    with transaction(conn), profiler.stage("update sql tables", rows=len(delta)):
+        for df_name, column in SQL_INDEXES:
+            ensure_index(conn, df_name, column)
+
+        stale_album_ids = lookup_rows(conn, "clean_df", "id", "index", stale_rows)
+        delete_rows(conn, "track_level_df", "album_row_id", stale_album_ids)
+        for df_name, column in ROW_KEYED_TABLES.items():
+            delete_rows(conn, df_name, column, stale_rows)
+            move_rows(conn, df_name, column, moves)
+
+        if dfs:
+            for df_name, view in FAILURE_VIEWS.items():
+                dfs[df_name] = update_failure_cases(
+                    conn, df_name, view, dfs[df_name]
+                ).pipe(normalize, checks)
+            for df_name, df in dfs.items():
+                insert_df(conn, df_name, df)
+
+        summary_dfs = {
+            **summarize_failure_cases(conn),
+            CHECKS_TABLE: checks.to_frame(),
+        }
+        for df_name, df in summary_dfs.items():
+            conn.execute(f"DELETE FROM {df_name}")
+            insert_df(conn, df_name, df)
+
+        delete_rows(
+            conn,
+            ROW_HASHES_TABLE,
+            "id",
+            delta.index[delta["status"] == DELETED].tolist(),
+        )
+        save_row_hashes(conn, row_hashes.loc[delta.index[is_updated]])
+    write_summary_table(conn, writer)
+    conn.close()
+
+    for df_name, df in summary_dfs.items():
+        write_csv = functools.partial(
+            df.to_csv, f"{CSV_PATH}/{df_name}.csv", index=False
+        )
+        if writer is None:
+            write_csv()
+        else:
+            writer.submit(f"export {df_name} (csv)", write_csv, rows=len(df))
+
+    logging.info(
+        f"Updated {len(delta_source_df)} new or changed rows, removed "
+        f"{len(stale_rows) - int((delta['status'] == CHANGED).sum())} deleted "
+        f"rows and renumbered {len(moves)} moved rows in {SQLITE_PATH}/cddb.db"
+    )
+
+
+def report_overlap(report: OverlapReport) -> None:
+    """Add the background tasks to the run report and log the time saved."""
+    for task in report.tasks:
+        measurements = {
+            key: value for key, value in task.items() if key not in {"kind", "stage"}
+        }
+        if measurements.get("rows") and measurements["wall_seconds"] > 0:
+            measurements["rows_per_second"] = (
+                measurements["rows"] / measurements["wall_seconds"]
+            )
+        stage = task["stage"] if task["kind"] == "write" else "read (prefetch)"
+        profiler.add_record(stage, **measurements)
+    logging.info(
+        "Overlapped I/O, background tasks and time waited for them:\n"
+        f"{report.summary().to_markdown(index=False, floatfmt='.3f')}\n"
+        "Estimated wall time saved compared with a serial run: "
+        "{:.3f}s to {:.3f}s".format(*report.saved_seconds())
+    )
+
+
+def parse_thresholds(values: List[str]) -> Dict[str, float]:
+    """Failure-rate thresholds by column, from "COLUMN=RATE" strings."""
+    thresholds = {}
+    for value in values:
+        column, _, rate = value.partition("=")
+        thresholds[column] = float(rate)
+    return thresholds
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--input",
+        default=INPUT_FILEPATH,
+        help="Path to cddb.tsv (optionally .zip, .gz or .zst), or a Parquet or "
+        "Arrow IPC file of it.",
+    )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=None,
+        help="Stream the input in chunks of this many rows to bound memory use.",
+    )
+    parser.add_argument(
+        "--value-cache-size",
+        type=int,
+        default=DEFAULT_VALUE_CACHE_SIZE,
+        help="Distinct values cached per clean_value_* transform.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Run the cleaning chain on this many worker processes.",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only clean rows that are new or changed since the last run.",
+    )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="Record allocations per stage with tracemalloc (slower).",
+    )
+    parser.add_argument(
+        "--profile-stages",
+        metavar="DIR",
+        default=None,
+        help="Save cProfile stats of each stage to DIR.",
+    )
+    parser.add_argument(
+        "--parquet",
+        action="store_true",
+        help=f"Also write {', '.join(PARQUET_TABLES)} as Parquet datasets.",
+    )
+    parser.add_argument(
+        "--full-compare",
+        action="store_true",
+        help="Log each step's changes with DataFrame.compare (slower).",
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Clean with categorical text columns and a small integer year.",
+    )
+    parser.add_argument(
+        "--full-validation",
+        action="store_true",
+        help="Validate every row with pandera instead of each column's "
+        "distinct values.",
+    )
+    parser.add_argument(
+        "--preflight",
+        action="store_true",
+        help="Only estimate the source's failure cases from a sample; validate "
+        "in full if an estimated failure rate crosses its threshold.",
+    )
+    parser.add_argument(
+        "--sample-size",
+        type=int,
+        default=DEFAULT_SAMPLE_SIZE,
+        help="Rows sampled by --preflight, stratified by category.",
+    )
+    parser.add_argument(
+        "--max-failure-rate",
+        type=float,
+        default=DEFAULT_MAX_FAILURE_RATE,
+        help="Estimated failure rate above which --preflight validates in full.",
+    )
+    parser.add_argument(
+        "--column-max-failure-rate",
+        metavar="COLUMN=RATE",
+        action="append",
+        default=[],
+        help="--max-failure-rate for one column; may be repeated.",
+    )
+    parser.add_argument(
+        "--overlap-io",
+        action="store_true",
+        help="Read the next chunk and write output files in background threads "
+        "while validating and cleaning; logs the wall time saved.",
+    )
+    parser.add_argument(
+        "--write-workers",
+        type=int,
+        default=DEFAULT_WRITE_WORKERS,
+        help="Threads writing output files with --overlap-io.",
+    )
+    parser.add_argument(
+        "--canonicalize-artists",
+        action="store_true",
+        help="Clean each artist's spellings to one canonical form and export "
+        "the mapping.",
+    )
+    parser.add_argument(
+        "--artist-similarity",
+        type=float,
+        default=DEFAULT_SIMILARITY,
+        help="N-gram similarity from which --canonicalize-artists matches "
+        "invalid spellings to valid ones (valid spellings need 0.9).",
+    )
+    parser.add_argument(
+        "--duplicates",
+        choices=["find", "collapse"],
+        help="Find duplicate albums and export their clusters; with collapse, "
+        "also keep only one album of each cluster.",
+    )
+    parser.add_argument(
+        "--duplicate-similarity",
+        type=float,
+        default=DEFAULT_JACCARD,
+        help="Jaccard similarity of their tracks, artist and title from which "
+        "albums are duplicates.",
+    )
+    parser.add_argument(
+        "--repair-cache",
+        default=REPAIR_CACHE_PATH,
+        help="SQLite file caching ftfy repairs across runs.",
+    )
+    parser.add_argument(
+        "--no-repair-cache",
+        action="store_true",
+        help="Repair encoding errors without the on-disk cache.",
+    )
+    args = parser.parse_args()
+    if args.incremental and args.chunksize is not None:
+        parser.error("--incremental cannot be combined with --chunksize")
+    if args.incremental and args.parquet:
+        parser.error("--parquet datasets are only written by full runs")
+    if args.incremental and args.canonicalize_artists:
+        parser.error("--canonicalize-artists needs every row; it is not incremental")
+    if not 0 < args.artist_similarity <= 1:
+        parser.error("--artist-similarity must be in (0, 1]")
+    if args.incremental and args.duplicates is not None:
+        parser.error("--duplicates needs every row; it is not incremental")
+    if not 0 < args.duplicate_similarity <= 1:
+        parser.error("--duplicate-similarity must be in (0, 1]")
+    if args.preflight and (args.incremental or args.chunksize is not None):
+        parser.error("--preflight cannot be combined with --incremental or --chunksize")
+    try:
+        thresholds = parse_thresholds(args.column_max_failure_rate)
+    except ValueError as err:
+        parser.error(f"--column-max-failure-rate: {err}")
+    if args.parquet or source_format(args.input) != "tsv":
+        try:
+            require_pyarrow()
+        except ImportError as err:
+            parser.error(str(err))
+
+    pd.set_option("display.max_rows", 1000)
+    pd.set_option("display.max_columns", None)
+    pd.set_option("display.max_colwidth", None)
+
+    # Setup logging
+    log_out_path = f"{OUTPUT_PATH}/logs"
+    Path(log_out_path).mkdir(exist_ok=True)
+    module_name = Path(__file__).name.replace(".py", "")
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(process)d - %(levelname)s - %(message)s",
+        filename=f"{log_out_path}/{module_name}.log",
+        filemode="w",
+    )
+
+    Path(CSV_PATH).mkdir(exist_ok=True)
+    Path(SQLITE_PATH).mkdir(exist_ok=True)
+
+    profiler.trace_memory = args.trace_memory
+    profiler.profile_dir = args.profile_stages
+    set_value_cache_size(args.value_cache_size)
+    repair_cache = None if args.no_repair_cache else RepairCache(args.repair_cache)
+    writer = (
+        BackgroundWriter(max_workers=args.write_workers) if args.overlap_io else None
+    )
+    if args.preflight:
+        preflight(
+            args.input,
+            sample_size=args.sample_size,
+            max_failure_rate=args.max_failure_rate,
+            thresholds=thresholds,
+            full_validation=args.full_validation,
+        )
+    elif args.incremental:
+        run_incremental(
+            args.input,
+            workers=args.workers,
+            repair_cache=repair_cache,
+            full_compare=args.full_compare,
+            compact=args.compact,
+            full_validation=args.full_validation,
+            writer=writer,
+        )
+    elif args.chunksize is None:
+        run(
+            args.input,
+            workers=args.workers,
+            repair_cache=repair_cache,
+            full_compare=args.full_compare,
+            compact=args.compact,
+            full_validation=args.full_validation,
+            parquet=args.parquet,
+            writer=writer,
+            canonicalize_artists=args.canonicalize_artists,
+            artist_similarity=args.artist_similarity,
+            duplicates_mode=args.duplicates,
+            duplicate_similarity=args.duplicate_similarity,
+        )
+    else:
+        run_chunked(
+            args.input,
+            args.chunksize,
+            workers=args.workers,
+            repair_cache=repair_cache,
+            full_compare=args.full_compare,
+            compact=args.compact,
+            full_validation=args.full_validation,
+            parquet=args.parquet,
+            writer=writer,
+            canonicalize_artists=args.canonicalize_artists,
+            artist_similarity=args.artist_similarity,
+            duplicates_mode=args.duplicates,
+            duplicate_similarity=args.duplicate_similarity,
+        )
+    if writer is not None:
+        writer.close()
+        report_overlap(writer.report)
+
+    if repair_cache is not None:
+        # Lookups made by worker processes are not included
+        logging.info(
+            "Repair cache:\n" f"{repair_cache.info().to_markdown(index=False)}"
+        )
+        repair_cache.close()
+
+    # Caches used by worker processes are not included
+    logging.info(
+        "Value transform caches:\n" f"{value_cache_info().to_markdown(index=False)}"
+    )
+
+    logging.info(
+        "Run report by stage:\n"
+        f"{profiler.summary().to_markdown(index=False, floatfmt='.3f')}"
+    )
+    report_paths = profiler.write_report(
+        f"{log_out_path}/{module_name}_report",
+        metadata={
+            "argv": sys.argv[1:],
+            **vars(args),
+            "overlap_saved_seconds": (
+                None if writer is None else list(writer.report.saved_seconds())
+            ),
+        },
+    )
+    logging.info(f"Wrote: {', '.join(report_paths)}")
 
-output_path_checks_summary_table = (
-    "./data/output/before_cleaning_failure_cases_summary_table.txt"
-)
-with open(output_path_checks_summary_table, "w") as f:
-    f.write(before_cleaning_failure_cases_summary_table)
-    f.write("\n")
-    logging.info(f"Wrote: {output_path_checks_summary_table}")
 
-df_names = str(list(dfs.keys()))
-logging.info(f"Created SQL tables and CSVs for to following dataframes:\n{df_names}")
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,37 @@
-from .schema import schema  # noqa
-from .cleaning_transforms import *  # noqa
+"""clean_cddb
 
-__all__ = ["schema"]
+Importing the package is cheap: `schema` and `vectorized_schema` are built
+on first use, and the `cleaning_transforms` names (which need pandas and
+ftfy) are imported on first access, e.g. `clean_cddb.get_cleaning_steps`.
+"""
+
+import importlib
+from typing import TYPE_CHECKING, Any, List
+
+from .schema import schema, vectorized_schema  # noqa
+
+if TYPE_CHECKING:
+    from .cleaning_transforms import *  # noqa
+
+__all__ = ["schema", "vectorized_schema"]
+
+
+def __getattr__(name: str) -> Any:
+    if name.startswith("__"):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    # Submodules first, e.g. `clean_cddb.formats` without importing it
+    try:
+        return importlib.import_module(f".{name}", __name__)
+    except ModuleNotFoundError as err:
+        if err.name != f"{__name__}.{name}":
+            raise
+    cleaning_transforms = importlib.import_module(".cleaning_transforms", __name__)
+    try:
+        return getattr(cleaning_transforms, name)
+    except AttributeError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+
+
+def __dir__() -> List[str]:
+    cleaning_transforms = importlib.import_module(".cleaning_transforms", __name__)
+    return sorted(set(globals()) | set(dir(cleaning_transforms)))
@@ -0,0 +1,306 @@
+"""artist_index.py
+
+Canonical forms of artist spellings, for `clean_df_canonicalize_artists`.
+
+* `artist_key()` normalizes a spelling for exact matching: accents are
+  stripped (NFKD, without combining marks), case is folded and whitespace
+  collapsed, so "Björk", "BJORK" and " bjork " share the key "bjork".
+  Mojibake is repaired before, by `clean_df_try_to_fix_encoding_errors`.
+* The spellings of a key map to its most frequent valid spelling (passing
+  `check_col_has_valid_characters` and `check_artist_is_valid`), preferring
+  mixed case over all upper or lower case on ties.
+* Keys are then fuzzy-matched to keys with a valid spelling, on the
+  character n-grams of their letters, digits and spaces (punctuation
+  dropped), by Dice similarity. Candidates come from an inverted index of
+  n-grams; n-grams shared by more than `max_block_size` keys are too common
+  to block on and are skipped, so each key is compared with a bounded number
+  of others and the whole index is built in near-linear time, not by
+  comparing every pair. A key without a valid spelling maps to its most
+  similar candidate if the similarity reaches `similarity`, both hold the
+  same numbers ("Blink-182" is not "Blink-183") and the candidate has at
+  least `min_rows_ratio` times the key's rows, so two spellings seen once
+  each are left alone. Close spellings of valid names are as often other
+  artists ("Emil Richards", "Emily Richards") as misspellings, so a key with
+  a valid spelling needs the stricter `valid_similarity` and
+  `valid_min_rows_ratio` ("Presley Elvis", "Gabriel, Peter" and "AC /DC"
+  then map to "Elvis Presley", "Peter Gabriel" and "AC DC"). Keys that are
+  matched are not targets themselves, so matches don't chain. Keys shorter
+  than `min_length` are only matched exactly.
+* An invalid spelling (e.g. with "??") whose key matches a valid one is
+  repaired rather than rejected by `clean_df_invalid_symbols`.
+* `ArtistIndex.update()` adds a column (or chunk of a column) of artists;
+  the index is built on first use and can't be updated after that, so every
+  chunk or partition maps the same spelling to the same canonical form.
+* `ArtistIndex.to_frame()` is the mapping table exported for audit
+  (`artist_mapping`): each changed spelling, its key, its canonical form,
+  how it was matched, the similarity of a fuzzy match and its rows.
+"""
+
+import re
+import unicodedata
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from . import vectorized_checks
+
+MAPPING_TABLE = "artist_mapping"
+MAPPING_COLUMNS = [
+    "artist",
+    "artist_key",
+    "canonical_artist",
+    "match",
+    "similarity",
+    "rows",
+]
+
+UNCHANGED = "unchanged"
+EXACT = "exact"
+FUZZY = "fuzzy"
+
+DEFAULT_SIMILARITY = 0.8
+DEFAULT_NGRAM = 3
+DEFAULT_MAX_BLOCK_SIZE = 100
+DEFAULT_MIN_LENGTH = 4
+DEFAULT_MIN_ROWS_RATIO = 2.0
+DEFAULT_VALID_SIMILARITY = 0.9
+DEFAULT_VALID_MIN_ROWS_RATIO = 3.0
+
+_PUNCTUATION = re.compile(r"[^\w ]")
+_NUMBERS = re.compile(r"\d+")
+
+
+def artist_key(value: str) -> str:
+    """`value` without accents, case-folded, with whitespace collapsed."""
+    decomposed = unicodedata.normalize("NFKD", value)
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(stripped.casefold().split())
+
+
+def _ngrams(key: str, n: int) -> Set[str]:
+    """The n-grams of `key`'s letters, digits and spaces, padded at both ends."""
+    text = " ".join(_PUNCTUATION.sub("", key).split())
+    padded = f" {text} "
+    return {padded[i : i + n] for i in range(len(padded) - n + 1)}
+
+
+def _fuzzy_targets(
+    keys: List[str],
+    rows: np.ndarray,
+    is_valid: np.ndarray,
+    similarity: float,
+    ngram: int,
+    max_block_size: int,
+    min_length: int,
+    min_rows_ratio: float,
+    valid_similarity: float,
+    valid_min_rows_ratio: float,
+) -> Dict[int, Tuple[int, float]]:
+    """The key each key maps to, by position, with their similarity.
+
+    `keys` are ordered from most to least `rows`; `is_valid` marks the keys
+    with a valid spelling, which are the targets. Candidates have more rows
+    than the key, so they are matched first and skipped if they were.
+    """
+    grams = [_ngrams(key, ngram) if len(key) >= min_length else set() for key in keys]
+    numbers = [_NUMBERS.findall(key) for key in keys]
+    postings: Dict[str, List[int]] = {}
+    for position, key_grams in enumerate(grams):
+        for gram in key_grams:
+            postings.setdefault(gram, []).append(position)
+
+    targets: Dict[int, Tuple[int, float]] = {}
+    for position, key_grams in enumerate(grams):
+        if not key_grams:
+            continue
+        if is_valid[position]:
+            min_similarity, min_ratio = valid_similarity, valid_min_rows_ratio
+        else:
+            min_similarity, min_ratio = similarity, min_rows_ratio
+        # A similarity of `min_similarity` needs sizes within this ratio
+        min_size_ratio = min_similarity / (2 - min_similarity)
+        candidates: Set[int] = set()
+        for gram in key_grams:
+            block = postings[gram]
+            if len(block) <= max_block_size:
+                candidates.update(block)
+        best: Optional[Tuple[float, int]] = None
+        for candidate in candidates:
+            if not is_valid[candidate] or candidate in targets:
+                continue
+            if rows[candidate] < min_ratio * rows[position]:
+                continue
+            if numbers[candidate] != numbers[position]:
+                continue
+            sizes = sorted([len(key_grams), len(grams[candidate])])
+            if sizes[0] < min_size_ratio * sizes[1]:
+                continue
+            score = 2 * len(key_grams & grams[candidate]) / (sizes[0] + sizes[1])
+            # Ties go to the key with more rows
+            if score >= min_similarity and (best is None or (score, -candidate) > best):
+                best = (score, -candidate)
+        if best is not None:
+            targets[position] = (-best[1], best[0])
+    return targets
+
+
+class ArtistIndex:
+    """Artist spellings and the canonical form each maps to."""
+
+    def __init__(
+        self,
+        similarity: float = DEFAULT_SIMILARITY,
+        ngram: int = DEFAULT_NGRAM,
+        max_block_size: int = DEFAULT_MAX_BLOCK_SIZE,
+        min_length: int = DEFAULT_MIN_LENGTH,
+        min_rows_ratio: float = DEFAULT_MIN_ROWS_RATIO,
+        valid_similarity: float = DEFAULT_VALID_SIMILARITY,
+        valid_min_rows_ratio: float = DEFAULT_VALID_MIN_ROWS_RATIO,
+    ) -> None:
+        if min_rows_ratio <= 1:
+            raise ValueError("min_rows_ratio must be greater than 1")
+        if valid_min_rows_ratio <= 1:
+            raise ValueError("valid_min_rows_ratio must be greater than 1")
+        self.similarity = similarity
+        self.ngram = ngram
+        self.max_block_size = max_block_size
+        self.min_length = min_length
+        self.min_rows_ratio = min_rows_ratio
+        self.valid_similarity = valid_similarity
+        self.valid_min_rows_ratio = valid_min_rows_ratio
+        self.counts: "Counter[str]" = Counter()
+        self._mapping: Optional[pd.DataFrame] = None
+        self._canonical: Dict[str, str] = {}
+
+    @classmethod
+    def from_artists(cls, artists: pd.Series, **options: Any) -> "ArtistIndex":
+        return cls(**options).update(artists)
+
+    def update(self, artists: pd.Series) -> "ArtistIndex":
+        """Add a column (or chunk of a column) of artists to the index."""
+        if self._mapping is not None:
+            raise ValueError("Artists can't be added once the index is built")
+        counts = artists.dropna().astype(object).value_counts()
+        self.counts.update(
+            {value: int(n) for value, n in counts.items() if isinstance(value, str)}
+        )
+        return self
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def build(self) -> "ArtistIndex":
+        """Map every spelling to its canonical form, if not done yet."""
+        self._get_mapping()
+        return self
+
+    def _get_mapping(self) -> pd.DataFrame:
+        if self._mapping is None:
+            self._mapping = self._build_mapping()
+            changed = self._mapping[self._mapping["match"] != UNCHANGED]
+            self._canonical = dict(zip(changed["artist"], changed["canonical_artist"]))
+        return self._mapping
+
+    def _build_mapping(self) -> pd.DataFrame:
+        spellings = pd.DataFrame(
+            {"artist": list(self.counts), "rows": list(self.counts.values())},
+            columns=["artist", "rows"],
+        ).astype({"artist": object, "rows": "int64"})
+        spellings["artist_key"] = [artist_key(value) for value in spellings["artist"]]
+        is_valid = vectorized_checks.check_col_has_valid_characters(
+            spellings["artist"]
+        ) & vectorized_checks.check_artist_is_valid(spellings["artist"])
+
+        # The most frequent valid spelling of each key; of equally frequent
+        # ones, a mixed-case spelling ("Blondie", not "BLONDIE")
+        is_mixed_case = [
+            value not in (value.upper(), value.lower()) for value in spellings["artist"]
+        ]
+        spellings_of_keys = (
+            spellings[is_valid.to_numpy()]
+            .assign(is_mixed_case=np.array(is_mixed_case)[is_valid.to_numpy()])
+            .sort_values(
+                ["artist_key", "rows", "is_mixed_case", "artist"],
+                ascending=[True, False, False, True],
+            )
+            .drop_duplicates("artist_key")
+            .set_index("artist_key")["artist"]
+        )
+        key_rows = (
+            spellings.groupby("artist_key")["rows"]
+            .sum()
+            .reset_index()
+            .sort_values(["rows", "artist_key"], ascending=[False, True])
+        )
+        keys = key_rows["artist_key"].tolist()
+        targets = _fuzzy_targets(
+            keys,
+            key_rows["rows"].to_numpy(),
+            key_rows["artist_key"].isin(spellings_of_keys.index).to_numpy(),
+            self.similarity,
+            self.ngram,
+            self.max_block_size,
+            self.min_length,
+            self.min_rows_ratio,
+            self.valid_similarity,
+            self.valid_min_rows_ratio,
+        )
+
+        canonical_keys: Dict[str, str] = {}
+        similarities: Dict[str, float] = {}
+        for position, key in enumerate(keys):
+            if position in targets:
+                # Targets are valid keys that are not matched themselves
+                target, score = targets[position]
+                canonical_keys[key] = keys[target]
+                similarities[key] = score
+            else:
+                canonical_keys[key] = key
+
+        canonical_artists = (
+            spellings["artist_key"].map(canonical_keys).map(spellings_of_keys)
+        )
+        spellings["canonical_artist"] = canonical_artists.where(
+            canonical_artists.notna(), spellings["artist"]
+        )
+        spellings["similarity"] = spellings["artist_key"].map(similarities)
+        spellings["match"] = np.where(
+            spellings["similarity"].notna(),
+            FUZZY,
+            np.where(
+                spellings["canonical_artist"] != spellings["artist"], EXACT, UNCHANGED
+            ),
+        )
+        return spellings.reindex(columns=MAPPING_COLUMNS)
+
+    def canonicalize(self, value: Any) -> Any:
+        """The canonical form of `value`; values not in the index are kept."""
+        self.build()
+        if not isinstance(value, str):
+            return value
+        return self._canonical.get(value, value)
+
+    def to_frame(self, changed_only: bool = True) -> pd.DataFrame:
+        """The mapping table: one row per (changed) spelling.
+
+        Ordered by canonical form, then from most to least rows.
+        """
+        mapping = self._get_mapping()
+        if changed_only:
+            mapping = mapping[mapping["match"] != UNCHANGED]
+        return mapping.sort_values(
+            ["canonical_artist", "rows", "artist"], ascending=[True, False, True]
+        ).reset_index(drop=True)
+
+    def summary(self) -> pd.DataFrame:
+        """Spellings and rows by how they were matched."""
+        mapping = self.to_frame(changed_only=False)
+        return (
+            mapping.groupby("match")
+            .agg(spellings=("artist", "size"), rows=("rows", "sum"))
+            .reindex([UNCHANGED, EXACT, FUZZY], fill_value=0)
+            .rename_axis("match")
+            .reset_index()
+        )
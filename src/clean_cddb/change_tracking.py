@@ -0,0 +1,119 @@
+"""change_tracking.py
+
+Cheap before/after diffs of a cleaning step, for logging.
+
+* `diff_frames()` compares only the columns a step may change (see
+  `cleaning_transforms.get_step_columns()`), with one vectorized comparison
+  per column, instead of running `DataFrame.compare` on the whole frame.
+  Missing values compare equal to each other, as in `DataFrame.compare`.
+* The resulting `Changes` holds the changed row positions of each column, so
+  counting the changed rows and sampling examples costs time proportional to
+  the number of changes.
+* `Changes.sample()` returns examples in the layout of `DataFrame.compare`:
+  a ("before", "after") column pair per changed column, with unchanged cells
+  left missing.
+"""
+
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+def changed_positions(before: pd.Series, after: pd.Series) -> np.ndarray:
+    """Positions where `after` differs from `before` (same length and order)."""
+    # Object comparison handles values whose type changed, e.g. "1999" -> 1999
+    before_values = before.to_numpy(dtype=object)
+    after_values = after.to_numpy(dtype=object)
+    before_na = pd.isna(before_values)
+    after_na = pd.isna(after_values)
+    changed = before_na != after_na
+    both = ~(before_na | after_na)
+    if both.all():
+        changed = before_values != after_values
+    else:
+        changed[both] = before_values[both] != after_values[both]
+    return np.flatnonzero(changed)
+
+
+class Changes:
+    """Cells changed by one step, as row positions per column."""
+
+    def __init__(
+        self,
+        before_df: pd.DataFrame,
+        after_df: pd.DataFrame,
+        positions: Dict[str, np.ndarray],
+    ) -> None:
+        self.before_df = before_df
+        self.after_df = after_df
+        # Only columns with at least one change
+        self.positions = {
+            column: column_positions
+            for column, column_positions in positions.items()
+            if len(column_positions) > 0
+        }
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self.positions)
+
+    def row_positions(self) -> np.ndarray:
+        """Sorted positions of the rows with at least one changed cell."""
+        if not self.positions:
+            return np.array([], dtype=np.intp)
+        return np.unique(np.concatenate(list(self.positions.values())))
+
+    def __len__(self) -> int:
+        return len(self.row_positions())
+
+    def sample(self, n: int = 5, random_state: int = 0) -> pd.DataFrame:
+        """Up to `n` changed rows, laid out like `DataFrame.compare`."""
+        rows = self.row_positions()
+        if len(rows) > n:
+            rng = np.random.default_rng(random_state)
+            rows = np.sort(rng.choice(rows, size=n, replace=False))
+
+        parts = {}
+        for column, column_positions in self.positions.items():
+            is_changed = np.isin(rows, column_positions)
+            for label, df in [("before", self.before_df), ("after", self.after_df)]:
+                values = (
+                    df[column].iloc[rows].astype(object)
+                    if column in df.columns
+                    else pd.Series(None, index=self.after_df.index[rows], dtype=object)
+                )
+                parts[(column, label)] = values.where(is_changed)
+        index = self.after_df.index[rows]
+        if not parts:
+            return pd.DataFrame(index=index)
+        return pd.DataFrame(
+            {key: values.to_numpy() for key, values in parts.items()}, index=index
+        )
+
+
+def diff_frames(
+    before_df: pd.DataFrame,
+    after_df: pd.DataFrame,
+    columns: Optional[Sequence[str]] = None,
+) -> Changes:
+    """Changes from `before_df` to `after_df`, which must have the same rows.
+
+    Only `columns` are compared (default: every column of either frame);
+    columns missing from `before_df` count as missing values there, e.g. the
+    "rejection_reason" column added by `reject_rows`.
+    """
+    if len(before_df) != len(after_df):
+        raise ValueError("Frames must have the same rows to be diffed")
+    if columns is None:
+        columns = list(dict.fromkeys([*before_df.columns, *after_df.columns]))
+
+    missing = pd.Series(None, index=after_df.index, dtype=object)
+    positions = {
+        column: changed_positions(
+            before_df[column] if column in before_df.columns else missing,
+            after_df[column] if column in after_df.columns else missing,
+        )
+        for column in columns
+    }
+    return Changes(before_df, after_df, positions)
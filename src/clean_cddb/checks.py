@@ -1,5 +1,6 @@
 from typing import Any
-import re
+
+from . import rules
 
 
 def check_col_has_valid_characters(x: Any) -> bool:
@@ -9,21 +10,8 @@ def check_col_has_valid_characters(x: Any) -> bool:
     if not isinstance(x, str):
         return False
 
-    invalid_symbols = set(
-        "\^¤¦©¬®¯°±²³´µ¶¸¹º»¼½¾¿ÂÃÅÆÇÌÕÖÜâåçïð÷øùû˜ѼҸ€中俊劇四団季雅�"
-    )  # noqa
-    for char in x:
-        if char in invalid_symbols:
-            return False
-
-    chinese_pattern = re.compile(r"[\u4e00-\u9fff]")  # CJK Unified Ideographs
-    japanese_pattern = re.compile(
-        r"[\u3040-\u30ff\u31f0-\u31ff\u3200-\u9faf]"
-    )  # Hiragana, Katakana, CJK Unified Ideographs Extension A
-    has_chinese = bool(chinese_pattern.search(x))
-    has_japanese = bool(japanese_pattern.search(x))
-
-    if has_chinese or has_japanese:
+    # invalid symbols, Chinese and Japanese characters, in one scan
+    if rules.INVALID_CHARACTERS.pattern.search(x):
         return False
 
     return True
@@ -32,12 +20,11 @@ def check_col_has_valid_characters(x: Any) -> bool:
 def check_artist_is_valid(x: Any) -> bool:
     """Check for invalid artist values."""
 
-    various_artist_pattern = r"\b(various|various artist(s)?|var)\b"
     try:
         # match on variations of "various", "various artist",
         # "various artists", and "var"; case-insensitive
         # also match 2 or more question marks like "????" or "?? ??"
-        if _match := re.search(various_artist_pattern, re.escape(x), re.IGNORECASE):
+        if rules.VARIOUS_ARTIST.pattern.search(x):
             if x != "Various":
                 return False
 
@@ -52,20 +39,7 @@ def check_artist_is_valid(x: Any) -> bool:
 def check_category_is_valid(x: Any) -> bool:
     """Check for invalid categories."""
 
-    if x in [
-        "blues",
-        "classical",
-        "country",
-        "folk",
-        "jazz",
-        "misc",
-        "newage",
-        "reggae",
-        "rock",
-        "soundtrack",
-        "N/A",
-        # "REJECT_ROW",
-    ]:
+    if isinstance(x, str) and x in rules.VALID_CATEGORIES:
         return True
     else:
         return False
@@ -109,9 +83,8 @@ def check_year_is_numeric(x: Any) -> bool:
 
 def check_track_has_numeric_prefix(x: Any) -> bool:
     """Check for tracks *possibly* using numeric prefix."""
-    for keyword in ["disk", "track", "title", "01"]:
-        if keyword in x.lower():
-            return False
+    if rules.TRACK_KEYWORD.pattern.search(x.lower()):
+        return False
     return True
 
 
@@ -5,22 +5,94 @@ and returns a dataframe after applying a cleaning procedure.
 
 """
 
-import re
-import typing
-from typing import Any
+from typing import Any, Callable, Collection, Dict, List, Optional, Tuple, Union
 
 import ftfy
 import numpy as np
 import pandas as pd
 
-from . import checks
+from . import checks, rules, vectorized_checks
+from .artist_index import ArtistIndex
+from .duplicates import DuplicateIndex
+from .id_index import REMAPPED, IdIndex
+from .pipeline import Pipeline, Stage
+from .repair_cache import RepairCache
+from .value_cache import apply_value_transform
+
+REJECTION_REASON = "rejection_reason"
+
+
+def _str_values(x: pd.Series) -> pd.Series:
+    """`x.map(str)` as an object series, only looping over non-strings."""
+    x = x.astype(object)
+    if pd.api.types.infer_dtype(x, skipna=False) == "string":
+        return x
+    is_str = x.map(lambda value: isinstance(value, str)).astype(bool)
+    x = x.copy()
+    x[~is_str] = x[~is_str].map(str)
+    return x
+
+
+def reject_rows(
+    df: pd.DataFrame, mask: pd.Series, reason: str, reject_sentinel: bool = False
+) -> pd.DataFrame:
+    """Mark the rows selected by `mask` as rejected.
+
+    By default, `reason` is written to the "rejection_reason" column; a row
+    keeps the first reason it was rejected for. With `reject_sentinel=True`,
+    every cell of a rejected row is replaced with "REJECT_ROW - <reason>"
+    instead, as in earlier versions, so consumers that filter with
+    `.query("~id.str.contains('REJECT_ROW')")` keep working.
+    """
+    new_df = df.copy()
+    if reject_sentinel:
+        if mask.any():
+            sentinel = f"REJECT_ROW - {reason}"
+            new_df = new_df.astype(
+                {
+                    column: object
+                    for column, dtype in new_df.dtypes.items()
+                    if not pd.api.types.is_string_dtype(dtype)
+                    and not isinstance(dtype, pd.CategoricalDtype)
+                }
+            )
+            # Categorical columns stay categorical, with the sentinel added
+            for column, dtype in new_df.dtypes.items():
+                if (
+                    isinstance(dtype, pd.CategoricalDtype)
+                    and sentinel not in dtype.categories
+                ):
+                    new_df[column] = new_df[column].cat.add_categories([sentinel])
+            new_df.loc[mask, :] = sentinel
+        return new_df
+
+    if REJECTION_REASON not in new_df.columns:
+        new_df[REJECTION_REASON] = pd.Series(None, index=df.index, dtype=object)
+    new_df.loc[mask & new_df[REJECTION_REASON].isna(), REJECTION_REASON] = reason
+    return new_df
+
+
+def is_rejected(df: pd.DataFrame) -> pd.Series:
+    """Whether each row is rejected, by "rejection_reason" or sentinel."""
+    rejected = _str_values(df["id"]).str.startswith("REJECT_ROW").astype(bool)
+    if REJECTION_REASON in df.columns:
+        rejected |= df[REJECTION_REASON].notna()
+    return rejected
+
+
+def drop_rejected_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """Drop rejected rows and the "rejection_reason" column.
+
+    Handles both the "rejection_reason" column and "REJECT_ROW" sentinels.
+    """
+    rejected = is_rejected(df)
+    return df.drop(columns=[REJECTION_REASON], errors="ignore")[~rejected]
 
 
 def clean_value_standardize_various_artist(x: Any) -> str:
     x_str: str = str(x).strip()
-    various_artist_pattern = r"\b(various|various artist(s)?|var)\b"
 
-    if _match := re.search(various_artist_pattern, re.escape(x_str), re.IGNORECASE):
+    if rules.VARIOUS_ARTIST.pattern.search(x_str):
         if x != "Various":
             return "Various"
 
@@ -29,7 +101,9 @@ def clean_value_standardize_various_artist(x: Any) -> str:
 
 def clean_df_standardize_various_artists(df: pd.DataFrame) -> pd.DataFrame:
     return df.assign(
-        artist=lambda _df: _df["artist"].apply(clean_value_standardize_various_artist)
+        artist=lambda _df: apply_value_transform(
+            _df["artist"], clean_value_standardize_various_artist
+        )
     )
 
 
@@ -42,24 +116,61 @@ def clean_value_try_to_fix_encoding_errors(x: Any) -> str:
 
 
 def clean_df_try_to_fix_encoding_errors(
-    df: pd.DataFrame, column_name: str
+    df: pd.DataFrame, column_name: str, repair_cache: Optional[RepairCache] = None
 ) -> pd.DataFrame:
     new_df = df.copy()
-    new_df[column_name] = df[column_name].apply(clean_value_try_to_fix_encoding_errors)
+    if repair_cache is None:
+        new_df[column_name] = apply_value_transform(
+            df[column_name], clean_value_try_to_fix_encoding_errors
+        )
+    else:
+        new_df[column_name] = repair_cache.apply(
+            df[column_name], clean_value_try_to_fix_encoding_errors
+        )
     return new_df
 
 
-def clean_row_invalid_symbols(row: Any) -> Any:
-    if not checks.check_col_has_valid_characters(
-        row.get("artist")
-    ) or not checks.check_artist_is_valid(row.get("artist")):
-        row = pd.Series(["REJECT_ROW - invalid artist"] * len(row), index=row.index)
-    return row
+def clean_df_canonicalize_artists(
+    df: pd.DataFrame, artist_index: Optional[ArtistIndex] = None
+) -> pd.DataFrame:
+    """Map each artist spelling to its canonical form.
+
+    `artist_index` is built from `df` by default. Pass an `ArtistIndex` of
+    the whole data set when `df` is one chunk or partition of it.
+    """
+    if artist_index is None:
+        # A new index each call: don't keep its results in the value cache
+        return df.assign(
+            artist=apply_value_transform(
+                df["artist"],
+                ArtistIndex.from_artists(df["artist"]).canonicalize,
+                cache=False,
+            )
+        )
+    return df.assign(
+        artist=apply_value_transform(df["artist"], artist_index.canonicalize)
+    )
 
 
-@typing.no_type_check
-def clean_df_invalid_symbols(df: pd.DataFrame) -> pd.DataFrame:
-    return df.apply(clean_row_invalid_symbols, axis=1)
+def prepare_artists(
+    artists: pd.Series, repair_cache: Optional[RepairCache] = None
+) -> pd.Series:
+    """`artists` as they reach `clean_df_canonicalize_artists` in the chain.
+
+    Build the `ArtistIndex` of a data set from these.
+    """
+    df = clean_df_standardize_various_artists(artists.to_frame("artist"))
+    return clean_df_try_to_fix_encoding_errors(df, "artist", repair_cache)["artist"]
+
+
+def clean_df_invalid_symbols(
+    df: pd.DataFrame, reject_sentinel: bool = False
+) -> pd.DataFrame:
+    artist = df["artist"]
+    is_valid = vectorized_checks.check_col_has_valid_characters(
+        artist
+    ) & vectorized_checks.check_artist_is_valid(artist)
+    return reject_rows(df, ~is_valid, "invalid artist", reject_sentinel)
 
 
 def clean_value_invalid_categories(value: Any) -> str:
@@ -70,41 +181,66 @@ def clean_value_invalid_categories(value: Any) -> str:
 
 def clean_df_invalid_categories(df: pd.DataFrame) -> pd.DataFrame:
     return df.assign(
-        category=lambda _df: _df["category"].apply(clean_value_invalid_categories)
+        category=lambda _df: apply_value_transform(
+            _df["category"], clean_value_invalid_categories
+        )
     )
 
 
-def clean_row_id_format(row: Any, ids: list) -> Any:
-    if not checks.check_id_six_digit_starting_one(row["id"]):
-        formatted_id = str(int((row["id"])) + 100000)
-        if formatted_id not in ids:
-            row["id"] = formatted_id
-    return row
+def clean_df_id_format(
+    df: pd.DataFrame, ids: Optional[Union[IdIndex, Collection[str]]] = None
+) -> pd.DataFrame:
+    """Reformat short ids unless the new id collides with another id.
 
+    `ids` is the index to check collisions against; by default it is built
+    from `df`. Pass an `IdIndex` of the whole data set when `df` is one chunk
+    or partition of it.
+    """
+    if not isinstance(ids, IdIndex):
+        ids = IdIndex.from_ids(df["id"] if ids is None else ids)
 
-def clean_df_id_format(df: pd.DataFrame) -> pd.DataFrame:
-    list_of_ids = df["id"].tolist()
-    return df.apply(clean_row_id_format, ids=list_of_ids, axis=1)
+    id_remap = ids.remap(df["id"])
+    remapped = id_remap[id_remap["status"] == REMAPPED]
 
+    new_df = df.copy()
+    new_df.loc[remapped.index, "id"] = remapped["formatted_id"]
+    return new_df
+
+
+def clean_value_genre_is_valid(value: Any) -> bool:
+    return checks.check_genre_is_valid(str(value))
 
-def clean_row_genre_invalid(row: Any) -> Any:
-    genre_str = str(row.get("genre"))
+
+def clean_value_genre(value: Any) -> Any:
+    """Replace "Data" and "nan" genres with "N/A"; keep invalid genres as is."""
+    genre_str = str(value)
     if not checks.check_genre_is_valid(genre_str):
-        row = pd.Series(
-            ["REJECT_ROW - invalid genre" for _cell in row], index=row.index
-        )
-    else:
-        row["genre"] = (
-            genre_str.replace("Data", "N/A")
-            .replace("data", "N/A")
-            .replace("nan", "N/A")
-        )
-    return row
+        return value
+    return genre_str.replace("Data", "N/A").replace("data", "N/A").replace("nan", "N/A")
+
+
+def clean_df_genre_invalid(
+    df: pd.DataFrame, reject_sentinel: bool = False
+) -> pd.DataFrame:
+    if isinstance(df["genre"].dtype, pd.CategoricalDtype):
+        # Check and replace each category once, not each row
+        is_valid = apply_value_transform(
+            df["genre"], clean_value_genre_is_valid
+        ).astype(bool)
+        new_df = df.assign(genre=apply_value_transform(df["genre"], clean_value_genre))
+        return reject_rows(new_df, ~is_valid, "invalid genre", reject_sentinel)
 
+    genre_str = _str_values(df["genre"])
+    is_valid = vectorized_checks.check_genre_is_valid(genre_str)
 
-@typing.no_type_check
-def clean_df_genre_invalid(df: pd.DataFrame) -> pd.DataFrame:
-    return df.apply(clean_row_genre_invalid, axis=1)
+    new_df = df.copy()
+    new_df.loc[is_valid, "genre"] = (
+        genre_str[is_valid]
+        .str.replace("Data", "N/A", regex=False)
+        .str.replace("data", "N/A", regex=False)
+        .str.replace("nan", "N/A", regex=False)
+    )
+    return reject_rows(new_df, ~is_valid, "invalid genre", reject_sentinel)
 
 
 def clean_value_year(value: Any) -> Any:
@@ -116,8 +252,15 @@ def clean_value_year(value: Any) -> Any:
 
 def clean_df_year(df: pd.DataFrame) -> pd.DataFrame:
     """Replace nulls with empty string; convert to pandas nullable Int32 data type."""
+    if pd.api.types.is_integer_dtype(df["year"]):
+        # Keep the (nullable) integer type, e.g. the smaller one of
+        # `compact.compact_frame`, and only drop the years out of range
+        year = df["year"].convert_dtypes()
+        return df.assign(year=year.where((year > 1950) & (year < 2030)))
     return df.assign(
-        year=lambda _df: _df["year"].fillna("").apply(clean_value_year).astype("Int32")
+        year=lambda _df: apply_value_transform(
+            _df["year"].fillna(""), clean_value_year
+        ).astype("Int32")
     )
 
 
@@ -126,6 +269,228 @@ def clean_df_title(df: pd.DataFrame) -> pd.DataFrame:
 
 
 def clean_df_genre_coalesce_with_category(df: pd.DataFrame) -> pd.DataFrame:
+    genre, category = df["genre"], df["category"]
+    if isinstance(genre.dtype, pd.CategoricalDtype) and isinstance(
+        category.dtype, pd.CategoricalDtype
+    ):
+        # Combine the codes of both columns over the union of their categories
+        categories = genre.cat.categories.union(category.cat.categories)
+        use_category = (genre.isna() | (genre == "N/A")).to_numpy()
+        coalesced = genre.cat.set_categories(categories).where(
+            ~use_category, category.cat.set_categories(categories)
+        )
+        return df.assign(genre=coalesced.cat.remove_unused_categories())
     return df.assign(genre=df["genre"].replace("N/A", pd.NA)).assign(
         genre=lambda _df: np.where(_df["genre"].isna(), _df["category"], _df["genre"])
     )
+
+
+def clean_df_collapse_duplicates(
+    df: pd.DataFrame,
+    duplicates: Optional[DuplicateIndex] = None,
+    reject_sentinel: bool = False,
+) -> pd.DataFrame:
+    """Reject duplicate albums, keeping the representative of each cluster.
+
+    `duplicates` is built from the rows of `df` not rejected yet by
+    default. Pass a `DuplicateIndex` of the whole data set when `df` is one
+    chunk or partition of it, with the rejected albums of the other chunks
+    excluded (see `exclude_rejected_albums()`). Representatives are picked
+    among the rows not rejected yet, which keep their reason.
+    """
+    rejected = is_rejected(df)
+    if duplicates is None:
+        duplicates = DuplicateIndex.from_albums(df[~rejected])
+    duplicate_rows = duplicates.duplicate_rows(rejected=df.index[rejected])
+    is_duplicate = pd.Series(df.index.isin(duplicate_rows), index=df.index)
+    return reject_rows(df, is_duplicate & ~rejected, "duplicate album", reject_sentinel)
+
+
+CleaningStep = Tuple[Callable[..., pd.DataFrame], Dict[str, Any]]
+
+# The columns each step of the chain reads and writes, and whether it
+# rejects rows
+_STAGE_COLUMNS: Dict[Callable[..., pd.DataFrame], Dict[str, Any]] = {
+    clean_df_standardize_various_artists: {"reads": ["artist"], "writes": ["artist"]},
+    clean_df_try_to_fix_encoding_errors: {"reads": ["artist"], "writes": ["artist"]},
+    clean_df_canonicalize_artists: {"reads": ["artist"], "writes": ["artist"]},
+    clean_df_invalid_symbols: {
+        "reads": ["artist"],
+        "writes": [REJECTION_REASON],
+        "rejects_rows": True,
+    },
+    clean_df_invalid_categories: {"reads": ["category"], "writes": ["category"]},
+    clean_df_id_format: {"reads": ["id"], "writes": ["id"]},
+    clean_df_genre_invalid: {
+        "reads": ["genre"],
+        "writes": ["genre", REJECTION_REASON],
+        "rejects_rows": True,
+    },
+    clean_df_year: {"reads": ["year"], "writes": ["year"]},
+    clean_df_title: {"reads": ["title"], "writes": ["title"]},
+    clean_df_genre_coalesce_with_category: {
+        "reads": ["genre", "category"],
+        "writes": ["genre"],
+    },
+    clean_df_collapse_duplicates: {
+        "reads": ["id", "artist", "title", "tracks"],
+        "writes": [REJECTION_REASON],
+        "rejects_rows": True,
+    },
+}
+
+
+def _stage(
+    func: Callable[..., pd.DataFrame],
+    kwargs: Optional[Dict[str, Any]] = None,
+    **options: Any,
+) -> Stage:
+    """A `Stage` of `func`, with the columns it reads and writes."""
+    return Stage(func, kwargs, **_STAGE_COLUMNS[func], **options)
+
+
+def get_cleaning_stages(
+    ids: Optional[Union[IdIndex, Collection[str]]] = None,
+    reject_sentinel: bool = False,
+    repair_cache: Optional[RepairCache] = None,
+    artist_index: Optional[ArtistIndex] = None,
+    duplicates: Optional[DuplicateIndex] = None,
+) -> List[Stage]:
+    """The cleaning chain, with the columns each step reads and writes.
+
+    Every step is row-local except `clean_df_id_format`, which needs `ids`
+    from the whole data set when it is applied to part of it.
+    `reject_sentinel` is passed to the steps that reject rows and
+    `repair_cache` to `clean_df_try_to_fix_encoding_errors`. Steps that
+    apply a `clean_value_*` transform to each value of the columns they
+    write declare it, so `Pipeline` can fuse them; ftfy repairs through the
+    on-disk `repair_cache` are not fused, as it caches them by input value.
+    With `artist_index`, artists are canonicalized (see `artist_index`)
+    before invalid artists are rejected. With `duplicates`, duplicate albums
+    are rejected last, so rows rejected for other reasons keep them.
+    """
+    canonicalize_artists = (
+        []
+        if artist_index is None
+        else [
+            _stage(
+                clean_df_canonicalize_artists,
+                {"artist_index": artist_index},
+                value_transforms={"artist": artist_index.canonicalize},
+            )
+        ]
+    )
+    collapse_duplicates = (
+        []
+        if duplicates is None
+        else [
+            _stage(
+                clean_df_collapse_duplicates,
+                {"duplicates": duplicates, "reject_sentinel": reject_sentinel},
+            )
+        ]
+    )
+    return [
+        _stage(
+            clean_df_standardize_various_artists,
+            value_transforms={"artist": clean_value_standardize_various_artist},
+        ),
+        _stage(
+            clean_df_try_to_fix_encoding_errors,
+            {"column_name": "artist", "repair_cache": repair_cache},
+            value_transforms=(
+                {"artist": clean_value_try_to_fix_encoding_errors}
+                if repair_cache is None
+                else None
+            ),
+        ),
+        *canonicalize_artists,
+        _stage(clean_df_invalid_symbols, {"reject_sentinel": reject_sentinel}),
+        _stage(
+            clean_df_invalid_categories,
+            value_transforms={"category": clean_value_invalid_categories},
+        ),
+        _stage(clean_df_id_format, {"ids": ids}),
+        _stage(clean_df_genre_invalid, {"reject_sentinel": reject_sentinel}),
+        _stage(
+            clean_df_year,
+            value_transforms={"year": clean_value_year},
+            dtypes={"year": "Int32"},
+        ),
+        # `fillna` is cheaper than a transform of (mostly distinct) titles
+        _stage(clean_df_title),
+        _stage(clean_df_genre_coalesce_with_category),
+        *collapse_duplicates,
+    ]
+
+
+def get_cleaning_pipeline(
+    ids: Optional[Union[IdIndex, Collection[str]]] = None,
+    reject_sentinel: bool = False,
+    repair_cache: Optional[RepairCache] = None,
+    fuse: bool = True,
+    artist_index: Optional[ArtistIndex] = None,
+    duplicates: Optional[DuplicateIndex] = None,
+) -> Pipeline:
+    """The cleaning chain as a `Pipeline`; see `get_cleaning_stages()`."""
+    return Pipeline(
+        get_cleaning_stages(
+            ids=ids,
+            reject_sentinel=reject_sentinel,
+            repair_cache=repair_cache,
+            artist_index=artist_index,
+            duplicates=duplicates,
+        ),
+        fuse=fuse,
+    )
+
+
+def exclude_rejected_albums(
+    duplicates: DuplicateIndex, albums_df: pd.DataFrame, **options: Any
+) -> DuplicateIndex:
+    """Exclude the albums the cleaning chain rejects from being representatives.
+
+    `albums_df` has the source rows of (at least) the albums in a cluster of
+    `duplicates`; only those are cleaned, with `get_cleaning_pipeline()` and
+    `options` (e.g. the `ids` and `artist_index` of the whole data set).
+    """
+    members = albums_df[albums_df.index.isin(duplicates.to_frame()["index"])]
+    cleaned = get_cleaning_pipeline(**options).run(members)
+    return duplicates.exclude(cleaned.index[is_rejected(cleaned)])
+
+
+def get_cleaning_steps(
+    ids: Optional[Union[IdIndex, Collection[str]]] = None,
+    reject_sentinel: bool = False,
+    repair_cache: Optional[RepairCache] = None,
+    artist_index: Optional[ArtistIndex] = None,
+    duplicates: Optional[DuplicateIndex] = None,
+) -> List[CleaningStep]:
+    """The cleaning chain as (clean_df_* function, keyword arguments) pairs.
+
+    See `get_cleaning_stages()`; steps are not fused.
+    """
+    return [
+        (stage.func, stage.kwargs)
+        for stage in get_cleaning_stages(
+            ids=ids,
+            reject_sentinel=reject_sentinel,
+            repair_cache=repair_cache,
+            artist_index=artist_index,
+            duplicates=duplicates,
+        )
+    ]
+
+
+def get_step_columns(
+    func: Callable[..., pd.DataFrame], kwargs: Dict[str, Any]
+) -> Optional[List[str]]:
+    """Columns a cleaning step may change, or None if it may change any.
+
+    Steps that reject rows with `reject_sentinel=True` overwrite whole rows.
+    """
+    if func is clean_df_try_to_fix_encoding_errors:
+        return [kwargs["column_name"]]
+    if func not in _STAGE_COLUMNS:
+        return None
+    return _stage(func, kwargs).changed_columns()
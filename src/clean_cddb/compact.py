@@ -0,0 +1,89 @@
+"""compact.py
+
+Memory-optimized ("compact") dtypes for the CDDB frames while cleaning.
+
+* `compact_frame()` converts the low-cardinality text columns
+  (`CATEGORICAL_COLUMNS`) to categoricals, which store each distinct value
+  once plus an integer code per row, and cleans `year` to a nullable
+  `Int16` up front (as `clean_df_year` would, but in 2 bytes per row).
+* The cleaning steps keep these dtypes: value-level transforms run on the
+  categories (see `value_cache.map_categories()`), `reject_rows` adds its
+  sentinel as a category, and `clean_df_genre_invalid` and
+  `clean_df_genre_coalesce_with_category` work on categories and codes.
+* `expand_frame()` converts the columns back to the "str" dtype of a regular
+  run, and widens `year` back to `Int32`, before validation and export, so
+  the outputs don't change.
+* `memory_report()` compares the deep memory footprint of two frames, column
+  by column.
+"""
+
+from typing import Any, Dict, List
+
+import pandas as pd
+
+from .cleaning_transforms import clean_df_year
+
+CATEGORICAL_COLUMNS = ["artist", "category", "genre"]
+COMPACT_YEAR_DTYPE = "Int16"
+CLEAN_YEAR_DTYPE = "Int32"
+
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """`df` with categorical text columns and a cleaned `Int16` year."""
+    new_df = df.astype(
+        {column: "category" for column in CATEGORICAL_COLUMNS if column in df}
+    )
+    if "year" in df:
+        new_df["year"] = clean_df_year(df)["year"].astype(COMPACT_YEAR_DTYPE)
+    return new_df
+
+
+def expand_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """`df` with the columns of `compact_frame()` in their regular dtypes.
+
+    Categorical columns become "str" and an integer `year` `Int32`.
+    """
+    dtypes: Dict[str, Any] = {
+        column: "str"
+        for column in CATEGORICAL_COLUMNS
+        if column in df
+        # Categoricals of different partitions concatenate to object
+        and (
+            isinstance(df[column].dtype, pd.CategoricalDtype)
+            or df[column].dtype == object
+        )
+    }
+    if "year" in df and pd.api.types.is_integer_dtype(df["year"]):
+        dtypes["year"] = CLEAN_YEAR_DTYPE
+    return df.astype(dtypes)
+
+
+def memory_report(before_df: pd.DataFrame, after_df: pd.DataFrame) -> pd.DataFrame:
+    """Dtype and deep memory use of each column of both frames, and totals."""
+    before_bytes = before_df.memory_usage(deep=True)
+    after_bytes = after_df.memory_usage(deep=True)
+    records: List[Dict[str, Any]] = []
+    for column in before_bytes.index.union(after_bytes.index, sort=False):
+        records.append(
+            {
+                "column": column,
+                "dtype_before": _dtype(before_df, column),
+                "bytes_before": before_bytes.get(column),
+                "dtype_after": _dtype(after_df, column),
+                "bytes_after": after_bytes.get(column),
+            }
+        )
+    report = pd.DataFrame(records)
+    report.loc[len(report)] = {
+        "column": "total",
+        "bytes_before": before_bytes.sum(),
+        "bytes_after": after_bytes.sum(),
+    }
+    report["ratio"] = report["bytes_after"] / report["bytes_before"]
+    return report
+
+
+def _dtype(df: pd.DataFrame, column: str) -> Any:
+    if column == "Index":
+        return str(df.index.dtype)
+    return str(df[column].dtype) if column in df else None
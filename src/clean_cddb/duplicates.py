@@ -0,0 +1,373 @@
+"""duplicates.py
+
+Duplicate albums: the same disc submitted under several ids, found by
+MinHash fingerprints and locality-sensitive hashing (LSH) rather than by
+comparing every pair of albums.
+
+* The fingerprint of an album is the set of its normalized track names
+  (split from the "tracks" column with `tracks.AlbumTracks`) plus its
+  normalized artist and title. Text is normalized as by
+  `artist_index.artist_key()`, with punctuation dropped. Placeholder track
+  names ("1", "Track 01", "Data", ...) are left out, as they would make
+  unrelated albums look alike; albums with fewer than `min_tracks` other
+  distinct tracks are not fingerprinted.
+* Each set is summarized by a MinHash signature of `num_perm` values; the
+  signature is cut into `bands` bands, and albums with the same values in a
+  band fall in the same bucket. Two albums whose sets have a Jaccard
+  similarity of s share a bucket with probability 1 - (1 - s^r)^bands, for
+  r = num_perm / bands values per band.
+* Each album is compared with the first album of each bucket it falls in,
+  so at most `bands` comparisons are made per album. A pair is a duplicate
+  if the exact Jaccard similarity of its sets reaches `similarity`.
+  Duplicate pairs are joined into clusters.
+* The representative of a cluster, the album kept by
+  `clean_df_collapse_duplicates`, has the most tracks (then the lowest row
+  index) of the albums not rejected by another cleaning step; the other
+  albums are duplicates. Rejected albums are passed to `duplicate_rows()`,
+  or to `DuplicateIndex.exclude()` when the cleaning chain sees part of the
+  rows at a time (see `cleaning_transforms.exclude_rejected_albums()`), so
+  an album isn't lost when the cleaning rejects its representative.
+* `DuplicateIndex.update()` adds albums (e.g. chunk by chunk; rows are keyed
+  by their index); the clusters are found on first use, after which the
+  index can't be updated.
+* `DuplicateIndex.to_frame()` is the cluster table (`duplicate_clusters`):
+  one row per album in a cluster, with the cluster (the representative's
+  row index), its row index, id, tracks and Jaccard similarity to the
+  representative.
+"""
+
+import re
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .artist_index import artist_key
+from .tracks import AlbumTracks
+from .value_cache import apply_value_transform
+
+DUPLICATES_TABLE = "duplicate_clusters"
+CLUSTER_COLUMNS = ["cluster", "index", "id", "tracks", "jaccard", "is_representative"]
+
+DEFAULT_JACCARD = 0.8
+DEFAULT_NUM_PERM = 64
+DEFAULT_BANDS = 16
+DEFAULT_MIN_TRACKS = 2
+
+# Hash values are reduced modulo a Mersenne prime below 2^31, so
+# `a * x + b` fits in 64 bits
+_PRIME = np.uint64(2**31 - 1)
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+# Tokens hashed at once when computing signatures, bounding memory use
+_BATCH_TOKENS = 200_000
+
+_PUNCTUATION = re.compile(r"[^\w ]")
+# Normalized track names that only number the track
+_PLACEHOLDER_TRACK = re.compile(
+    r"(?:(?:track|title|titel|disk|disc|cd|piste|pista|song|audio|data) ?)?\d*"
+)
+
+
+def normalize_text(value: Any) -> str:
+    """`value` as by `artist_key()`, with punctuation dropped."""
+    if not isinstance(value, str):
+        return ""
+    return " ".join(_PUNCTUATION.sub(" ", artist_key(value)).split())
+
+
+def _normalize_track(value: Any) -> str:
+    name = normalize_text(value)
+    return "" if _PLACEHOLDER_TRACK.fullmatch(name) else name
+
+
+def album_tokens(albums_df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """The fingerprint set of each album, as sorted token hashes.
+
+    Returns the hashes of every album, album by album, the offsets of each
+    album's hashes (as `tracks.AlbumTracks` does for track names) and the
+    number of distinct tracks of each album.
+    """
+    album_tracks = AlbumTracks.from_albums(albums_df)
+    names = apply_value_transform(album_tracks.values, _normalize_track, cache=False)
+    is_named = names.to_numpy() != ""
+    parts = [
+        pd.DataFrame(
+            {
+                "album": album_tracks.album_positions()[is_named],
+                "token": "t " + names.to_numpy(dtype=object)[is_named],
+            }
+        ).drop_duplicates()
+    ]
+    track_counts = np.bincount(parts[0]["album"], minlength=len(albums_df))
+    for prefix, column in [("a", "artist"), ("n", "title")]:
+        values = apply_value_transform(albums_df[column], normalize_text, cache=False)
+        is_named = values.to_numpy() != ""
+        parts.append(
+            pd.DataFrame(
+                {
+                    "album": np.flatnonzero(is_named),
+                    "token": f"{prefix} " + values.to_numpy(dtype=object)[is_named],
+                }
+            )
+        )
+    tokens = pd.concat(parts, ignore_index=True)
+    tokens["hash"] = pd.util.hash_array(tokens["token"].to_numpy(dtype=object))
+    tokens = tokens.drop_duplicates(["album", "hash"]).sort_values(["album", "hash"])
+    counts = np.bincount(tokens["album"], minlength=len(albums_df))
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    return tokens["hash"].to_numpy(dtype=np.uint64), offsets, track_counts
+
+
+def minhash(
+    hashes: np.ndarray, offsets: np.ndarray, a: np.ndarray, b: np.ndarray
+) -> np.ndarray:
+    """The MinHash signature of each (non-empty) set, one row per set.
+
+    `hashes` and `offsets` are as returned by `album_tokens()`; `a` and `b`
+    are the coefficients of the `len(a)` hash functions `(a * x + b) % p`.
+    """
+    n_sets = len(offsets) - 1
+    signatures = np.empty((n_sets, len(a)), dtype=np.uint64)
+    x = hashes % _PRIME
+    start = 0
+    while start < n_sets:
+        # Whole sets, about `_BATCH_TOKENS` tokens at a time
+        stop = np.searchsorted(offsets, offsets[start] + _BATCH_TOKENS, "right") - 1
+        stop = min(max(stop, start + 1), n_sets)
+        first, last = offsets[start], offsets[stop]
+        values = (x[first:last, None] * a + b) % _PRIME
+        signatures[start:stop] = np.minimum.reduceat(
+            values, offsets[start:stop] - first, axis=0
+        )
+        start = stop
+    return signatures
+
+
+def band_keys(signatures: np.ndarray, bands: int) -> np.ndarray:
+    """One hash per band of each signature."""
+    rows = signatures.shape[1] // bands
+    keys = np.zeros((len(signatures), bands), dtype=np.uint64)
+    for band in range(bands):
+        for value in signatures[:, band * rows : (band + 1) * rows].T:
+            keys[:, band] = keys[:, band] * _MIX + value
+    return keys
+
+
+def _jaccard(a: np.ndarray, b: np.ndarray) -> float:
+    shared = len(np.intersect1d(a, b, assume_unique=True))
+    return shared / (len(a) + len(b) - shared)
+
+
+class DuplicateIndex:
+    """MinHash fingerprints of albums, and the clusters of duplicates."""
+
+    def __init__(
+        self,
+        similarity: float = DEFAULT_JACCARD,
+        num_perm: int = DEFAULT_NUM_PERM,
+        bands: int = DEFAULT_BANDS,
+        min_tracks: int = DEFAULT_MIN_TRACKS,
+        seed: int = 0,
+    ) -> None:
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        if min_tracks < 1:
+            raise ValueError("Albums need at least one track to be fingerprinted")
+        self.similarity = similarity
+        self.bands = bands
+        self.min_tracks = min_tracks
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, int(_PRIME), num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(_PRIME), num_perm, dtype=np.uint64)
+        self._rows: List[np.ndarray] = []
+        self._ids: List[np.ndarray] = []
+        self._tracks: List[np.ndarray] = []
+        self._hashes: List[np.ndarray] = []
+        self._counts: List[np.ndarray] = []
+        self._keys: List[np.ndarray] = []
+        self._members: Optional[pd.DataFrame] = None
+        self._member_hashes = np.empty(0, dtype=np.uint64)
+        self._member_offsets = np.zeros(1, dtype=np.int64)
+        self._excluded: Set[Any] = set()
+        self._clusters: Optional[pd.DataFrame] = None
+        self._stats: Dict[str, int] = {}
+
+    @classmethod
+    def from_albums(cls, albums_df: pd.DataFrame, **options: Any) -> "DuplicateIndex":
+        return cls(**options).update(albums_df)
+
+    def update(self, albums_df: pd.DataFrame) -> "DuplicateIndex":
+        """Fingerprint albums (with "id", "artist", "title" and "tracks")."""
+        if self._members is not None:
+            raise ValueError("Albums can't be added once the clusters are found")
+        hashes, offsets, track_counts = album_tokens(albums_df)
+        keep = track_counts >= self.min_tracks
+        counts = np.diff(offsets)[keep]
+        kept_hashes = hashes[np.repeat(keep, np.diff(offsets))]
+        kept_offsets = np.concatenate([[0], np.cumsum(counts)])
+        self._rows.append(albums_df.index.to_numpy()[keep])
+        self._ids.append(albums_df["id"].to_numpy(dtype=object)[keep])
+        self._tracks.append(track_counts[keep])
+        self._hashes.append(kept_hashes)
+        self._counts.append(counts)
+        self._keys.append(
+            band_keys(minhash(kept_hashes, kept_offsets, self._a, self._b), self.bands)
+        )
+        return self
+
+    def __len__(self) -> int:
+        """Albums fingerprinted."""
+        return sum(len(rows) for rows in self._rows)
+
+    def build(self) -> "DuplicateIndex":
+        """Find the clusters of duplicates, if not done yet."""
+        self._get_clusters()
+        return self
+
+    def exclude(self, rows: Iterable[Any]) -> "DuplicateIndex":
+        """Don't pick the albums of `rows` (e.g. rejected) as representatives."""
+        self._excluded.update(rows)
+        self._clusters = None
+        return self
+
+    def _get_clusters(self) -> pd.DataFrame:
+        if self._members is None:
+            self._members = self._find_clusters()
+        if self._clusters is None:
+            self._clusters = self._pick_representatives(self._excluded)
+        return self._clusters
+
+    def _find_clusters(self) -> pd.DataFrame:
+        """The albums in a cluster, with the root album of their cluster."""
+        n_albums = len(self)
+        rows = np.concatenate(self._rows or [np.empty(0, dtype=np.int64)])
+        ids = np.concatenate(self._ids or [np.empty(0, dtype=object)])
+        tracks = np.concatenate(self._tracks or [np.empty(0, dtype=np.int64)])
+        hashes = np.concatenate(self._hashes or [np.empty(0, dtype=np.uint64)])
+        offsets = np.concatenate(
+            [[0], np.cumsum(np.concatenate(self._counts or [np.empty(0, int)]))]
+        )
+        keys = np.concatenate(
+            self._keys or [np.empty((0, self.bands), dtype=np.uint64)]
+        )
+
+        # Candidates: each album and the first album of its bucket, per band
+        pairs = []
+        for band in range(self.bands):
+            order = np.argsort(keys[:, band], kind="stable")
+            sorted_keys = keys[order, band]
+            is_first = np.concatenate([[True], sorted_keys[1:] != sorted_keys[:-1]])
+            firsts = order[
+                np.maximum.accumulate(np.where(is_first, np.arange(n_albums), 0))
+            ]
+            pairs.append(firsts[~is_first] * n_albums + order[~is_first])
+        candidates = np.unique(np.concatenate(pairs or [np.empty(0, dtype=np.int64)]))
+
+        def album_set(album: int) -> np.ndarray:
+            return hashes[offsets[album] : offsets[album + 1]]
+
+        parents = np.arange(n_albums)
+
+        def root(album: int) -> int:
+            while parents[album] != album:
+                parents[album] = parents[parents[album]]
+                album = parents[album]
+            return album
+
+        n_duplicate_pairs = 0
+        for first, second in zip(*np.divmod(candidates, max(n_albums, 1))):
+            if _jaccard(album_set(first), album_set(second)) >= self.similarity:
+                n_duplicate_pairs += 1
+                parents[root(first)] = root(second)
+
+        roots = np.array([root(album) for album in range(n_albums)], dtype=np.int64)
+        in_cluster = np.bincount(roots, minlength=n_albums)[roots] > 1
+        members = pd.DataFrame(
+            {
+                "album": np.flatnonzero(in_cluster),
+                "root": roots[in_cluster],
+                "index": rows[in_cluster],
+                "id": ids[in_cluster],
+                "tracks": tracks[in_cluster],
+            }
+        )
+        # Keep the sets of the albums in a cluster, for their similarity to
+        # the representative
+        sets = [album_set(album) for album in members["album"]]
+        members["album"] = np.arange(len(members))
+        self._member_hashes = np.concatenate(sets or [np.empty(0, dtype=np.uint64)])
+        self._member_offsets = np.concatenate(
+            [[0], np.cumsum([len(album_hashes) for album_hashes in sets])]
+        ).astype(np.int64)
+        self._stats = {
+            "albums": n_albums,
+            "candidate_pairs": len(candidates),
+            "duplicate_pairs": n_duplicate_pairs,
+        }
+        return members
+
+    def _pick_representatives(self, excluded: Set[Any]) -> pd.DataFrame:
+        """The cluster table, picking representatives among albums not `excluded`."""
+        assert self._members is not None
+        hashes, offsets = self._member_hashes, self._member_offsets
+
+        def album_set(album: int) -> np.ndarray:
+            return hashes[offsets[album] : offsets[album + 1]]
+
+        members = self._members.assign(
+            is_excluded=self._members["index"].isin(excluded)
+        )
+        # The representative has the most tracks, then the lowest row index
+        representatives = (
+            members.sort_values(
+                ["root", "is_excluded", "tracks", "index"],
+                ascending=[True, True, False, True],
+            )
+            .drop_duplicates("root")
+            .set_index("root")
+        )
+        members["cluster"] = members["root"].map(representatives["index"])
+        members["jaccard"] = [
+            _jaccard(album_set(album), album_set(representative))
+            for album, representative in zip(
+                members["album"], members["root"].map(representatives["album"])
+            )
+        ]
+        members["is_representative"] = members["index"] == members["cluster"]
+        return (
+            members.sort_values(
+                ["cluster", "is_representative", "index"],
+                ascending=[True, False, True],
+            )
+            .reindex(columns=CLUSTER_COLUMNS)
+            .reset_index(drop=True)
+        )
+
+    def duplicate_rows(self, rejected: Iterable[Any] = ()) -> pd.Index:
+        """Row index of every duplicate (albums in a cluster but its representative).
+
+        Representatives are picked among the albums not `rejected` (nor
+        excluded).
+        """
+        clusters = self._get_clusters()
+        rejected = set(rejected).intersection(clusters["index"]) - self._excluded
+        if rejected:
+            clusters = self._pick_representatives(self._excluded | rejected)
+        return pd.Index(clusters.loc[~clusters["is_representative"], "index"])
+
+    def to_frame(self) -> pd.DataFrame:
+        """The cluster table: one row per album in a cluster."""
+        return self._get_clusters().copy()
+
+    def summary(self) -> pd.DataFrame:
+        """Albums fingerprinted, pairs compared and found, clusters and duplicates."""
+        clusters = self._get_clusters()
+        return pd.DataFrame(
+            [
+                {
+                    **self._stats,
+                    "clusters": clusters["cluster"].nunique(),
+                    "duplicates": int((~clusters["is_representative"]).sum()),
+                }
+            ]
+        )
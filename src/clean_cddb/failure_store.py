@@ -0,0 +1,191 @@
+"""failure_store.py
+
+A normalized store of validation failure cases.
+
+* The check dictionary (`CheckDictionary`, exported as the `failure_checks`
+  table) holds each check once: its integer id, schema context, column,
+  name, number and source code. The schema's own checks, then the checks
+  pandera reports for each column (dtype, nullable, ...) and for the whole
+  frame, get ids in schema order up front, so the ids depend only on the
+  schema: chunked, whole-file and `--full-validation` runs give a check the
+  same id. Checks the schema doesn't declare get the next id when first
+  seen, and keep it once the dictionary is read back with
+  `CheckDictionary.read()`.
+* `normalize()` reduces a `SchemaErrors.failure_cases` frame to the check id,
+  the row index, the failing value and the rule of each failure case; the
+  check's name and source code are no longer repeated on every row.
+* `create_view()` joins a table of normalized failure cases with the
+  dictionary, giving back the wide layout of `failure_cases` (with the
+  "check_source_code" column) for ad-hoc queries.
+* `failure_counts()` counts the failure cases of a table by column and check
+  with one aggregate query, e.g. for the summary tables.
+"""
+
+import sqlite3
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from .incremental import table_exists
+from .schema import check_description
+
+if TYPE_CHECKING:
+    import pandera as pa
+
+CHECKS_TABLE = "failure_checks"
+CHECK_KEY_COLUMNS = ["schema_context", "column", "check", "check_number"]
+CHECK_COLUMNS = ["check_id", *CHECK_KEY_COLUMNS, "check_source_code"]
+FAILURE_COLUMNS = ["check_id", "index", "failure_case", "rule"]
+
+CheckKey = Tuple[Optional[str], Optional[str], str, Optional[int]]
+
+
+def _key(schema_context: Any, column: Any, check: Any, check_number: Any) -> CheckKey:
+    return (
+        None if pd.isna(schema_context) else str(schema_context),
+        None if pd.isna(column) else str(column),
+        str(check),
+        None if pd.isna(check_number) else int(check_number),
+    )
+
+
+class CheckDictionary:
+    """Integer ids of checks, and the source code of each check once."""
+
+    def __init__(self, checks: Optional[pd.DataFrame] = None) -> None:
+        self._ids: Dict[CheckKey, int] = {}
+        self._sources: List[Optional[str]] = []
+        if checks is not None:
+            for row in checks.sort_values("check_id").itertuples(index=False):
+                source = row.check_source_code
+                self.add(
+                    _key(row.schema_context, row.column, row.check, row.check_number),
+                    None if pd.isna(source) else source,
+                )
+
+    @classmethod
+    def from_schema(cls, schema: "pa.DataFrameSchema") -> "CheckDictionary":
+        """A dictionary of the checks of `schema`, in schema order.
+
+        The columns' checks come first, then each column's dtype, nullable
+        and unique checks, then the schema-level checks.
+        """
+        checks = cls()
+        for column_name, column_obj in schema.columns.items():
+            for check_number, check in enumerate(column_obj.checks):
+                checks.add(
+                    ("Column", column_name, check.name, check_number),
+                    check.description or check_description(check.name),
+                )
+        for column_name, column_obj in schema.columns.items():
+            if column_obj.dtype is not None:
+                if column_obj.coerce or schema.coerce:
+                    checks.add(
+                        (
+                            "Column",
+                            column_name,
+                            f"coerce_dtype('{column_obj.dtype}')",
+                            None,
+                        )
+                    )
+                checks.add(
+                    ("Column", column_name, f"dtype('{column_obj.dtype}')", None)
+                )
+            if not column_obj.nullable:
+                checks.add(("Column", column_name, "not_nullable", None))
+            if column_obj.unique:
+                checks.add(("Column", column_name, "field_uniqueness", None))
+        schema_name = None if schema.name is None else str(schema.name)
+        for check_number, check in enumerate(schema.checks):
+            checks.add(
+                ("DataFrameSchema", schema_name, check.name, check_number),
+                check.description or check_description(check.name),
+            )
+        checks.add(("DataFrameSchema", schema_name, "column_in_dataframe", None))
+        return checks
+
+    @classmethod
+    def read(cls, conn: sqlite3.Connection) -> Optional["CheckDictionary"]:
+        """The dictionary stored in `CHECKS_TABLE`, or None if there is none."""
+        if not table_exists(conn, CHECKS_TABLE):
+            return None
+        columns = ", ".join(f'"{column}"' for column in CHECK_COLUMNS)
+        return cls(pd.read_sql(f"SELECT {columns} FROM {CHECKS_TABLE}", conn))
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, key: CheckKey, source: Optional[str] = None) -> int:
+        """The id of check `key`, adding it (with `source`) if it is new."""
+        if key not in self._ids:
+            self._ids[key] = len(self._ids)
+            self._sources.append(source)
+        return self._ids[key]
+
+    def ids(self, failure_cases: pd.DataFrame) -> pd.Series:
+        """The check id of each failure case, adding new checks."""
+        keys = failure_cases.reindex(columns=CHECK_KEY_COLUMNS)
+        distinct = keys.drop_duplicates()
+        check_ids = [
+            self.add(key, check_description(key[2]))
+            for key in (_key(*row) for row in distinct.itertuples(index=False))
+        ]
+        return (
+            keys.merge(
+                distinct.assign(check_id=check_ids), on=CHECK_KEY_COLUMNS, how="left"
+            )["check_id"]
+            .astype("int64")
+            .set_axis(failure_cases.index)
+        )
+
+    def to_frame(self) -> pd.DataFrame:
+        """One row per check, ordered by id (the `CHECKS_TABLE` layout)."""
+        records = [
+            (check_id, *key, self._sources[check_id])
+            for key, check_id in self._ids.items()
+        ]
+        return pd.DataFrame(records, columns=CHECK_COLUMNS).astype(
+            {"check_id": "int64", "check_number": "Int64"}
+        )
+
+
+def normalize(failure_cases: pd.DataFrame, checks: CheckDictionary) -> pd.DataFrame:
+    """`failure_cases` with a check id in place of the check's columns.
+
+    Has the `FAILURE_COLUMNS`; "rule" is empty unless `failure_cases` has it.
+    """
+    return (
+        failure_cases.assign(check_id=checks.ids(failure_cases))
+        .reindex(columns=FAILURE_COLUMNS)
+        .reset_index(drop=True)
+    )
+
+
+def create_view(conn: sqlite3.Connection, table: str, view: str) -> None:
+    """Create `view`, the failure cases of `table` joined with their checks."""
+    conn.execute(
+        f'CREATE VIEW IF NOT EXISTS "{view}" AS '
+        'SELECT c.schema_context, c."column", c."check", c.check_number, '
+        'f.failure_case, f."index", c.check_source_code, f.rule '
+        f'FROM "{table}" AS f JOIN {CHECKS_TABLE} AS c USING (check_id)'
+    )
+
+
+def failure_counts(
+    conn: sqlite3.Connection, table: str, source_code: bool = False
+) -> pd.DataFrame:
+    """Failure cases of `table` by column and check, as "counts".
+
+    Ordered by column and check. With `source_code`, adds the checks'
+    "check_source_code" (empty for checks without one, e.g. dtype checks).
+    """
+    source_column = ", MAX(c.check_source_code) AS check_source_code"
+    counts: pd.DataFrame = pd.read_sql(
+        'SELECT c."column", c."check", COUNT(*) AS counts'
+        f"{source_column if source_code else ''} "
+        f'FROM "{table}" AS f JOIN {CHECKS_TABLE} AS c USING (check_id) '
+        'GROUP BY c."column", c."check" '
+        'ORDER BY c."column" IS NULL, c."column", c."check"',
+        conn,
+    )
+    return counts
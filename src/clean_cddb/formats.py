@@ -0,0 +1,257 @@
+"""formats.py
+
+Parquet and Arrow IPC input and output for the CDDB data sets.
+
+* `read_source()` reads the source from `cddb.tsv`, a Parquet file or an
+  Arrow IPC (Feather) file, chosen by file extension, as "str" columns with
+  a row-position index. `read_source_chunks()` does the same in chunks.
+  Parquet and Arrow reads only load the columns asked for.
+* The TSV can be compressed (`.zip`, `.gz` or `.zst`); `open_tsv()`
+  decompresses it as it is read, so no extracted copy is written to disk.
+  Zip archives must hold one data file; macOS metadata (`__MACOSX/`, `._*`)
+  is skipped. Uncompressed TSVs are memory-mapped.
+* `convert_tsv_to_parquet()` converts the TSV once, chunk by chunk, so later
+  runs skip parsing the latin1 text.
+* With pandas 3 and pyarrow installed, "str" columns are Arrow-backed
+  (`pd.StringDtype("pyarrow", na_value=np.nan)`) and take much less memory
+  than Python object strings. They keep the NaN semantics of "str" through
+  the cleaning chain, unlike `string[pyarrow]` with `pd.NA`.
+* `write_parquet_chunk()` adds a frame to a Parquet dataset directory,
+  optionally hive-partitioned (e.g., `clean_df/category=rock/...`), one file
+  per chunk and partition, so downstream jobs can prune partitions and
+  columns.
+* pyarrow is optional (`pip install clean-cddb[parquet]`); Parquet and Arrow
+  functions raise ImportError without it. So is zstandard for `.zst` files
+  (`clean-cddb[zstd]`).
+"""
+
+import contextlib
+import gzip
+import shutil
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import IO, Any, Iterator, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency
+    pa = None  # type: ignore[assignment,unused-ignore]
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None  # type: ignore[assignment,unused-ignore]
+
+PARQUET_EXTENSIONS = {".parquet", ".pq"}
+ARROW_EXTENSIONS = {".arrow", ".feather", ".ipc"}
+COMPRESSION_EXTENSIONS = {
+    ".zip": "zip",
+    ".gz": "gzip",
+    ".gzip": "gzip",
+    ".zst": "zstd",
+    ".zstd": "zstd",
+}
+
+DEFAULT_CHUNKSIZE = 100_000
+
+
+def require_pyarrow() -> None:
+    if pa is None:
+        raise ImportError(
+            "Parquet and Arrow files need pyarrow: "
+            "pip install 'clean-cddb[parquet]' (or pyarrow)"
+        )
+
+
+def source_format(filepath: str) -> str:
+    """ "tsv", "parquet" or "arrow", from the file extension."""
+    suffix = Path(filepath).suffix.lower()
+    if suffix in PARQUET_EXTENSIONS:
+        return "parquet"
+    if suffix in ARROW_EXTENSIONS:
+        return "arrow"
+    return "tsv"
+
+
+def compression(filepath: str) -> Optional[str]:
+    """ "zip", "gzip" or "zstd", from the file extension, or None."""
+    return COMPRESSION_EXTENSIONS.get(Path(filepath).suffix.lower())
+
+
+def _zip_member(archive: zipfile.ZipFile) -> str:
+    """The one data file in `archive`, ignoring macOS metadata."""
+    names = [
+        info.filename
+        for info in archive.infolist()
+        if not info.is_dir()
+        and not info.filename.startswith("__MACOSX/")
+        and not PurePosixPath(info.filename).name.startswith("._")
+    ]
+    if len(names) != 1:
+        raise ValueError(f"Expected one data file in {archive.filename}, found {names}")
+    return names[0]
+
+
+@contextlib.contextmanager
+def open_tsv(filepath: str) -> Iterator[Union[str, IO[bytes], gzip.GzipFile]]:
+    """The TSV at `filepath` as a path, or as a stream that decompresses it."""
+    kind = compression(filepath)
+    if kind is None:
+        yield filepath
+    elif kind == "zip":
+        with zipfile.ZipFile(filepath) as archive:
+            with archive.open(_zip_member(archive)) as f:
+                yield f
+    elif kind == "gzip":
+        with gzip.open(filepath, "rb") as f:
+            yield f
+    else:
+        if zstandard is None:
+            raise ImportError(
+                "zstd files need zstandard: "
+                "pip install 'clean-cddb[zstd]' (or zstandard)"
+            )
+        with open(filepath, "rb") as raw:
+            with zstandard.ZstdDecompressor().stream_reader(raw) as f:
+                yield f
+
+
+def _read_tsv(source: Union[str, IO[bytes], gzip.GzipFile], **kwargs: Any) -> Any:
+    return pd.read_csv(
+        source,
+        sep="\t",
+        dtype="str",
+        encoding="latin1",
+        # Only file paths can be memory-mapped
+        memory_map=isinstance(source, str),
+        **kwargs,
+    )
+
+
+def as_str_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """`df` with string columns, as `read_csv(dtype="str")` reads them.
+
+    Missing values stay missing; `astype("str")` alone turns them into
+    "nan" and "None" on pandas 2.
+    """
+    return df.astype("str").where(df.notna())
+
+
+def _to_str_frame(table: "pa.Table", start: int = 0) -> pd.DataFrame:
+    df = as_str_columns(table.to_pandas())
+    df.index = pd.RangeIndex(start, start + len(df))
+    return df
+
+
+def read_source(filepath: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Read the CDDB source file as string-typed columns."""
+    file_format = source_format(filepath)
+    if file_format == "tsv":
+        with open_tsv(filepath) as source:
+            df: pd.DataFrame = _read_tsv(source, usecols=columns)
+        return df
+    require_pyarrow()
+    if file_format == "parquet":
+        return _to_str_frame(pq.read_table(filepath, columns=columns))
+    with pa.memory_map(filepath) as source:
+        table = pyarrow.ipc.open_file(source).read_all()
+    return _to_str_frame(table.select(columns) if columns else table)
+
+
+def read_source_chunks(
+    filepath: str,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    columns: Optional[List[str]] = None,
+) -> Iterator[pd.DataFrame]:
+    """Yield the source file as frames of at most `chunksize` rows.
+
+    Each chunk keeps the global row index, as with a whole-file read.
+    """
+    file_format = source_format(filepath)
+    if file_format == "tsv":
+        with open_tsv(filepath) as source:
+            with _read_tsv(source, chunksize=chunksize, usecols=columns) as reader:
+                yield from reader
+        return
+
+    require_pyarrow()
+    start = 0
+    if file_format == "parquet":
+        batches = pq.ParquetFile(filepath).iter_batches(
+            batch_size=chunksize, columns=columns
+        )
+        for batch in batches:
+            yield _to_str_frame(pa.Table.from_batches([batch]), start)
+            start += batch.num_rows
+        return
+
+    # Memory-mapped, so slicing doesn't load the rest of the file
+    with pa.memory_map(filepath) as source:
+        table = pyarrow.ipc.open_file(source).read_all()
+        if columns:
+            table = table.select(columns)
+        for start in range(0, table.num_rows, chunksize):
+            yield _to_str_frame(table.slice(start, chunksize), start)
+
+
+def convert_tsv_to_parquet(
+    tsv_path: str, parquet_path: str, chunksize: int = DEFAULT_CHUNKSIZE
+) -> int:
+    """Convert the CDDB TSV to a single Parquet file; returns the row count."""
+    require_pyarrow()
+    writer = None
+    n_rows = 0
+    try:
+        for chunk in read_source_chunks(tsv_path, chunksize):
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(parquet_path, table.schema)
+            writer.write_table(table)
+            n_rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return n_rows
+
+
+def _arrow_compatible(df: pd.DataFrame) -> pd.DataFrame:
+    """Cast object columns of mixed types (e.g. "failure_case") to strings."""
+    df = df.infer_objects()
+    mixed = [column for column, dtype in df.dtypes.items() if dtype == np.dtype("O")]
+    return df.astype({column: "str" for column in mixed})
+
+
+def write_parquet_chunk(
+    df: pd.DataFrame,
+    dataset_dir: str,
+    partition_cols: Optional[List[str]] = None,
+    part: int = 0,
+    append: bool = False,
+    index: bool = False,
+) -> None:
+    """Add `df` to the Parquet dataset in `dataset_dir` as part `part`.
+
+    Replaces any existing dataset unless `append`. With `index`, the frame's
+    index is written as an "index" column, as `to_sql` does.
+    """
+    require_pyarrow()
+    if not append:
+        shutil.rmtree(dataset_dir, ignore_errors=True)
+    if index:
+        df = df.rename_axis("index").reset_index()
+    table = pa.Table.from_pandas(_arrow_compatible(df), preserve_index=False)
+    ds.write_dataset(
+        table,
+        dataset_dir,
+        format="parquet",
+        partitioning=partition_cols or None,
+        partitioning_flavor="hive" if partition_cols else None,
+        basename_template=f"part-{part}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+    )
@@ -0,0 +1,99 @@
+"""id_index.py
+
+Hash index of album ids for `clean_df_id_format`.
+
+* Short ids (those failing `check_id_six_digit_starting_one`) are
+  reformatted as `int(id) + 100000`.
+* A reformatted id is only assigned if it is not already an id in the data
+  set and no other short id in the data set reformats to the same value.
+  Otherwise the row keeps its id and is reported as skipped.
+* The index is built once per data set (`IdIndex.from_ids()`, or
+  `IdIndex.update()` chunk by chunk) with hash lookups, so whether an id is
+  remapped depends only on the id and the index, not on the chunk or
+  partition it is processed in.
+"""
+
+from collections import Counter
+from typing import Iterable, Set
+
+import pandas as pd
+
+from . import vectorized_checks
+
+REMAPPED = "remapped"
+SKIPPED_EXISTING_ID = "skipped: reformatted id already exists"
+SKIPPED_DUPLICATE_ID = "skipped: several ids reformat to the same id"
+
+
+def _short_ids(ids: pd.Series) -> pd.Series:
+    """Ids that `clean_df_id_format` reformats.
+
+    Only non-null strings of digits are considered, which skips
+    "REJECT_ROW" markers.
+    """
+    ids = ids.dropna().astype(object)
+    if pd.api.types.infer_dtype(ids) != "string":
+        ids = ids[ids.map(lambda value: isinstance(value, str)).astype(bool)]
+    digit_ids = ids[ids.str.isdigit().astype(bool)]
+    return digit_ids[~vectorized_checks.check_id_six_digit_starting_one(digit_ids)]
+
+
+def _reformat(short_ids: pd.Series) -> pd.Series:
+    numbers = pd.to_numeric(short_ids, errors="coerce")
+    if numbers.isna().any() or numbers.dtype.kind not in "iu":
+        # Non-ASCII digits or ids beyond int64; let `int()` handle them
+        return short_ids.map(lambda x: str(int(x) + 100000))
+    return (numbers + 100000).astype(str).astype(object)
+
+
+def reformat_short_ids(ids: pd.Series) -> pd.Series:
+    """Reformat the short ids in `ids`; other ids are left out of the result."""
+    return _reformat(_short_ids(ids))
+
+
+class IdIndex:
+    """Album ids and the reformatted ids that short ids would map to."""
+
+    def __init__(self) -> None:
+        self.ids: Set[str] = set()
+        self.target_counts: "Counter[str]" = Counter()
+
+    @classmethod
+    def from_ids(cls, ids: Iterable[str]) -> "IdIndex":
+        return cls().update(pd.Series(list(ids), dtype=object))
+
+    def update(self, ids: pd.Series) -> "IdIndex":
+        """Add a column (or chunk of a column) of ids to the index."""
+        self.ids.update(ids.dropna())
+        self.target_counts.update(reformat_short_ids(ids))
+        return self
+
+    def __contains__(self, id_: object) -> bool:
+        return id_ in self.ids
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def remap(self, ids: pd.Series) -> pd.DataFrame:
+        """Plan the reformatting of the short ids in `ids`.
+
+        Returns one row per short id with its "original_id", "formatted_id"
+        and "status" (remapped or why it was skipped), indexed like `ids`.
+        """
+        short_ids = _short_ids(ids)
+        formatted_ids = _reformat(short_ids)
+        in_index = formatted_ids.isin(self.ids)
+        # Also catch duplicates within `ids` in case they were not indexed
+        target_counts = formatted_ids.map(self.target_counts).fillna(0)
+        is_duplicate = (target_counts > 1) | formatted_ids.duplicated(keep=False)
+
+        status = pd.Series(REMAPPED, index=formatted_ids.index, dtype=object)
+        status[is_duplicate] = SKIPPED_DUPLICATE_ID
+        status[in_index] = SKIPPED_EXISTING_ID
+        return pd.DataFrame(
+            {
+                "original_id": short_ids,
+                "formatted_id": formatted_ids,
+                "status": status,
+            }
+        )
@@ -0,0 +1,190 @@
+"""incremental.py
+
+Helpers for incremental runs that only clean new or changed rows.
+
+* `hash_rows()` hashes every source row, keyed by its (unique) album id. The
+  hash also covers the row's id remapping (see `IdIndex.remap()`), so a row
+  is reprocessed when a new or deleted id changes how its id is reformatted.
+* The hashes and row positions of the last run are stored in the
+  `row_hashes` table of the output database. `diff_row_hashes()` compares
+  them with the current file and labels each id as new, changed, unchanged
+  or deleted.
+* Output tables are keyed by the source row position ("index" or "row_id").
+  `lookup_rows()` finds values in the rows of changed ids, `delete_rows()`
+  removes the rows of changed and deleted ids, `move_rows()` renumbers
+  unchanged rows whose position in the file changed, and `insert_df()`
+  appends the newly cleaned rows. These only issue SQL; none of them
+  commits, so a caller can apply a whole delta in one transaction.
+"""
+
+import sqlite3
+from typing import Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .id_index import IdIndex
+from .sqlite_export import insert_rows
+
+ROW_HASHES_TABLE = "row_hashes"
+
+NEW = "new"
+CHANGED = "changed"
+UNCHANGED = "unchanged"
+DELETED = "deleted"
+
+_KEYS_TABLE = "_incremental_keys"
+_MOVES_TABLE = "_incremental_moves"
+
+
+def hash_rows(source_df: pd.DataFrame, ids: IdIndex) -> pd.DataFrame:
+    """Hash and position of each source row, indexed by album id.
+
+    Raises:
+        ValueError: if ids are missing or duplicated, as rows could not be
+            matched with the previous run.
+    """
+    if source_df["id"].isna().any() or not source_df["id"].is_unique:
+        raise ValueError("Incremental runs need unique, non-null album ids")
+    remap = ids.remap(source_df["id"]).reindex(source_df.index)
+    hashed_df = source_df.assign(
+        _formatted_id=remap["formatted_id"], _remap_status=remap["status"]
+    )
+    row_hash = pd.util.hash_pandas_object(hashed_df, index=False)
+    return pd.DataFrame(
+        {
+            # SQLite integers are signed
+            "row_hash": row_hash.to_numpy().view(np.int64),
+            "row_index": source_df.index.to_numpy(),
+        },
+        index=pd.Index(source_df["id"].to_numpy(), name="id"),
+    )
+
+
+def table_exists(conn: sqlite3.Connection, table: str) -> bool:
+    query = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?"
+    return conn.execute(query, (table,)).fetchone() is not None
+
+
+def load_row_hashes(conn: sqlite3.Connection) -> Optional[pd.DataFrame]:
+    """Row hashes of the previous run, or None if there are none."""
+    if not table_exists(conn, ROW_HASHES_TABLE):
+        return None
+    return pd.read_sql(
+        f"SELECT id, row_hash, row_index FROM {ROW_HASHES_TABLE}",
+        conn,
+        index_col="id",
+    )
+
+
+def save_row_hashes(conn: sqlite3.Connection, row_hashes: pd.DataFrame) -> None:
+    """Insert or replace `row_hashes` (indexed by id) in the `row_hashes` table."""
+    conn.execute(
+        f"CREATE TABLE IF NOT EXISTS {ROW_HASHES_TABLE} "
+        "(id TEXT PRIMARY KEY, row_hash INTEGER NOT NULL, row_index INTEGER NOT NULL)"
+    )
+    conn.executemany(
+        f"INSERT OR REPLACE INTO {ROW_HASHES_TABLE} (id, row_hash, row_index) "
+        "VALUES (?, ?, ?)",
+        zip(
+            row_hashes.index.tolist(),
+            row_hashes["row_hash"].tolist(),
+            row_hashes["row_index"].tolist(),
+        ),
+    )
+
+
+def drop_row_hashes(conn: sqlite3.Connection) -> None:
+    conn.execute(f"DROP TABLE IF EXISTS {ROW_HASHES_TABLE}")
+
+
+def diff_row_hashes(current: pd.DataFrame, previous: pd.DataFrame) -> pd.DataFrame:
+    """Compare the row hashes of two runs.
+
+    Returns one row per id in either run with the current and previous
+    "row_hash" and "row_index" (nullable integers) and a "status" of new,
+    changed, unchanged or deleted.
+    """
+    delta = (
+        current.astype("Int64")
+        .join(previous.astype("Int64"), how="outer", rsuffix="_previous")
+        .rename_axis("id")
+    )
+    is_new = delta["row_hash_previous"].isna()
+    is_deleted = delta["row_hash"].isna()
+    is_changed = (delta["row_hash"] != delta["row_hash_previous"]).fillna(False)
+
+    status = pd.Series(UNCHANGED, index=delta.index, dtype=object)
+    status[is_changed] = CHANGED
+    status[is_new] = NEW
+    status[is_deleted] = DELETED
+    return delta.assign(status=status)
+
+
+def _fill_keys_table(
+    conn: sqlite3.Connection,
+    table: str,
+    columns: List[str],
+    rows: Iterable[Tuple[Any, ...]],
+) -> None:
+    conn.execute(f"DROP TABLE IF EXISTS temp.{table}")
+    conn.execute(f"CREATE TEMP TABLE {table} ({', '.join(columns)})")
+    conn.executemany(
+        f"INSERT INTO {table} VALUES ({', '.join('?' * len(columns))})", rows
+    )
+    conn.execute(f"CREATE INDEX temp.ix_{table} ON {table} ({columns[0]})")
+
+
+def lookup_rows(
+    conn: sqlite3.Connection,
+    table: str,
+    column: str,
+    key_column: str,
+    keys: Iterable[object],
+) -> List[object]:
+    """Values of `column` in the rows of `table` whose `key_column` is in `keys`."""
+    _fill_keys_table(conn, _KEYS_TABLE, ["key"], ((key,) for key in keys))
+    cursor = conn.execute(
+        f'SELECT "{column}" FROM "{table}" '
+        f'WHERE "{key_column}" IN (SELECT key FROM {_KEYS_TABLE})'
+    )
+    return [value for (value,) in cursor]
+
+
+def delete_rows(
+    conn: sqlite3.Connection, table: str, column: str, values: Iterable[object]
+) -> int:
+    """Delete the rows of `table` whose `column` is in `values`."""
+    _fill_keys_table(conn, _KEYS_TABLE, ["key"], ((value,) for value in values))
+    cursor = conn.execute(
+        f'DELETE FROM "{table}" WHERE "{column}" IN (SELECT key FROM {_KEYS_TABLE})'
+    )
+    return cursor.rowcount
+
+
+def move_rows(
+    conn: sqlite3.Connection, table: str, column: str, moves: pd.Series
+) -> int:
+    """Replace `column` values with `moves` (new values indexed by old values).
+
+    Uses `UPDATE ... FROM`, which needs SQLite 3.33 or later.
+    """
+    _fill_keys_table(
+        conn,
+        _MOVES_TABLE,
+        ["old", "new"],
+        zip(moves.index.tolist(), moves.tolist()),
+    )
+    cursor = conn.execute(
+        f'UPDATE "{table}" SET "{column}" = {_MOVES_TABLE}.new '
+        f'FROM {_MOVES_TABLE} WHERE "{table}"."{column}" = {_MOVES_TABLE}.old'
+    )
+    return cursor.rowcount
+
+
+def insert_df(conn: sqlite3.Connection, table: str, df: pd.DataFrame) -> None:
+    """Append `df` and its index to a table created from a similar frame.
+
+    Unlike `DataFrame.to_sql`, this does not commit.
+    """
+    insert_rows(conn, table, df)
@@ -0,0 +1,301 @@
+"""overlap.py
+
+Overlapped I/O: read ahead and write in the background while the main thread
+validates and cleans.
+
+* `prefetch()` produces the items of an iterator (e.g. the chunks of
+  `streaming.read_source_chunks()`) in a background thread, up to `depth`
+  items ahead, so the next chunk is parsed while the current one is cleaned.
+* `BackgroundWriter` runs writes (CSV and Parquet files, the summary table,
+  ...) in a bounded thread pool while the main thread goes on, e.g. loading
+  the SQLite tables. Writes with the same key (e.g. to the same file) run in
+  the order they were submitted. `submit()` blocks while `max_pending`
+  writes are waiting, which bounds the memory held by frames not yet
+  written.
+* `OverlapReport` records the wall and CPU time of each background task and
+  how long the main thread waited for background work, and estimates the
+  wall time saved compared with a serial run as a range. Python code holds
+  the GIL, so background tasks that mostly run Python (e.g. formatting CSV)
+  take turns with the main thread rather than run alongside it, while work
+  that releases the GIL (SQLite, the CSV tokenizer, the disk) does overlap.
+  The high end, the tasks' CPU time less the time waited for them, assumes
+  they didn't slow the main thread down; the low end, the CPU time of the
+  process beyond the wall time elapsed, counts only work that ran on
+  another core, not time saved waiting for the disk. Benchmark both ways
+  (`scripts/run_benchmarks.py`) to measure it.
+* An exception of a background task is raised in the main thread by the
+  next `submit()` or `wait()` (or, for `prefetch()`, in place of the item).
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+import pandas as pd
+
+T = TypeVar("T")
+
+DEFAULT_PREFETCH_DEPTH = 1
+DEFAULT_WRITE_WORKERS = 4
+DEFAULT_MAX_PENDING_WRITES = 8
+
+_REPORT_COLUMNS = [
+    "kind",
+    "tasks",
+    "task_wall_seconds",
+    "task_cpu_seconds",
+    "waited_seconds",
+    "saved_seconds",
+]
+
+
+class OverlapReport:
+    """Time of background tasks, time waited for them, and time saved."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.tasks: List[Dict[str, Any]] = []
+        self.waits: Dict[str, float] = {}
+        self._started = (time.perf_counter(), time.process_time())
+        self._stopped: Optional[Tuple[float, float]] = None
+
+    def add_task(self, kind: str, name: str, **measurements: Any) -> None:
+        """Record a background task with its "wall_seconds" and "cpu_seconds"."""
+        with self._lock:
+            self.tasks.append({"kind": kind, "stage": name, **measurements})
+
+    def add_wait(self, kind: str, seconds: float) -> None:
+        with self._lock:
+            self.waits[kind] = self.waits.get(kind, 0.0) + seconds
+
+    def stop(self) -> None:
+        """End the measured time; until then, it is measured up to now."""
+        if self._stopped is None:
+            self._stopped = (time.perf_counter(), time.process_time())
+
+    def _measured(self) -> Tuple[float, float]:
+        """Wall and CPU time of the process since the report was made."""
+        stopped = self._stopped or (time.perf_counter(), time.process_time())
+        return stopped[0] - self._started[0], stopped[1] - self._started[1]
+
+    @property
+    def elapsed_seconds(self) -> float:
+        return self._measured()[0]
+
+    @property
+    def cpu_seconds(self) -> float:
+        """CPU time of all the threads of the process."""
+        return self._measured()[1]
+
+    def summary(self) -> pd.DataFrame:
+        """Per kind of task: tasks, their time, time waited and time saved.
+
+        "saved_seconds" is the high end of the estimate; the "total" row adds
+        them up.
+        """
+        with self._lock:
+            tasks = pd.DataFrame(
+                self.tasks, columns=["kind", "wall_seconds", "cpu_seconds"]
+            )
+            waits = dict(self.waits)
+        report = (
+            tasks.groupby("kind", sort=False)
+            .agg(
+                tasks=("kind", "size"),
+                task_wall_seconds=("wall_seconds", "sum"),
+                task_cpu_seconds=("cpu_seconds", "sum"),
+            )
+            .reindex(list(dict.fromkeys([*tasks["kind"], *waits])), fill_value=0)
+            .rename_axis("kind")
+            .reset_index()
+        )
+        report["waited_seconds"] = report["kind"].map(waits).fillna(0.0)
+        report["saved_seconds"] = report["task_cpu_seconds"] - report["waited_seconds"]
+        report.loc[len(report)] = {
+            "kind": "total",
+            **report.drop(columns="kind").sum().to_dict(),
+        }
+        return report.reindex(columns=_REPORT_COLUMNS).astype({"tasks": "int64"})
+
+    def saved_seconds(self) -> Tuple[float, float]:
+        """The low and high end of the estimated wall time saved."""
+        elapsed, cpu = self._measured()
+        high = max(0.0, float(self.summary()["saved_seconds"].iloc[-1]))
+        return min(max(0.0, cpu - elapsed), high), high
+
+
+def _put(items: "queue.Queue[Any]", item: Any, stop: threading.Event) -> None:
+    """Put `item`, giving up if `stop` is set while `items` is full."""
+    while not stop.is_set():
+        try:
+            items.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            continue
+
+
+def prefetch(
+    items: Iterable[T],
+    depth: int = DEFAULT_PREFETCH_DEPTH,
+    report: Optional[OverlapReport] = None,
+    name: str = "read",
+) -> Iterator[T]:
+    """Yield from `items`, producing up to `depth` items ahead in a thread.
+
+    Producing each item is recorded in `report` as a task of kind `name`,
+    and the time spent waiting for it as a wait.
+    """
+    produced: "queue.Queue[Any]" = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    done = object()
+
+    def produce() -> None:
+        iterator = iter(items)
+        try:
+            while not stop.is_set():
+                start = time.perf_counter()
+                cpu_start = time.thread_time()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    _put(produced, (done, None), stop)
+                    return
+                except BaseException as err:
+                    _put(produced, (err, None), stop)
+                    return
+                if report is not None:
+                    report.add_task(
+                        name,
+                        name,
+                        wall_seconds=time.perf_counter() - start,
+                        cpu_seconds=time.thread_time() - cpu_start,
+                    )
+                _put(produced, (None, item), stop)
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    thread = threading.Thread(target=produce, name=f"prefetch {name}", daemon=True)
+    thread.start()
+    try:
+        while True:
+            start = time.perf_counter()
+            status, item = produced.get()
+            if report is not None:
+                report.add_wait(name, time.perf_counter() - start)
+            if status is done:
+                return
+            if status is not None:
+                raise status
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+class BackgroundWriter:
+    """Run writes in a bounded thread pool, in order per key."""
+
+    def __init__(
+        self,
+        max_workers: int = DEFAULT_WRITE_WORKERS,
+        max_pending: int = DEFAULT_MAX_PENDING_WRITES,
+        report: Optional[OverlapReport] = None,
+    ) -> None:
+        self.report = report if report is not None else OverlapReport()
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="writer")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._last: Dict[str, "Future[None]"] = {}
+        self._futures: List["Future[None]"] = []
+
+    def submit(
+        self,
+        name: str,
+        func: Callable[[], Any],
+        key: Optional[str] = None,
+        **measurements: Any,
+    ) -> "Future[None]":
+        """Run `func()` in the background, after earlier writes of `key`.
+
+        `key` defaults to `name`, the stage the task is recorded as;
+        `measurements` (e.g. "rows") are added to its record.
+        """
+        self._raise_errors()
+        key = name if key is None else key
+        start = time.perf_counter()
+        self._slots.acquire()
+        self.report.add_wait("write", time.perf_counter() - start)
+        previous = self._last.get(key)
+        future = self._executor.submit(self._run, name, func, previous, measurements)
+        self._last[key] = future
+        self._futures.append(future)
+        return future
+
+    def _run(
+        self,
+        name: str,
+        func: Callable[[], Any],
+        previous: "Optional[Future[None]]",
+        measurements: Dict[str, Any],
+    ) -> None:
+        try:
+            # Submitted earlier, so already running or done: this can't deadlock
+            if previous is not None:
+                previous.result()
+            start = time.perf_counter()
+            cpu_start = time.thread_time()
+            func()
+            self.report.add_task(
+                "write",
+                name,
+                **measurements,
+                wall_seconds=time.perf_counter() - start,
+                cpu_seconds=time.thread_time() - cpu_start,
+            )
+        finally:
+            self._slots.release()
+
+    def _raise_errors(self) -> None:
+        for future in self._futures:
+            error = future.exception() if future.done() else None
+            if error is not None:
+                raise error
+        self._futures = [future for future in self._futures if not future.done()]
+
+    def wait(self) -> None:
+        """Wait for every write submitted so far; raise the first error."""
+        start = time.perf_counter()
+        futures, self._futures = self._futures, []
+        try:
+            for future in futures:
+                future.result()
+        finally:
+            self.report.add_wait("write", time.perf_counter() - start)
+            self._last.clear()
+
+    def close(self) -> None:
+        """Wait for the pending writes and stop the threads."""
+        try:
+            self.wait()
+        finally:
+            self._executor.shutdown()
+            self.report.stop()
+
+    def __enter__(self) -> "BackgroundWriter":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
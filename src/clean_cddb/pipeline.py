@@ -0,0 +1,208 @@
+"""pipeline.py
+
+A declarative cleaning pipeline: stages with metadata, fused where possible.
+
+* A `Stage` is a `clean_df_*` function and its keyword arguments, with the
+  columns it reads and writes and whether it rejects rows. Column-local
+  stages also name the `clean_value_*` transform they apply to each column
+  they write (`value_transforms`), and the dtype of the result, if any.
+* `Pipeline.plan()` fuses runs of consecutive column-local stages into one
+  `FusedStage`: the value transforms of each column are composed and applied
+  in one pass over the column's distinct values (see `value_cache`), and
+  the new columns are assigned to the frame at once. Columns no stage
+  writes are not copied (pandas' copy-on-write shares them with the input).
+* `Pipeline.run()` applies the plan; `Pipeline.steps()` gives it as
+  (function, keyword arguments) pairs, e.g. for `parallel.run_steps_parallel`.
+* `changed_columns()` of each stage or fused stage lists the columns it may
+  change, for `change_tracking.diff_frames`, or None if it may change any.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import pandas as pd
+
+from .value_cache import apply_value_transform
+
+ValueTransform = Callable[[Any], Any]
+
+
+class Stage:
+    """A `clean_df_*` function with its arguments and what it touches."""
+
+    def __init__(
+        self,
+        func: Callable[..., pd.DataFrame],
+        kwargs: Optional[Dict[str, Any]] = None,
+        reads: Sequence[str] = (),
+        writes: Sequence[str] = (),
+        rejects_rows: bool = False,
+        value_transforms: Optional[Dict[str, ValueTransform]] = None,
+        dtypes: Optional[Dict[str, str]] = None,
+    ) -> None:
+        if value_transforms is not None and set(value_transforms) != set(writes):
+            raise ValueError("A column-local stage needs a transform per column")
+        self.func = func
+        self.kwargs = kwargs or {}
+        self.reads = list(reads)
+        self.writes = list(writes)
+        self.rejects_rows = rejects_rows
+        self.value_transforms = value_transforms
+        self.dtypes = dtypes or {}
+
+    @property
+    def name(self) -> str:
+        return self.func.__name__
+
+    @property
+    def is_column_local(self) -> bool:
+        """Whether the stage is a value transform of each column it writes."""
+        return self.value_transforms is not None and not self.rejects_rows
+
+    def changed_columns(self) -> Optional[List[str]]:
+        """Columns the stage may change, or None if it may change any.
+
+        Stages that reject rows with `reject_sentinel=True` overwrite whole
+        rows.
+        """
+        if self.rejects_rows and self.kwargs.get("reject_sentinel"):
+            return None
+        return self.writes
+
+    def __call__(self, df: pd.DataFrame) -> pd.DataFrame:
+        return self.func(df, **self.kwargs)
+
+    def __repr__(self) -> str:
+        return f"Stage({self.name}, writes={self.writes})"
+
+
+class ComposedTransform:
+    """Value transforms applied in order, as one transform.
+
+    Compares equal to another composition of the same transforms, so it
+    shares their value cache across calls.
+    """
+
+    def __init__(self, funcs: Sequence[ValueTransform]) -> None:
+        self.funcs = tuple(funcs)
+        self.__name__ = " + ".join(func.__name__ for func in self.funcs)
+
+    def __call__(self, value: Any) -> Any:
+        for func in self.funcs:
+            value = func(value)
+        return value
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, ComposedTransform) and self.funcs == other.funcs
+
+    def __hash__(self) -> int:
+        return hash(self.funcs)
+
+
+class FusedStage:
+    """Consecutive column-local stages, applied in one pass per column."""
+
+    def __init__(self, stages: Sequence[Stage]) -> None:
+        if not all(stage.is_column_local for stage in stages):
+            raise ValueError("Only column-local stages can be fused")
+        self.stages = list(stages)
+        self.__name__ = " + ".join(stage.name for stage in self.stages)
+
+    @property
+    def name(self) -> str:
+        return self.__name__
+
+    @property
+    def writes(self) -> List[str]:
+        return list(dict.fromkeys(c for stage in self.stages for c in stage.writes))
+
+    def transforms(self) -> Dict[str, Tuple[ValueTransform, Optional[str]]]:
+        """The composed transform of each column, and the dtype of its result."""
+        funcs: Dict[str, List[ValueTransform]] = {}
+        dtypes: Dict[str, Optional[str]] = {}
+        for stage in self.stages:
+            for column, func in (stage.value_transforms or {}).items():
+                funcs.setdefault(column, []).append(func)
+                dtypes[column] = stage.dtypes.get(column)
+        transforms: Dict[str, Tuple[ValueTransform, Optional[str]]] = {}
+        for column, column_funcs in funcs.items():
+            transform = (
+                column_funcs[0]
+                if len(column_funcs) == 1
+                else ComposedTransform(column_funcs)
+            )
+            transforms[column] = (transform, dtypes[column])
+        return transforms
+
+    def changed_columns(self) -> Optional[List[str]]:
+        return self.writes
+
+    def __call__(self, df: pd.DataFrame) -> pd.DataFrame:
+        new_columns = {}
+        for column, (transform, dtype) in self.transforms().items():
+            values = apply_value_transform(df[column], transform)
+            new_columns[column] = values if dtype is None else values.astype(dtype)
+        return df.assign(**new_columns)
+
+    def __repr__(self) -> str:
+        return f"FusedStage({self.name})"
+
+
+PlannedStage = Union[Stage, FusedStage]
+
+
+class Pipeline:
+    """Stages applied in order, with consecutive column-local stages fused."""
+
+    def __init__(self, stages: Sequence[Stage], fuse: bool = True) -> None:
+        self.stages = list(stages)
+        self.fuse = fuse
+
+    def plan(self) -> List[PlannedStage]:
+        """The stages to run, with runs of column-local stages fused."""
+        if not self.fuse:
+            return list(self.stages)
+        planned: List[PlannedStage] = []
+        run: List[Stage] = []
+
+        def end_run() -> None:
+            planned.extend([FusedStage(run)] if len(run) > 1 else run)
+            run.clear()
+
+        for stage in self.stages:
+            if stage.is_column_local:
+                run.append(stage)
+            else:
+                end_run()
+                planned.append(stage)
+        end_run()
+        return planned
+
+    def steps(self) -> List[Tuple[Callable[..., pd.DataFrame], Dict[str, Any]]]:
+        """The plan as (function, keyword arguments) pairs."""
+        return [
+            (stage.func, stage.kwargs) if isinstance(stage, Stage) else (stage, {})
+            for stage in self.plan()
+        ]
+
+    def run(self, df: pd.DataFrame) -> pd.DataFrame:
+        for stage in self.plan():
+            df = stage(df)
+        return df
+
+    def describe(self) -> pd.DataFrame:
+        """One row per stage: what it reads and writes, and how it runs."""
+        records = []
+        for planned in self.plan():
+            stages = planned.stages if isinstance(planned, FusedStage) else [planned]
+            for stage in stages:
+                records.append(
+                    {
+                        "stage": stage.name,
+                        "reads": ", ".join(stage.reads),
+                        "writes": ", ".join(stage.writes),
+                        "rejects_rows": stage.rejects_rows,
+                        "column_local": stage.is_column_local,
+                        "runs_as": planned.name,
+                    }
+                )
+        return pd.DataFrame(records)
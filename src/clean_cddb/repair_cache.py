@@ -0,0 +1,182 @@
+"""repair_cache.py
+
+Persistent on-disk cache of ftfy repairs for
+`clean_df_try_to_fix_encoding_errors`.
+
+* Maps a raw value (as `str(value)`) to its repaired value in a SQLite file,
+  so values repaired in an earlier run are not passed to `ftfy` again.
+* Only values failing `check_col_has_valid_characters` are repair
+  candidates; every other value is returned unchanged without a lookup, so
+  the cache holds the (few) mojibake candidates, not every artist.
+* The cache is versioned by the ftfy version and the character rules
+  (source of `checks.check_col_has_valid_characters` and the
+  `rules.INVALID_CHARACTERS` pattern). On a version mismatch the cached
+  repairs are dropped.
+* The connection is opened lazily and not pickled, so a `RepairCache` can be
+  passed to worker processes; each worker opens its own connection.
+"""
+
+import contextlib
+import hashlib
+import inspect
+import logging
+import sqlite3
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+import ftfy
+import pandas as pd
+
+from . import checks, rules, vectorized_checks
+from .value_cache import map_categories
+
+# Bump when the table layout or the meaning of cached values changes
+CACHE_FORMAT_VERSION = 1
+# Stay below SQLite's default limit on query parameters
+_QUERY_BATCH_SIZE = 500
+
+
+def repair_cache_version() -> str:
+    """Hash of everything a cached repair depends on."""
+    parts = [
+        str(CACHE_FORMAT_VERSION),
+        ftfy.__version__,
+        inspect.getsource(checks.check_col_has_valid_characters),
+        rules.INVALID_CHARACTERS.pattern.pattern,
+    ]
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+@contextlib.contextmanager
+def _immediate_transaction(conn: sqlite3.Connection) -> Iterator[None]:
+    """Run the block in an immediate transaction; roll back on error."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+class RepairCache:
+    """SQLite-backed map of raw value to repaired value."""
+
+    def __init__(self, path: str, version: Optional[str] = None) -> None:
+        self.path = path
+        self.version = version or repair_cache_version()
+        self.hits = 0
+        self.misses = 0
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        state["_conn"] = None
+        return state
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = self._connect()
+        return self._conn
+
+    def _connect(self) -> sqlite3.Connection:
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit; writes open their own (immediate) transactions
+        conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        with _immediate_transaction(conn):
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS repairs "
+                "(raw TEXT PRIMARY KEY, repaired TEXT NOT NULL)"
+            )
+            row = conn.execute(
+                "SELECT value FROM meta WHERE key = 'version'"
+            ).fetchone()
+            if row is None or row[0] != self.version:
+                if row is not None:
+                    logging.info(f"Repair cache {self.path} is outdated; clearing it")
+                conn.execute("DELETE FROM repairs")
+                conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)",
+                    (self.version,),
+                )
+        return conn
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __len__(self) -> int:
+        count: int = self.conn.execute("SELECT COUNT(*) FROM repairs").fetchone()[0]
+        return count
+
+    def get_many(self, raw_values: Iterable[str]) -> Dict[str, str]:
+        """Cached repairs of `raw_values`; values not in the cache are left out."""
+        raw_values = list(raw_values)
+        found: Dict[str, str] = {}
+        for start in range(0, len(raw_values), _QUERY_BATCH_SIZE):
+            batch = raw_values[start : start + _QUERY_BATCH_SIZE]
+            placeholders = ", ".join("?" * len(batch))
+            found.update(
+                self.conn.execute(
+                    f"SELECT raw, repaired FROM repairs WHERE raw IN ({placeholders})",
+                    batch,
+                ).fetchall()
+            )
+        return found
+
+    def put_many(self, repairs: Dict[str, str]) -> None:
+        """Save `repairs` in a single transaction."""
+        if not repairs:
+            return
+        with _immediate_transaction(self.conn):
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO repairs (raw, repaired) VALUES (?, ?)",
+                repairs.items(),
+            )
+
+    def apply(self, series: pd.Series, func: Callable[[Any], str]) -> pd.Series:
+        """Equivalent to `series.apply(func)`, looking repairs up in the cache.
+
+        `func` must depend only on `str(value)` and return it unchanged when
+        it passes `check_col_has_valid_characters`, as
+        `clean_value_try_to_fix_encoding_errors` does.
+        """
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            return map_categories(series, lambda values: self.apply(values, func))
+        codes, uniques = pd.factorize(series, use_na_sentinel=False)
+        results = pd.Series([str(value) for value in uniques], dtype=object)
+        needs_repair = ~vectorized_checks.check_col_has_valid_characters(results)
+
+        candidates: List[str] = results[needs_repair].tolist()
+        repairs = self.get_many(set(candidates))
+        missing = {raw: func(raw) for raw in candidates if raw not in repairs}
+        self.hits += len(repairs)
+        self.misses += len(missing)
+        self.put_many(missing)
+        repairs.update(missing)
+
+        results[needs_repair] = [repairs[raw] for raw in candidates]
+        # Infer the result dtype the same way `apply_value_transform` does
+        transformed = results.infer_objects().take(codes)
+        transformed.index = series.index
+        transformed.name = series.name
+        return transformed
+
+    def info(self) -> pd.DataFrame:
+        """Hits, misses and size of the cache, as seen by this process."""
+        return pd.DataFrame(
+            [
+                {
+                    "path": self.path,
+                    "hits": self.hits,
+                    "misses": self.misses,
+                    "currsize": len(self),
+                }
+            ]
+        )
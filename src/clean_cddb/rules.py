@@ -0,0 +1,116 @@
+"""rules.py
+
+Compiled patterns and value sets shared by the checks and the cleaning
+transforms.
+
+* Each rule is compiled once, at import, and registered by name in `RULES`,
+  so `checks`, `vectorized_checks` and `cleaning_transforms` use the same
+  compiled pattern instead of building it per call or per value.
+* `INVALID_CHARACTERS` folds the invalid symbols and the Chinese and Japanese
+  character ranges into one character class, so a value is checked for all of
+  them in a single scan.
+* `CHECK_RULES` lists the rules behind each check in `checks`, and
+  `fired_rule()` names the rule a failing value broke, e.g. to report which
+  rule fired for each failure case.
+"""
+
+import re
+from typing import Any, Dict, List, Optional
+
+INVALID_SYMBOLS = "\\^¤¦©¬®¯°±²³´µ¶¸¹º»¼½¾¿ÂÃÅÆÇÌÕÖÜâåçïð÷øùû˜ѼҸ€中俊劇四団季雅�"
+
+# CJK Unified Ideographs; Hiragana, Katakana and CJK Unified Ideographs
+# Extension A
+CJK_RANGES = "\u4e00-\u9fff\u3040-\u30ff\u31f0-\u31ff\u3200-\u9faf"
+
+VALID_CATEGORIES = frozenset(
+    [
+        "blues",
+        "classical",
+        "country",
+        "folk",
+        "jazz",
+        "misc",
+        "newage",
+        "reggae",
+        "rock",
+        "soundtrack",
+        "N/A",
+    ]
+)
+
+
+class Rule:
+    """A named, compiled pattern that a value breaks if it matches."""
+
+    def __init__(self, name: str, description: str, pattern: "re.Pattern[str]"):
+        self.name = name
+        self.description = description
+        self.pattern = pattern
+
+    def fires(self, value: Any) -> bool:
+        return isinstance(value, str) and self.pattern.search(value) is not None
+
+    def __repr__(self) -> str:
+        return f"Rule({self.name!r}, {self.pattern.pattern!r})"
+
+
+RULES: Dict[str, Rule] = {}
+
+
+def register(name: str, description: str, pattern: str, flags: int = 0) -> Rule:
+    """Compile `pattern` and add it to `RULES` as `name`."""
+    rule = Rule(name, description, re.compile(pattern, flags))
+    RULES[name] = rule
+    return rule
+
+
+INVALID_SYMBOL = register(
+    "invalid_symbol",
+    "Symbol that is *possibly* a mis-decoded character",
+    "[" + "".join(re.escape(char) for char in INVALID_SYMBOLS) + "]",
+)
+CJK_CHARACTER = register(
+    "cjk_character", "Chinese or Japanese character", f"[{CJK_RANGES}]"
+)
+INVALID_CHARACTERS = register(
+    "invalid_characters",
+    "Invalid symbol or Chinese or Japanese character",
+    "[" + "".join(re.escape(char) for char in INVALID_SYMBOLS) + CJK_RANGES + "]",
+)
+# Variations of "various", "various artist", "various artists" and "var"
+VARIOUS_ARTIST = register(
+    "various_artist",
+    "Variation of 'Various' as the artist",
+    r"\b(?:various|various artist(?:s)?|var)\b",
+    re.IGNORECASE,
+)
+QUESTION_MARKS = register(
+    "question_marks", "2 or more question marks, e.g. '????'", r"\?\?"
+)
+DOUBLE_DASH = register("double_dash", "Placeholder dashes, e.g. '--'", "--")
+# Matched against lower-cased track names
+TRACK_KEYWORD = register(
+    "track_keyword",
+    "Track name *possibly* using a numeric prefix",
+    "disk|track|title|01",
+)
+
+# Rules behind each check in `checks`, in the order they are reported
+CHECK_RULES: Dict[str, List[str]] = {
+    "check_col_has_valid_characters": [INVALID_SYMBOL.name, CJK_CHARACTER.name],
+    "check_artist_is_valid": [VARIOUS_ARTIST.name, QUESTION_MARKS.name],
+    "check_genre_is_valid": [DOUBLE_DASH.name],
+}
+
+
+def fired_rule(check_name: str, value: Any) -> Optional[str]:
+    """The first rule of check `check_name` that `value` breaks, if any.
+
+    None for checks without rules and for values failing for another reason,
+    e.g. missing values.
+    """
+    for rule_name in CHECK_RULES.get(check_name, []):
+        if RULES[rule_name].fires(value):
+            return rule_name
+    return None
@@ -0,0 +1,195 @@
+"""sampled_validation.py
+
+Fast, sample-based estimates of the schema's failure cases.
+
+* `stratified_sample()` draws the same fraction of rows from every stratum
+  (by default, every source "category"), so each stratum is represented in
+  proportion to its size and the sample is self-weighting.
+* `estimate_failures()` validates the sample only and estimates, for each
+  column and check that failed in it, the failure rate and the number of
+  failing rows of the whole frame, with Wilson score confidence intervals
+  (with a finite population correction, so a sample of the whole frame gives
+  exact counts). Column-level failures (e.g. dtype) have no rate.
+* `crossed_thresholds()` compares the estimated rates with per-column
+  thresholds; only when one is crossed is a full validation worth its cost.
+* Checks that never fail in the sample are not reported.
+"""
+
+from statistics import NormalDist
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+if TYPE_CHECKING:
+    import pandera as pa
+
+DEFAULT_SAMPLE_SIZE = 10_000
+DEFAULT_CONFIDENCE = 0.95
+DEFAULT_MAX_FAILURE_RATE = 0.01
+STRATA_COLUMN = "category"
+
+# Estimated failing rows of the whole frame, from each rate column
+_ESTIMATED_COUNTS = {
+    "failure_rate": "estimated_failures",
+    "rate_low": "estimated_low",
+    "rate_high": "estimated_high",
+}
+_COUNT_COLUMNS = ["sample_failures", *_ESTIMATED_COUNTS.values()]
+_ESTIMATE_COLUMNS = [
+    "column",
+    "check",
+    "sample_failures",
+    "sample_rows",
+    "rows",
+    "failure_rate",
+    "rate_low",
+    "rate_high",
+    "estimated_failures",
+    "estimated_low",
+    "estimated_high",
+]
+
+
+def stratified_sample(
+    df: pd.DataFrame,
+    sample_size: int = DEFAULT_SAMPLE_SIZE,
+    strata: Optional[str] = STRATA_COLUMN,
+    seed: int = 0,
+) -> pd.DataFrame:
+    """About `sample_size` rows of `df`, the same fraction of each stratum.
+
+    Missing values form a stratum of their own. Returns `df` itself if it
+    has at most `sample_size` rows.
+    """
+    if sample_size >= len(df):
+        return df
+    fraction = sample_size / len(df)
+    if strata is None or strata not in df:
+        return df.sample(frac=fraction, random_state=seed).sort_index()
+    sample_df: pd.DataFrame = df.groupby(
+        df[strata], dropna=False, observed=True, group_keys=False
+    ).sample(frac=fraction, random_state=seed)
+    return sample_df.sort_index()
+
+
+def wilson_interval(
+    failures: Any,
+    n: int,
+    population: Optional[int] = None,
+    confidence: float = DEFAULT_CONFIDENCE,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Lower and upper bounds of the failure rate of `failures` out of `n`.
+
+    With `population`, the interval narrows by the finite population
+    correction, to the sample rate itself when `n == population`.
+    """
+    failures = np.asarray(failures, dtype=float)
+    rate = failures / n
+    z2 = NormalDist().inv_cdf(0.5 + confidence / 2) ** 2
+    if population is not None and population > 1:
+        z2 *= (population - n) / (population - 1)
+    denominator = 1 + z2 / n
+    center = (rate + z2 / (2 * n)) / denominator
+    half_width = np.sqrt(z2 * (rate * (1 - rate) / n + z2 / (4 * n**2))) / denominator
+    return np.clip(center - half_width, 0, 1), np.clip(center + half_width, 0, 1)
+
+
+def validate_sample(
+    sample_df: pd.DataFrame, schema: Optional["pa.DataFrameSchema"] = None
+) -> pd.DataFrame:
+    """Failure cases of `sample_df`, empty if it passes `schema`."""
+    from pandera.errors import SchemaErrors
+
+    if schema is None:
+        from .schema import schema as default_schema
+
+        schema = default_schema
+    try:
+        schema(sample_df, lazy=True)
+    except SchemaErrors as err:
+        failure_cases: pd.DataFrame = err.failure_cases
+        return failure_cases
+    return pd.DataFrame(columns=["column", "check", "failure_case", "index"])
+
+
+def estimate_failures(
+    df: pd.DataFrame,
+    schema: Optional["pa.DataFrameSchema"] = None,
+    sample_size: int = DEFAULT_SAMPLE_SIZE,
+    strata: Optional[str] = STRATA_COLUMN,
+    confidence: float = DEFAULT_CONFIDENCE,
+    seed: int = 0,
+) -> pd.DataFrame:
+    """Estimated failing rows of `df` by column and check, from a sample.
+
+    One row per (column, check) failing in the sample: the failing sample
+    rows, the sample and population sizes, the failure rate with its
+    confidence interval, and the estimated number of failing rows of `df`
+    with its interval.
+    """
+    sample_df = stratified_sample(df, sample_size, strata, seed)
+    failure_cases = validate_sample(sample_df, schema)
+    n, population = len(sample_df), len(df)
+
+    is_element = failure_cases["index"].notna()
+    counts = (
+        failure_cases[is_element]
+        .groupby(["column", "check"], dropna=False)["index"]
+        .nunique()
+        .rename("sample_failures")
+    )
+    column_level = (
+        failure_cases.loc[~is_element, ["column", "check"]]
+        .drop_duplicates()
+        .set_index(["column", "check"])
+        .index
+    )
+    estimates = counts.reset_index()
+    estimates["sample_rows"] = n
+    estimates["rows"] = population
+    estimates["failure_rate"] = estimates["sample_failures"] / max(n, 1)
+    if n:
+        low, high = wilson_interval(
+            estimates["sample_failures"], n, population, confidence
+        )
+        estimates["rate_low"], estimates["rate_high"] = low, high
+    else:
+        estimates["rate_low"] = estimates["rate_high"] = np.nan
+    for rate_column, count_column in _ESTIMATED_COUNTS.items():
+        estimates[count_column] = (estimates[rate_column] * population).round()
+
+    column_level_estimates = pd.DataFrame(
+        {
+            "column": column_level.get_level_values("column"),
+            "check": column_level.get_level_values("check"),
+            "sample_rows": n,
+            "rows": population,
+        }
+    )
+    parts = [df_ for df_ in [estimates, column_level_estimates] if len(df_)]
+    if parts:
+        estimates = pd.concat(parts, ignore_index=True)
+    return (
+        estimates.reindex(columns=_ESTIMATE_COLUMNS)
+        .astype({column: "Int64" for column in _COUNT_COLUMNS})
+        .sort_values(by=["column", "check"])
+        .reset_index(drop=True)
+    )
+
+
+def crossed_thresholds(
+    estimates: pd.DataFrame,
+    max_failure_rate: float = DEFAULT_MAX_FAILURE_RATE,
+    thresholds: Optional[Dict[str, float]] = None,
+) -> pd.DataFrame:
+    """Rows of `estimates` whose failure rate crosses its column's threshold.
+
+    `thresholds` maps column names to their maximum failure rate; other
+    columns use `max_failure_rate`. Column-level failures never cross.
+    """
+    thresholds = thresholds or {}
+    limits = estimates["column"].map(lambda column: thresholds.get(column))
+    limits = limits.fillna(max_failure_rate).astype(float)
+    crossed: pd.DataFrame = estimates[estimates["failure_rate"] > limits]
+    return crossed
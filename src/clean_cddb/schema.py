@@ -17,7 +17,12 @@ Notes
     * Element-wise checks are for checking things like "is a given row value
       within a valid range".
 * we use `inspect.getsource(Callable)` to get the source code for a check
-  function so we can include it later in reporting
+  function so we can include it later in reporting; `check_description()`
+  reads it only when a report asks for it, not when the schema is built
+* `build_schema(vectorized=True)` swaps each element-wise check for its
+  column-level counterpart in `vectorized_checks.py`; check names and
+  descriptions still come from `checks.py`, so failure cases and reports
+  are identical to the element-wise `schema`
 * `checks.check_*()` functions
     * These are data quality checks
     * Returning false for a given value indicates a failure case.
@@ -27,122 +32,176 @@ Notes
     * These are user-defined checks.
 """
 
+import functools
 import inspect
-
-import pandera as pa
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, cast
 
 from . import checks
 
+if TYPE_CHECKING:
+    import pandera as pa
+
+ID_LENGTH_CHECK_NAME = "Check that the length of 'id' is 6 characters."
+
+# Function whose source describes each check, by check name
+CHECK_SOURCES: Dict[Optional[str], Callable[..., Any]] = {
+    func.__doc__: func
+    for func in [
+        checks.check_artist_is_valid,
+        checks.check_col_has_valid_characters,
+        checks.check_category_is_valid,
+        checks.check_genre_is_valid,
+        checks.check_year_range_is_valid,
+        checks.check_year_is_numeric,
+    ]
+}
+CHECK_SOURCES[ID_LENGTH_CHECK_NAME] = checks.check_id_six_digit_starting_one
+
+
+@functools.lru_cache(maxsize=None)
+def check_description(check_name: Optional[str]) -> Optional[str]:
+    """Source code of the function behind check `check_name`, if known."""
+    if check_name not in CHECK_SOURCES:
+        return None
+    return inspect.getsource(CHECK_SOURCES[check_name])
 
-schema = pa.DataFrameSchema(
-    {
-        "artist": pa.Column(
-            object,
-            nullable=False,
-            checks=[
-                pa.Check(
-                    checks.check_artist_is_valid,
-                    element_wise=True,
-                    name=checks.check_artist_is_valid.__doc__,
-                    description=inspect.getsource(checks.check_artist_is_valid),
-                ),
-                pa.Check(
-                    checks.check_col_has_valid_characters,
-                    element_wise=True,
-                    name=checks.check_col_has_valid_characters.__doc__,
-                    ignore_na=False,
-                    description=inspect.getsource(
-                        checks.check_col_has_valid_characters
+
+def build_schema(vectorized: bool = False) -> "pa.DataFrameSchema":
+    """Build the CDDB schema with element-wise or vectorized checks."""
+    # Imported here, so importing the package doesn't load pandera and pandas
+    import pandera as pa
+
+    from . import vectorized_checks
+
+    check_module = vectorized_checks if vectorized else checks
+
+    return pa.DataFrameSchema(
+        {
+            "artist": pa.Column(
+                object,
+                nullable=False,
+                checks=[
+                    pa.Check(
+                        check_module.check_artist_is_valid,
+                        element_wise=not vectorized,
+                        name=checks.check_artist_is_valid.__doc__,
+                    ),
+                    pa.Check(
+                        check_module.check_col_has_valid_characters,
+                        element_wise=not vectorized,
+                        name=checks.check_col_has_valid_characters.__doc__,
+                        ignore_na=False,
                     ),
-                ),
-            ],
-        ),
-        "category": pa.Column(
-            object,
-            nullable=False,
-            checks=[
-                pa.Check(
-                    checks.check_category_is_valid,
-                    element_wise=True,
-                    name=checks.check_category_is_valid.__doc__,
-                    description=inspect.getsource(checks.check_category_is_valid),
-                )
-            ],
-        ),
-        "genre": pa.Column(
-            object,
-            nullable=False,
-            checks=[
-                pa.Check(
-                    checks.check_genre_is_valid,
-                    element_wise=True,
-                    name=checks.check_genre_is_valid.__doc__,
-                    description=inspect.getsource(checks.check_genre_is_valid),
-                )
-            ],
-        ),
-        "title": pa.Column(
-            object,
-            nullable=False,
-            checks=[
-                pa.Check(
-                    checks.check_col_has_valid_characters,
-                    element_wise=True,
-                    name=checks.check_col_has_valid_characters.__doc__,
-                    ignore_na=False,
-                    description=inspect.getsource(
-                        checks.check_col_has_valid_characters
+                ],
+            ),
+            "category": pa.Column(
+                object,
+                nullable=False,
+                checks=[
+                    pa.Check(
+                        check_module.check_category_is_valid,
+                        element_wise=not vectorized,
+                        name=checks.check_category_is_valid.__doc__,
+                    )
+                ],
+            ),
+            "genre": pa.Column(
+                object,
+                nullable=False,
+                checks=[
+                    pa.Check(
+                        check_module.check_genre_is_valid,
+                        element_wise=not vectorized,
+                        name=checks.check_genre_is_valid.__doc__,
+                    )
+                ],
+            ),
+            "title": pa.Column(
+                object,
+                nullable=False,
+                checks=[
+                    pa.Check(
+                        check_module.check_col_has_valid_characters,
+                        element_wise=not vectorized,
+                        name=checks.check_col_has_valid_characters.__doc__,
+                        ignore_na=False,
+                    )
+                ],
+            ),
+            "year": pa.Column(
+                "Int32",
+                nullable=True,
+                checks=[
+                    # Implementing our own range check due to varying types
+                    pa.Check(
+                        check_module.check_year_range_is_valid,
+                        element_wise=not vectorized,
+                        name=checks.check_year_range_is_valid.__doc__,
                     ),
-                )
-            ],
-        ),
-        "year": pa.Column(
-            "Int32",
-            nullable=True,
-            checks=[
-                # Implementing our own range check due to varying types
-                pa.Check(
-                    checks.check_year_range_is_valid,
-                    element_wise=True,
-                    name=checks.check_year_range_is_valid.__doc__,
-                    description=inspect.getsource(checks.check_year_range_is_valid),
-                ),
-                # Implementing our own data type check, because it will get
-                # read as an object by default
-                pa.Check(
-                    checks.check_year_is_numeric,
-                    element_wise=True,
-                    name=checks.check_year_is_numeric.__doc__,
-                    description=inspect.getsource(checks.check_year_is_numeric),
-                ),
-            ],
-        ),
-        # "tracks": pa.Column(
-        #     object,
-        #     nullable=False,
-        #     checks=[
-        #         pa.Check(
-        #             checks.check_track_has_numeric_prefix,
-        #             element_wise=True,
-        #             name=checks.check_year_is_numeric.__doc__,
-        #             description=inspect.getsource(
-        #                 checks.check_track_has_numeric_prefix
-        #             ),
-        #         )
-        #     ],
-        # ),
-        "id": pa.Column(
-            object,
-            nullable=False,
-            checks=[
-                pa.Check(
-                    lambda x: len(x) == 6,
-                    element_wise=True,
-                    name="Check that the length of 'id' is 6 characters.",
-                    description=inspect.getsource(
-                         checks.check_id_six_digit_starting_one),
-                )
-            ],
-        ),
-    }
-)
+                    # Implementing our own data type check, because it will get
+                    # read as an object by default
+                    pa.Check(
+                        check_module.check_year_is_numeric,
+                        element_wise=not vectorized,
+                        name=checks.check_year_is_numeric.__doc__,
+                    ),
+                ],
+            ),
+            # "tracks": pa.Column(
+            #     object,
+            #     nullable=False,
+            #     checks=[
+            #         pa.Check(
+            #             checks.check_track_has_numeric_prefix,
+            #             element_wise=True,
+            #             name=checks.check_year_is_numeric.__doc__,
+            #             description=inspect.getsource(
+            #                 checks.check_track_has_numeric_prefix
+            #             ),
+            #         )
+            #     ],
+            # ),
+            "id": pa.Column(
+                object,
+                nullable=False,
+                checks=[
+                    pa.Check(
+                        (
+                            vectorized_checks.check_id_length_is_six
+                            if vectorized
+                            else lambda x: len(x) == 6
+                        ),
+                        element_wise=not vectorized,
+                        name=ID_LENGTH_CHECK_NAME,
+                    )
+                ],
+            ),
+        }
+    )
+
+
+class LazySchema:
+    """The schema of `build_schema()`, built on first use.
+
+    Calls and attribute lookups are passed on to the built schema.
+    """
+
+    def __init__(self, vectorized: bool = False) -> None:
+        self.vectorized = vectorized
+        self._schema: Optional["pa.DataFrameSchema"] = None
+
+    def build(self) -> "pa.DataFrameSchema":
+        if self._schema is None:
+            self._schema = build_schema(self.vectorized)
+        return self._schema
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        return self.build()(*args, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.build(), name)
+
+
+# Behave like the `pa.DataFrameSchema` they build
+schema = cast("pa.DataFrameSchema", LazySchema())
+vectorized_schema = cast("pa.DataFrameSchema", LazySchema(vectorized=True))
@@ -0,0 +1,204 @@
+"""sqlite_export.py
+
+Bulk, transactional export of data frames to the output SQLite database.
+
+* `connect()` opens the database with pragmas tuned for bulk loading (see
+  `EXPORT_PRAGMAS`): a WAL journal with `synchronous=NORMAL` syncs once per
+  checkpoint instead of once per transaction, while a crash still leaves the
+  database consistent.
+* `transaction()` wraps a block in one explicit transaction. Python's
+  sqlite3 only opens one implicitly before INSERT, UPDATE, DELETE or
+  REPLACE, so a DROP or CREATE TABLE run first would commit on its own and
+  could not be rolled back.
+* `write_table()` creates a table laid out like `DataFrame.to_sql` with its
+  default settings (the frame index as an "index" column, the same SQL
+  types), or appends to it, and inserts the rows with `executemany` in
+  batches of `EXPORT_BATCH_SIZE`. It does not commit; run it in a
+  `transaction()` so a failed insert restores the previous table.
+* `export_tables()` loads several frames in one transaction and records the
+  row count and load time of each in the `export_log` table.
+* `create_indexes()` indexes join keys once the tables are loaded, which is
+  cheaper than maintaining the indexes during the inserts.
+"""
+
+import contextlib
+import sqlite3
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+EXPORT_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "temp_store": "MEMORY",
+    # Negative values are in KiB, i.e. 64 MiB
+    "cache_size": -65536,
+}
+EXPORT_BATCH_SIZE = 50_000
+EXPORT_LOG_TABLE = "export_log"
+
+# SQL types of the columns `DataFrame.to_sql` creates, by `infer_dtype` result
+_SQL_TYPES = {
+    "integer": "INTEGER",
+    "floating": "REAL",
+    "boolean": "INTEGER",
+    "datetime64": "TIMESTAMP",
+    "datetime": "TIMESTAMP",
+    "date": "DATE",
+    "time": "TIME",
+}
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """Open the output database with `EXPORT_PRAGMAS` applied."""
+    conn = sqlite3.connect(path)
+    for pragma, value in EXPORT_PRAGMAS.items():
+        conn.execute(f"PRAGMA {pragma} = {value}")
+    return conn
+
+
+@contextlib.contextmanager
+def transaction(conn: sqlite3.Connection) -> Iterator[None]:
+    """Run the block in one transaction, DDL included; roll back on error."""
+    with conn:
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+        yield
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _sql_type(values: pd.Series) -> str:
+    return _SQL_TYPES.get(pd.api.types.infer_dtype(values, skipna=True), "TEXT")
+
+
+def _columns(df: pd.DataFrame) -> List[Tuple[str, pd.Series]]:
+    """Column names and values of `df`'s table, its index first, as `to_sql`."""
+    index_name = df.index.name
+    if index_name is None:
+        index_name = "level_0" if "index" in df.columns else "index"
+    columns = [(str(index_name), pd.Series(df.index))]
+    columns += [
+        (str(name), df.iloc[:, position]) for position, name in enumerate(df.columns)
+    ]
+    return columns
+
+
+def _rows(
+    columns: List[Tuple[str, pd.Series]], batch_size: int
+) -> Iterator[Tuple[Any, ...]]:
+    """Rows as tuples of Python values, with missing values as None."""
+    n_rows = len(columns[0][1])
+    for start in range(0, n_rows, batch_size):
+        batch = []
+        for _name, values in columns:
+            values = values.iloc[start : start + batch_size]
+            batch.append(values.astype(object).where(values.notna(), None).tolist())
+        yield from zip(*batch)
+
+
+def insert_rows(
+    conn: sqlite3.Connection,
+    table: str,
+    df: pd.DataFrame,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> None:
+    """Append `df` and its index to `table` by column position."""
+    columns = _columns(df)
+    placeholders = ", ".join("?" * len(columns))
+    conn.executemany(
+        f"INSERT INTO {_quote(table)} VALUES ({placeholders})",
+        _rows(columns, batch_size),
+    )
+
+
+def write_table(
+    conn: sqlite3.Connection,
+    table: str,
+    df: pd.DataFrame,
+    append: bool = False,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> None:
+    """Write `df` to `table`, replacing it unless `append`.
+
+    Unlike `DataFrame.to_sql`, this does not commit; see `transaction()`.
+    """
+    if not append:
+        columns = ",\n  ".join(
+            f"{_quote(name)} {_sql_type(values)}" for name, values in _columns(df)
+        )
+        conn.execute(f"DROP TABLE IF EXISTS {_quote(table)}")
+        conn.execute(f"CREATE TABLE {_quote(table)} (\n  {columns}\n)")
+    insert_rows(conn, table, df, batch_size)
+
+
+def export_tables(
+    conn: sqlite3.Connection,
+    dfs: Dict[str, pd.DataFrame],
+    append: bool = False,
+    chunk: Optional[int] = None,
+) -> pd.DataFrame:
+    """Write each frame to its table in one transaction.
+
+    Returns (and appends to the `export_log` table) the rows and load time
+    of each table.
+    """
+    exported_at = datetime.now(timezone.utc).isoformat()
+    records: List[Dict[str, Any]] = []
+    with transaction(conn):
+        for table, df in dfs.items():
+            start = time.perf_counter()
+            write_table(conn, table, df, append=append)
+            records.append(
+                {
+                    "table_name": table,
+                    "chunk": chunk,
+                    "rows": len(df),
+                    "load_seconds": time.perf_counter() - start,
+                    "exported_at": exported_at,
+                }
+            )
+        log_df = pd.DataFrame(records)
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {EXPORT_LOG_TABLE} (table_name TEXT, "
+            "chunk INTEGER, rows INTEGER, load_seconds REAL, exported_at TEXT)"
+        )
+        conn.executemany(
+            f"INSERT INTO {EXPORT_LOG_TABLE} VALUES (?, ?, ?, ?, ?)",
+            log_df.itertuples(index=False, name=None),
+        )
+    return log_df
+
+
+def ensure_index(conn: sqlite3.Connection, table: str, column: str) -> None:
+    """Index `table.column`, e.g. so keyed joins and deletes don't scan."""
+    conn.execute(
+        f"CREATE INDEX IF NOT EXISTS {_quote(f'ix_{table}_{column}')} "
+        f"ON {_quote(table)} ({_quote(column)})"
+    )
+
+
+def create_indexes(
+    conn: sqlite3.Connection, keys: Iterable[Tuple[str, str]]
+) -> pd.DataFrame:
+    """Index each (table, column) in `keys`, in one transaction.
+
+    Returns the time taken by each index.
+    """
+    records = []
+    with transaction(conn):
+        for table, column in keys:
+            start = time.perf_counter()
+            ensure_index(conn, table, column)
+            records.append(
+                {
+                    "table_name": table,
+                    "column": column,
+                    "index_seconds": time.perf_counter() - start,
+                }
+            )
+    return pd.DataFrame(records)
@@ -0,0 +1,200 @@
+"""streaming.py
+
+Helpers for processing the CDDB dump in bounded-size chunks.
+
+* `read_source_chunks()` reads the source lazily (the TSV, or a Parquet or
+  Arrow file; see `formats`); each chunk keeps the global row index, so
+  failure-case indices and exported "index" columns line up with a
+  whole-frame run.
+* `collect_ids()` is a global pre-pass over the "id" column only. Cleaning
+  steps that need data-set-wide state (e.g., the collision check in
+  `clean_df_id_format`) receive this instead of seeing one chunk at a time.
+  `collect_artists()` is the same for the "artist" column and the
+  `ArtistIndex` of `clean_df_canonicalize_artists`, and
+  `collect_duplicates()` for the album columns and the `DuplicateIndex` of
+  `clean_df_collapse_duplicates`; `read_rows()` then reads back the rows of
+  the albums in a cluster.
+* `write_df_chunk()` appends a chunk to a CSV file and a SQLite table,
+  replacing any previous output on the first chunk. `write_csv_chunk()`
+  writes only the CSV file; see `sqlite_export` for the SQLite side.
+* `dedupe_column_failure_cases()` drops column-level failure cases (dtype,
+  nullable, ...) already reported for an earlier chunk.
+  `ColumnFailureCases` also holds back column-level dtype failure cases to
+  the end of the run: pandera reports a column that fails its dtype check
+  at the column level only if all its values coerce, and at the element
+  level otherwise, so a chunk can raise one that a whole-file validation
+  would not. An incremental run starts it from the failure cases stored
+  by the earlier run.
+"""
+
+import sqlite3
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional, Set, Tuple
+
+import pandas as pd
+
+from . import formats
+from .artist_index import ArtistIndex
+from .duplicates import DuplicateIndex
+from .id_index import IdIndex
+from .sqlite_export import transaction, write_table
+
+DEFAULT_CHUNKSIZE = formats.DEFAULT_CHUNKSIZE
+
+
+def read_source_chunks(
+    filepath: str,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    usecols: Optional[List[str]] = None,
+) -> Iterator[pd.DataFrame]:
+    """Yield the CDDB source as string-typed frames of at most `chunksize` rows."""
+    yield from formats.read_source_chunks(filepath, chunksize, columns=usecols)
+
+
+def collect_ids(filepath: str, chunksize: int = DEFAULT_CHUNKSIZE) -> IdIndex:
+    """Index every album id in the source file without loading other columns."""
+    ids = IdIndex()
+    for chunk in read_source_chunks(filepath, chunksize, usecols=["id"]):
+        ids.update(chunk["id"])
+    return ids
+
+
+def collect_artists(
+    filepath: str,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    prepare: Optional[Callable[[pd.Series], pd.Series]] = None,
+    artist_index: Optional[ArtistIndex] = None,
+) -> ArtistIndex:
+    """Index every artist in the source file without loading other columns.
+
+    Each chunk of artists is passed through `prepare` first (e.g.
+    `prepare_artists`), and added to `artist_index` if given.
+    """
+    if artist_index is None:
+        artist_index = ArtistIndex()
+    for chunk in read_source_chunks(filepath, chunksize, usecols=["artist"]):
+        artists = chunk["artist"]
+        artist_index.update(artists if prepare is None else prepare(artists))
+    return artist_index
+
+
+def collect_duplicates(
+    filepath: str,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    duplicates: Optional[DuplicateIndex] = None,
+) -> DuplicateIndex:
+    """Fingerprint every album in the source file, adding to `duplicates`."""
+    if duplicates is None:
+        duplicates = DuplicateIndex()
+    usecols = ["id", "artist", "title", "tracks"]
+    for chunk in read_source_chunks(filepath, chunksize, usecols=usecols):
+        duplicates.update(chunk)
+    return duplicates
+
+
+def read_rows(
+    filepath: str, rows: Iterable[int], chunksize: int = DEFAULT_CHUNKSIZE
+) -> pd.DataFrame:
+    """The source rows of index `rows`, read chunk by chunk."""
+    rows = pd.Index(rows)
+    return pd.concat(
+        [
+            chunk[chunk.index.isin(rows)]
+            for chunk in read_source_chunks(filepath, chunksize)
+        ]
+    )
+
+
+def write_csv_chunk(df: pd.DataFrame, df_name: str, csv_dir: str, append: bool) -> None:
+    """Write `df` to `<csv_dir>/<df_name>.csv`, appending after the header."""
+    df.to_csv(
+        Path(csv_dir) / f"{df_name}.csv",
+        index=False,
+        mode="a" if append else "w",
+        header=not append,
+    )
+
+
+def write_df_chunk(
+    df: pd.DataFrame,
+    df_name: str,
+    conn: sqlite3.Connection,
+    csv_dir: str,
+    append: bool,
+) -> None:
+    """Write `df` to `<csv_dir>/<df_name>.csv` and the `df_name` SQL table."""
+    with transaction(conn):
+        write_table(conn, df_name, df, append=append)
+    write_csv_chunk(df, df_name, csv_dir, append)
+
+
+def dedupe_column_failure_cases(
+    failure_cases_df: pd.DataFrame, seen: Set[Tuple[str, str, str]]
+) -> pd.DataFrame:
+    """Keep column-level failure cases (no row index) only the first time.
+
+    `seen` is updated in place so it can be shared across chunks.
+    """
+    is_column_level = failure_cases_df["index"].isna()
+    keys = list(
+        zip(
+            failure_cases_df["column"].astype(str),
+            failure_cases_df["check"].astype(str),
+            failure_cases_df["failure_case"].astype(str),
+        )
+    )
+    keep = [
+        not column_level or key not in seen
+        for column_level, key in zip(is_column_level, keys)
+    ]
+    seen.update(key for column_level, key in zip(is_column_level, keys) if column_level)
+    return failure_cases_df[keep]
+
+
+class ColumnFailureCases:
+    """Column-level failure cases of the chunks of one validated frame.
+
+    `seen` (column, check and failure case of the column-level failure cases)
+    and `element_level_dtype_columns` are those already reported, if any.
+    """
+
+    def __init__(
+        self,
+        seen: Optional[Set[Tuple[str, str, str]]] = None,
+        element_level_dtype_columns: Iterable[str] = (),
+    ) -> None:
+        self.seen: Set[Tuple[str, str, str]] = set() if seen is None else seen
+        self.withheld: List[pd.DataFrame] = []
+        self.element_level_dtype_columns: Set[str] = set(element_level_dtype_columns)
+
+    def update(self, failure_cases_df: pd.DataFrame) -> pd.DataFrame:
+        """The failure cases of a chunk to report now.
+
+        Column-level failure cases already reported are dropped; column-level
+        dtype failure cases are held back until `remaining()`.
+        """
+        is_column_level = failure_cases_df["index"].isna()
+        is_dtype = failure_cases_df["check"].astype(str).str.startswith("dtype(")
+        self.element_level_dtype_columns.update(
+            failure_cases_df.loc[is_dtype & ~is_column_level, "column"].astype(str)
+        )
+        self.withheld.append(failure_cases_df[is_column_level & is_dtype])
+        return dedupe_column_failure_cases(
+            failure_cases_df[~(is_column_level & is_dtype)], self.seen
+        )
+
+    def remaining(self) -> pd.DataFrame:
+        """The held-back dtype failure cases a whole-file validation reports.
+
+        Those of columns with element-level dtype failure cases in any chunk
+        are dropped.
+        """
+        if not self.withheld:
+            return pd.DataFrame(columns=["column", "check", "failure_case", "index"])
+        withheld = pd.concat(self.withheld).drop_duplicates(
+            ["column", "check", "failure_case"]
+        )
+        is_reported = (
+            ~withheld["column"].astype(str).isin(self.element_level_dtype_columns)
+        )
+        return dedupe_column_failure_cases(withheld[is_reported], self.seen)
@@ -0,0 +1,176 @@
+"""synthetic.py
+
+Generate synthetic CDDB-shaped data for tests and benchmarks.
+
+* `generate_cddb()` returns a string-typed frame with the columns of
+  `cddb.tsv`, with controllable rates of the problems the cleaning chain
+  handles: mojibake artists, "Various Artists" variants, invalid categories,
+  "--" genres, out-of-range years and short ids.
+* Values are drawn from pools whose size grows with the number of rows, so
+  large frames share strings like real data does and stay cheap to build.
+* All characters are in Latin-1, like `cddb.tsv` read with
+  `encoding="latin1"`, so frames can be written back to a TSV with that
+  encoding.
+* Album ids are "100000" onwards and unique up to 900,000 rows; beyond that
+  they repeat.
+"""
+
+from typing import List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .formats import as_str_columns
+from .rules import VALID_CATEGORIES
+
+COLUMNS = ["artist", "category", "genre", "title", "tracks", "year", "id"]
+COLUMNS += ["merged_values"]
+
+# Rough shares of the real data set
+CATEGORY_WEIGHTS = {
+    "misc": 0.31,
+    "rock": 0.31,
+    "folk": 0.08,
+    "classical": 0.08,
+    "jazz": 0.06,
+    "blues": 0.05,
+    "newage": 0.04,
+    "soundtrack": 0.03,
+    "country": 0.03,
+    "reggae": 0.01,
+}
+GENRES = ["Rock", "Pop", "Classical", "Jazz", "Folk", "Other", "Soundtrack"]
+GENRES += ["Blues", "Country", "Electronic", "Data", "data"]
+VARIOUS_ARTISTS = ["Various", "Various Artists", "various", "Various Artist"]
+VARIOUS_ARTISTS += ["Various artists", "various artists", "VARIOUS ARTISTS"]
+INVALID_CATEGORIES: List[Optional[str]] = ["data", "SonyTSID7008", "WH11109-2"]
+INVALID_CATEGORIES += ["Gabriel Bacquier", "A Funky Thide Of Sings (1975)", None]
+DASH_GENRES = ["--", "Rock -- Pop", "-- Unknown --"]
+INVALID_YEARS = ["0", "1066", "1900", "1950", "2030", "3000", "19xx", "unknown"]
+
+_WORDS = [
+    "Love", "Night", "Blue", "Fire", "Dream", "River", "Heart", "Golden",
+    "Electric", "Silent", "Wild", "Midnight", "Summer", "Stone", "Black",
+    "Radio", "City", "Dance", "Soul", "Light", "Shadow", "Ocean", "Moon",
+    "Road", "Empire", "Garden", "Thunder", "Velvet", "Crystal", "Paper",
+]  # fmt: skip
+_ACCENTED = [
+    "Björk", "Beyoncé", "Sigur Rós", "Mötley Crüe", "Françoise Hardy",
+    "Céline Dion", "Motörhead", "Zoë Keating", "Joaquín Sabina", "Hüsker Dü",
+    "Maná", "Édith Piaf", "Gâteau Noir", "Jürgen Drews", "Sinéad O'Connor",
+]  # fmt: skip
+_MAX_TRACKS = 99
+
+
+def _mojibake(text: str) -> str:
+    """UTF-8 text mis-decoded as Latin-1, e.g. "Björk" -> "BjÃ¶rk"."""
+    return text.encode("utf-8").decode("latin-1")
+
+
+def _phrases(rng: np.random.Generator, size: int, words: int) -> List[str]:
+    picks = rng.integers(0, len(_WORDS), size=(size, words))
+    return [" ".join(_WORDS[i] for i in row) + f" {n}" for n, row in enumerate(picks)]
+
+
+def _track_list(rng: np.random.Generator, prefix: bool) -> str:
+    n_tracks = int(rng.integers(5, 21))
+    names = [
+        " ".join(_WORDS[i] for i in rng.integers(0, len(_WORDS), size=2))
+        for _ in range(n_tracks)
+    ]
+    if prefix:
+        names = [f"{n + 1:02d} - {name}" for n, name in enumerate(names)]
+    # Pad to a fixed number of slots like the source data
+    return " | ".join(names + [""] * (_MAX_TRACKS - n_tracks))
+
+
+def _inject(
+    rng: np.random.Generator,
+    values: np.ndarray,
+    rate: float,
+    choices: Sequence[Optional[str]],
+) -> np.ndarray:
+    """Replace a `rate` share of `values` with random `choices`."""
+    mask = rng.random(len(values)) < rate
+    values[mask] = np.array(choices, dtype=object)[
+        rng.integers(0, len(choices), size=int(mask.sum()))
+    ]
+    return values
+
+
+def generate_cddb(
+    n_rows: int,
+    seed: int = 0,
+    mojibake_rate: float = 0.01,
+    various_rate: float = 0.12,
+    invalid_category_rate: float = 0.01,
+    dash_genre_rate: float = 0.01,
+    missing_genre_rate: float = 0.35,
+    invalid_year_rate: float = 0.01,
+    missing_year_rate: float = 0.46,
+    short_id_rate: float = 0.05,
+    track_prefix_rate: float = 0.05,
+) -> pd.DataFrame:
+    """A synthetic CDDB data set of `n_rows` albums.
+
+    Rates are the expected share of rows with each problem; defaults are
+    close to the real data set.
+    """
+    rng = np.random.default_rng(seed)
+    n_artists = max(100, n_rows // 5)
+
+    artist_pool = np.array(_phrases(rng, n_artists, 2), dtype=object)
+    artist = artist_pool[rng.integers(0, n_artists, size=n_rows)]
+    mojibake_pool = [_mojibake(f"{name} {n}") for n, name in enumerate(_ACCENTED * 20)]
+    artist = _inject(rng, artist, mojibake_rate, mojibake_pool)
+    artist = _inject(rng, artist, various_rate, VARIOUS_ARTISTS)
+
+    category = rng.choice(
+        list(CATEGORY_WEIGHTS),
+        size=n_rows,
+        p=np.array(list(CATEGORY_WEIGHTS.values())) / sum(CATEGORY_WEIGHTS.values()),
+    ).astype(object)
+    invalid_categories = [c for c in INVALID_CATEGORIES if c not in VALID_CATEGORIES]
+    category = _inject(rng, category, invalid_category_rate, invalid_categories)
+
+    genre = np.array(GENRES, dtype=object)[rng.integers(0, len(GENRES), n_rows)]
+    genre = _inject(rng, genre, missing_genre_rate, [None])
+    genre = _inject(rng, genre, dash_genre_rate, DASH_GENRES)
+
+    n_titles = max(100, n_rows // 2)
+    title_pool = np.array(_phrases(rng, n_titles, 3), dtype=object)
+    title = title_pool[rng.integers(0, n_titles, size=n_rows)]
+
+    n_track_lists = min(max(100, n_rows // 10), 10_000)
+    track_pool = np.array(
+        [
+            _track_list(rng, prefix=bool(rng.random() < track_prefix_rate))
+            for _ in range(n_track_lists)
+        ],
+        dtype=object,
+    )
+    tracks = track_pool[rng.integers(0, n_track_lists, size=n_rows)]
+
+    year = rng.integers(1951, 2030, size=n_rows).astype(str).astype(object)
+    year = _inject(rng, year, missing_year_rate, [None])
+    year = _inject(rng, year, invalid_year_rate, INVALID_YEARS)
+
+    id_ = (100000 + np.arange(n_rows) % 900000).astype(str).astype(object)
+    short_ids = rng.integers(1000, 100000, size=n_rows).astype(str).astype(object)
+    is_short = rng.random(n_rows) < short_id_rate
+    id_[is_short] = short_ids[is_short]
+
+    df = pd.DataFrame(
+        {
+            "artist": artist,
+            "category": category,
+            "genre": genre,
+            "title": title,
+            "tracks": tracks,
+            "year": year,
+            "id": id_,
+            "merged_values": np.full(n_rows, None, dtype=object),
+        },
+        columns=COLUMNS,
+    )
+    return as_str_columns(df)
@@ -0,0 +1,118 @@
+"""tracks.py
+
+Track-level data from the pipe-separated "tracks" column of the albums.
+
+* `AlbumTracks.from_albums()` splits every album's tracks at once: the
+  tracks column is joined into one string and split on "|" in a single
+  call, and the owning album of each track is found from the per-album track
+  counts (`np.repeat`), rather than splitting into one list per album and
+  merging the exploded tracks back onto the album frame.
+* Track names are stripped and empty names dropped. An album with missing
+  tracks keeps one track with a missing name.
+* `AlbumTracks` holds the tracks in a CSR-style layout: `values` has every
+  track name, album by album, and the tracks of the album at position `i`
+  are `values[offsets[i]:offsets[i + 1]]` (see `tracks_of()`).
+* `AlbumTracks.to_frame()` returns the compact `track_level_df`: track id,
+  album id, track position within the album (from 1) and track name, with
+  no repeated album columns.
+"""
+
+import numpy as np
+import pandas as pd
+
+TRACK_SEPARATOR = "|"
+
+
+class AlbumTracks:
+    """Track names of a sequence of albums, stored as offsets and values."""
+
+    def __init__(
+        self, album_ids: pd.Series, offsets: np.ndarray, values: pd.Series
+    ) -> None:
+        if len(offsets) != len(album_ids) + 1 or offsets[-1] != len(values):
+            raise ValueError("Offsets must bound the values of each album")
+        self.album_ids = album_ids.reset_index(drop=True)
+        self.offsets = offsets
+        self.values = values.reset_index(drop=True)
+
+    @classmethod
+    def from_albums(
+        cls,
+        albums_df: pd.DataFrame,
+        tracks_column: str = "tracks",
+        id_column: str = "id",
+    ) -> "AlbumTracks":
+        """Split the tracks of each album (row) of `albums_df`."""
+        tracks = albums_df[tracks_column]
+        is_missing = tracks.isna().to_numpy()
+        # Plain string methods are much faster than the `.str` accessor here
+        filled = tracks.astype(object).where(~is_missing, "").tolist()
+        counts = np.fromiter(
+            (value.count(TRACK_SEPARATOR) + 1 for value in filled),
+            dtype=np.int64,
+            count=len(filled),
+        )
+        split_offsets = np.concatenate([[0], np.cumsum(counts)])
+
+        split = TRACK_SEPARATOR.join(filled).split(TRACK_SEPARATOR)
+        # Without albums, the empty join still splits into one name
+        names = np.array(
+            [name.strip() for name in split[: split_offsets[-1]]], dtype=object
+        )
+        keep = names != ""
+        # An album without tracks splits into one empty name; keep it, missing
+        missing_positions = split_offsets[:-1][is_missing]
+        keep[missing_positions] = True
+        names[missing_positions] = np.nan
+
+        album_positions = np.repeat(np.arange(len(tracks)), counts)[keep]
+        kept_counts = np.bincount(album_positions, minlength=len(tracks))
+        offsets = np.concatenate([[0], np.cumsum(kept_counts)])
+        values = pd.Series(names[keep], dtype="str")
+        return cls(albums_df[id_column], offsets, values)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @property
+    def n_albums(self) -> int:
+        return len(self.album_ids)
+
+    def counts(self) -> np.ndarray:
+        """Number of tracks of each album."""
+        return np.diff(self.offsets)
+
+    def tracks_of(self, album_position: int) -> pd.Series:
+        """Track names of the album at `album_position`."""
+        start, stop = self.offsets[album_position], self.offsets[album_position + 1]
+        return self.values.iloc[start:stop]
+
+    def album_positions(self) -> np.ndarray:
+        """Position of the album of each track."""
+        return np.repeat(np.arange(self.n_albums), self.counts())
+
+    def to_frame(self, track_id_offset: int = 0) -> pd.DataFrame:
+        """One row per track: track_id, album_row_id, track_position, track_name.
+
+        Track ids number the tracks from `track_id_offset`, e.g. to continue
+        them across chunks.
+        """
+        album_positions = self.album_positions()
+        track_ids = np.arange(track_id_offset, track_id_offset + len(self))
+        return pd.DataFrame(
+            {
+                "track_id": track_ids,
+                "album_row_id": self.album_ids.take(album_positions).reset_index(
+                    drop=True
+                ),
+                "track_position": (
+                    np.arange(len(self)) - self.offsets[album_positions] + 1
+                ),
+                "track_name": self.values,
+            }
+        )
+
+
+def to_track_level(albums_df: pd.DataFrame, track_id_offset: int = 0) -> pd.DataFrame:
+    """`track_level_df` of `albums_df`; see `AlbumTracks.to_frame()`."""
+    return AlbumTracks.from_albums(albums_df).to_frame(track_id_offset)
@@ -1,11 +1,15 @@
 import logging
 import typing
-from typing import Any, Dict, Hashable, List, Union
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Union
 
 import pandas as pd
 import pandera as pa
 import tabulate
 
+from . import checks, rules
+from .change_tracking import diff_frames
+from .schema import check_description
+
 
 def get_check_name_descriptions(schema: pa.DataFrameSchema) -> Dict[str, str]:
     """Get the descriptions for each check function."""
@@ -13,7 +17,10 @@ def get_check_name_descriptions(schema: pa.DataFrameSchema) -> Dict[str, str]:
     check_name_descriptions: Dict[str, str] = {}
     for _column_name, column_obj in schema.columns.items():
         for check in column_obj.checks:
-            check_name_descriptions[check.name] = check.description
+            # Check sources are only read when reporting
+            check_name_descriptions[check.name] = (
+                check.description or check_description(check.name) or ""
+            )
     return check_name_descriptions
 
 
@@ -44,19 +51,47 @@ def get_check_func_descriptions(
     return failure_cases_df_with_source
 
 
+def get_fired_rules(failure_cases_df: pd.DataFrame) -> pd.DataFrame:
+    """Adds the rule (see `rules.CHECK_RULES`) each failure case broke."""
+    # Checks are named after the docstrings of their `checks.check_*` function
+    check_func_names = {
+        func.__doc__: name
+        for name, func in vars(checks).items()
+        if name.startswith("check_") and func.__doc__
+    }
+    return failure_cases_df.assign(
+        rule=[
+            rules.fired_rule(check_func_names.get(check, ""), failure_case)
+            for check, failure_case in zip(
+                failure_cases_df["check"], failure_cases_df["failure_case"]
+            )
+        ]
+    )
+
+
 @typing.no_type_check
 def get_failure_cases_summary_as_formatted_table(
-    failure_cases_df: pd.DataFrame,
+    failure_cases_summary: pd.DataFrame,
 ) -> None:
-    failure_cases_summary: pd.DataFrame = (
-        failure_cases_df.groupby(
-            ["column", "check", "check_source_code"], as_index=False
+    """Format failure-case counts by column and check as a grid table.
+
+    `failure_cases_summary` has the columns of `failure_store.failure_counts`
+    with `source_code=True`; failure cases with check descriptions (see
+    `get_check_func_descriptions`) are counted first. Checks without source
+    code (dtype and nullable checks) are left out.
+    """
+    if "counts" not in failure_cases_summary:
+        failure_cases_summary = (
+            failure_cases_summary.groupby(
+                ["column", "check", "check_source_code"], as_index=False
+            )
+            .size()
+            .sort_values(by=["column", "check"])
+            .rename(columns={"size": "counts"})
         )
-        .size()
-        .sort_values(by=["column", "check"])
-        .rename(columns={"size": "counts"})
-        .loc[:, ["column", "check", "counts", "check_source_code"]]
-    )
+    failure_cases_summary = failure_cases_summary.dropna(
+        subset=["check_source_code"]
+    ).loc[:, ["column", "check", "counts", "check_source_code"]]
 
     report_items: List[Dict[Hashable, Any]] = failure_cases_summary.to_dict(
         orient="records"
@@ -69,28 +104,43 @@ def get_failure_cases_summary_as_formatted_table(
 
 @typing.no_type_check
 def log_df_change(
-    after_df: pd.DataFrame, before_df: pd.DataFrame, operation_label: str
+    after_df: pd.DataFrame,
+    before_df: pd.DataFrame,
+    operation_label: str,
+    columns: Optional[Sequence[str]] = None,
+    full_compare: bool = False,
 ) -> pd.DataFrame:
-    comps_df: pd.DataFrame = before_df.compare(
-        after_df, result_names=("before", "after")
-    )
+    """Log the rows and columns a cleaning step changed, with examples.
 
-    if not comps_df.empty:
+    Only `columns` are compared (default: all); see `diff_frames`. With
+    `full_compare=True`, the frames are compared with `DataFrame.compare`
+    instead, which is much slower on large frames.
+    """
+    if full_compare:
+        comps_df: pd.DataFrame = before_df.compare(
+            after_df, result_names=("before", "after")
+        )
+        n_rows, _ = comps_df.shape
+        columns_affected = set([col for col, _ in comps_df.columns.tolist()])
+        comps_df_sample = comps_df.sample(min(5, len(comps_df)), random_state=0)
+    else:
+        changes = diff_frames(before_df, after_df, columns)
+        n_rows = len(changes)
+        columns_affected = set(changes.columns)
+        comps_df_sample = changes.sample(5)
+
+    if n_rows > 0:
         comps_df_sample_markdown: str = (
-            comps_df.sample(5, random_state=0).fillna("").to_markdown()
+            comps_df_sample.astype("object").fillna("").to_markdown()
         )
     else:
         comps_df_sample_markdown: Union[str, None] = None  # type: ignore[no-redef]
 
-    n_rows, _ = comps_df.shape
-
     log_message = "Cleaning operation"
     log_message += f"\noperation_label: {operation_label}"
     log_message += f"\ncleaning operation_label: {operation_label}"
     log_message += f"\nNumber of rows affected: {n_rows}"
-    log_message += (
-        f"\nColumns affected: {set([col for col, _ in comps_df.columns.tolist()])}"
-    )
+    log_message += f"\nColumns affected: {columns_affected}"
     log_message += f"\nExamples:\n{comps_df_sample_markdown}\n"
     log_message += f"{'='*100}\n"
     log_message += f"{'='*100}\n"
@@ -0,0 +1,114 @@
+"""value_cache.py
+
+Run value-level transforms (the `clean_value_*()` functions) once per
+distinct value instead of once per row.
+
+* `apply_value_transform()` factorizes a column, calls the transform on the
+  distinct values only and broadcasts the results back to every row.
+* Across calls (e.g., chunk after chunk), results are also kept in a bounded
+  LRU cache per transform. `set_value_cache_size()` changes the bound and
+  `value_cache_info()` reports hits and misses.
+* Transforms must be pure functions of a single hashable value.
+* Bound methods (e.g. `ArtistIndex.canonicalize`), and compositions of
+  transforms holding one, are not cached: the caches live as long as the
+  process, and would keep every instance alive.
+* Categorical columns are transformed through `map_categories()`: only the
+  categories are transformed and the result is categorical too.
+"""
+
+import functools
+import inspect
+from typing import Any, Callable, Dict
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_VALUE_CACHE_SIZE = 100_000
+
+_value_cache_size = DEFAULT_VALUE_CACHE_SIZE
+_value_caches: Dict[Callable[[Any], Any], Callable[[Any], Any]] = {}
+
+
+def is_cacheable(func: Callable[[Any], Any]) -> bool:
+    """Whether `func` is a plain function, or composed of plain functions."""
+    if inspect.ismethod(func):
+        return False
+    return all(is_cacheable(part) for part in getattr(func, "funcs", ()))
+
+
+def cached(func: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    """Return the LRU-cached version of `func`, creating it on first use.
+
+    Transforms that can't be cached (see `is_cacheable()`) are returned as is.
+    """
+    if not is_cacheable(func):
+        return func
+    if func not in _value_caches:
+        _value_caches[func] = functools.lru_cache(maxsize=_value_cache_size)(func)
+    return _value_caches[func]
+
+
+def set_value_cache_size(maxsize: int) -> None:
+    """Bound each transform's cache to `maxsize` values; clears the caches."""
+    global _value_cache_size
+    _value_cache_size = maxsize
+    _value_caches.clear()
+
+
+def value_cache_info() -> pd.DataFrame:
+    """Hits, misses and size of each transform's cache in this process."""
+    return pd.DataFrame(
+        [
+            {"transform": func.__name__, **cached_func.cache_info()._asdict()}  # type: ignore[attr-defined]  # noqa
+            for func, cached_func in _value_caches.items()
+        ],
+        columns=["transform", "hits", "misses", "maxsize", "currsize"],
+    )
+
+
+def apply_value_transform(
+    series: pd.Series, func: Callable[[Any], Any], cache: bool = True
+) -> pd.Series:
+    """Equivalent to `series.apply(func)`, calling `func` once per distinct value.
+
+    With `cache=True`, results are also looked up in / saved to `func`'s LRU
+    cache, so values seen in earlier calls are not transformed again.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return map_categories(
+            series, lambda values: apply_value_transform(values, func, cache)
+        )
+    codes, uniques = pd.factorize(series, use_na_sentinel=False)
+    transform = cached(func) if cache else func
+    results = pd.Series([transform(value) for value in uniques], dtype=object)
+    # Infer the result dtype the same way `Series.apply` does
+    results = results.infer_objects()
+    transformed = results.take(codes)
+    transformed.index = series.index
+    transformed.name = series.name
+    return transformed
+
+
+def map_categories(
+    series: pd.Series, transform: Callable[[pd.Series], pd.Series]
+) -> pd.Series:
+    """Apply the value-by-value `transform` to the categories of `series`.
+
+    Missing values are transformed too, as by `Series.apply`. The result is
+    categorical, with the distinct transformed values as its categories.
+    """
+    values = pd.Series(series.cat.categories, dtype=object)
+    has_missing = bool(series.isna().any())
+    if has_missing:
+        # Code -1 (missing) then picks the last value
+        values = pd.concat([values, pd.Series([np.nan], dtype=object)])
+    results = transform(values.reset_index(drop=True))
+    result_codes, result_categories = pd.factorize(results)
+    if not has_missing:
+        result_codes = np.append(result_codes, -1)
+    codes = result_codes[series.cat.codes.to_numpy()]
+    return pd.Series(
+        pd.Categorical.from_codes(codes, categories=result_categories),
+        index=series.index,
+        name=series.name,
+    )
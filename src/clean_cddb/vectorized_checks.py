@@ -0,0 +1,210 @@
+"""vectorized_checks.py
+
+Column-level (vectorized) counterparts of the checks in `checks.py`.
+
+* Each `check_*()` function here takes a whole `pd.Series` and returns a
+  boolean `pd.Series` aligned on the same index.
+* Function names and docstrings mirror `checks.py` so the pandera check
+  names (taken from `__doc__`) and the failure cases are identical.
+* String columns (pandas' "str" dtype, or object columns of strings) are
+  checked as they are, without casting to object. Regexes run through the
+  `.str` accessor with the compiled patterns of `rules.py`; integers are
+  parsed once per check, by `.str.isdecimal()` and a float cast of the
+  decimal strings as one array.
+* The artist, genre and year checks run once per distinct value of a string
+  column (`pd.factorize`) or per category of a categorical one, as these
+  columns repeat a few values over many rows, and the results are spread
+  back to the rows.
+* Values the fast path cannot decide (non-strings in an object column,
+  integer literals with a sign, spaces or underscores, etc.) fall back to
+  the element-wise check from `checks.py`, so results match the
+  element-wise schema value for value.
+"""
+
+from typing import Any, Callable, Tuple
+
+import numpy as np
+import pandas as pd
+
+from . import checks, rules
+
+
+def _is_string_column(x: pd.Series) -> bool:
+    if isinstance(x.dtype, pd.StringDtype):
+        return True
+    return x.dtype == object and pd.api.types.infer_dtype(x, skipna=True) in (
+        "string",
+        "empty",
+    )
+
+
+def _strings(x: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    """Split `x` into its string values (NaN elsewhere) and a string mask."""
+    if _is_string_column(x):
+        return x, x.notna()
+    if x.dtype != object:
+        # Categoricals, numbers, ...
+        x = x.astype(object)
+        if pd.api.types.infer_dtype(x, skipna=True) in ("string", "empty"):
+            return x, x.notna()
+    is_str = x.map(lambda value: isinstance(value, str)).astype(bool)
+    return x.where(is_str), is_str
+
+
+def _other(x: pd.Series, is_str: pd.Series) -> pd.Series:
+    """Non-null values that are not strings; every check fails on nulls."""
+    return ~is_str & x.notna()
+
+
+def _fallback(
+    result: pd.Series, mask: pd.Series, x: pd.Series, func: Callable[[Any], bool]
+) -> pd.Series:
+    """Run the element-wise `func` on the values selected by `mask`."""
+    if mask.any():
+        result = result.copy()
+        result[mask] = [func(value) for value in x[mask]]
+    return result
+
+
+def _on_distinct(x: pd.Series, check: Callable[[pd.Series], pd.Series]) -> pd.Series:
+    """Run `check` once per distinct value of a string or categorical column."""
+    if isinstance(x.dtype, pd.CategoricalDtype):
+        codes = x.cat.codes.to_numpy()
+        valid = check(pd.Series(x.cat.categories)).to_numpy(dtype=bool)
+        return pd.Series(np.append(valid, False)[codes], index=x.index)
+    if not _is_string_column(x):
+        return check(x)
+    codes, uniques = pd.factorize(x)
+    valid = check(pd.Series(uniques, dtype=x.dtype)).to_numpy(dtype=bool)
+    # Nulls (code -1) fail every check
+    return pd.Series(np.append(valid, False)[codes], index=x.index)
+
+
+def _parse_int(x: pd.Series) -> pd.DataFrame:
+    """Emulate `int(x)` on a whole column.
+
+    Returns a frame with the parsed `value` (float, NaN where `int()` fails)
+    and an `undecided` mask for values that need the element-wise check.
+    """
+    if pd.api.types.is_bool_dtype(x) or pd.api.types.is_numeric_dtype(x):
+        numbers = pd.to_numeric(x, errors="coerce").astype("float64")
+        numbers = numbers.where(np.isfinite(numbers))
+        return pd.DataFrame(
+            {"value": np.trunc(numbers), "undecided": False}, index=x.index
+        )
+
+    strings, is_str = _strings(x)
+    text = strings.to_numpy(dtype=object, na_value="")
+    # Decimal digits only; `int()` also takes a sign, spaces and underscores
+    is_int = (
+        pd.Series(text, dtype=object).str.isdecimal().to_numpy(dtype=bool)
+        & is_str.to_numpy()
+    )
+    undecided = (is_str.to_numpy() & ~is_int & (text != "")) | _other(
+        x, is_str
+    ).to_numpy()
+    value = np.full(len(x), np.nan)
+    try:
+        value[is_int] = text[is_int].astype(np.float64)
+    except ValueError:
+        # Digits NumPy doesn't parse
+        undecided = undecided | is_int
+    return pd.DataFrame({"value": value, "undecided": undecided}, index=x.index)
+
+
+def check_col_has_valid_characters(x: pd.Series) -> pd.Series:
+    """Check for *possibly* invalid symbols."""
+
+    # consider NaNs and floats to be invalid
+    strings, is_str = _strings(x)
+    has_invalid = strings.str.contains(
+        rules.INVALID_CHARACTERS.pattern, regex=True, na=True
+    )
+    return ~has_invalid.astype(bool) & is_str
+
+
+def _artist_is_valid(x: pd.Series) -> pd.Series:
+    strings, is_str = _strings(x)
+    is_various = strings.str.contains(
+        rules.VARIOUS_ARTIST.pattern, regex=True, na=False
+    ).astype(bool)
+    has_question_marks = strings.str.contains("??", regex=False, na=False)
+    valid = ~((is_various & (strings != "Various")) | has_question_marks.astype(bool))
+    return _fallback(valid & is_str, _other(x, is_str), x, checks.check_artist_is_valid)
+
+
+def check_artist_is_valid(x: pd.Series) -> pd.Series:
+    """Check for invalid artist values."""
+
+    return _on_distinct(x, _artist_is_valid)
+
+
+def check_category_is_valid(x: pd.Series) -> pd.Series:
+    """Check for invalid categories."""
+
+    return x.isin(rules.VALID_CATEGORIES).astype(bool)
+
+
+def _genre_is_valid(x: pd.Series) -> pd.Series:
+    strings, is_str = _strings(x)
+    has_dashes = strings.str.contains("--", regex=False, na=False).astype(bool)
+    return _fallback(
+        is_str & ~has_dashes, _other(x, is_str), x, checks.check_genre_is_valid
+    )
+
+
+def check_genre_is_valid(x: pd.Series) -> pd.Series:
+    """Check for invalid genres."""
+
+    return _on_distinct(x, _genre_is_valid)
+
+
+def _year_range_is_valid(x: pd.Series) -> pd.Series:
+    parsed = _parse_int(x)
+    valid = (parsed["value"] > 1950) & (parsed["value"] < 2030)
+    return _fallback(valid, parsed["undecided"], x, checks.check_year_range_is_valid)
+
+
+def check_year_range_is_valid(x: pd.Series) -> pd.Series:
+    """Check that year is between 1950 and 2030."""
+
+    return _on_distinct(x, _year_range_is_valid)
+
+
+def _year_is_numeric(x: pd.Series) -> pd.Series:
+    parsed = _parse_int(x)
+    valid = parsed["value"] >= 0
+    return _fallback(valid, parsed["undecided"], x, checks.check_year_is_numeric)
+
+
+def check_year_is_numeric(x: pd.Series) -> pd.Series:
+    """Check if year is numeric."""
+
+    return _on_distinct(x, _year_is_numeric)
+
+
+def check_track_has_numeric_prefix(x: pd.Series) -> pd.Series:
+    """Check for tracks *possibly* using numeric prefix."""
+    strings, _ = _strings(x)
+    lowered = strings.str.lower()
+    has_keyword = lowered.str.contains(
+        rules.TRACK_KEYWORD.pattern, regex=True, na=False
+    )
+    return ~has_keyword.astype(bool)
+
+
+def check_id_six_digit_starting_one(x: pd.Series) -> pd.Series:
+    parsed = _parse_int(x)
+    valid = (parsed["value"] >= 100000) & (parsed["value"] < 200000)
+    return _fallback(
+        valid, parsed["undecided"], x, checks.check_id_six_digit_starting_one
+    )
+
+
+def check_id_length_is_six(x: pd.Series) -> pd.Series:
+    """Check that the length of 'id' is 6 characters."""
+    strings, is_str = _strings(x)
+    valid = strings.str.len() == 6
+    return _fallback(
+        valid & is_str, _other(x, is_str), x, lambda value: len(value) == 6
+    )
@@ -0,0 +1,140 @@
+import pandas as pd
+import pytest
+
+from clean_cddb.artist_index import (
+    EXACT,
+    FUZZY,
+    MAPPING_COLUMNS,
+    UNCHANGED,
+    ArtistIndex,
+    artist_key,
+)
+from clean_cddb.cleaning_transforms import (
+    clean_df_canonicalize_artists,
+    get_cleaning_pipeline,
+)
+from clean_cddb.synthetic import generate_cddb
+
+ARTISTS = pd.Series(
+    ["Björk", "Bjork", "BJORK", " bjork ", "Bjork"]
+    + ["AC/DC", "AC/DC", "AC-DC"]
+    + ["Metallica", "Metallica", "Metalica"]
+    + ["Blink-182", "Blink-182", "Blink-183"]
+    + ["Motorhead", "Motorhead", "Motorhead??"]
+    + ["U2", "U 2", None]
+)
+
+
+def test_artist_key() -> None:
+    assert artist_key("  Björk   Guðmundsdóttir ") == "bjork guðmundsdottir"
+    assert artist_key("SIGUR RÓS") == artist_key("sigur ros")
+
+
+def test_artist_index_maps_spellings_to_canonical_forms() -> None:
+    index = ArtistIndex.from_artists(ARTISTS)
+
+    mapping = index.to_frame().set_index("artist")
+    assert list(index.to_frame().columns) == MAPPING_COLUMNS
+    assert mapping["canonical_artist"].to_dict() == {
+        "BJORK": "Bjork",
+        " bjork ": "Bjork",
+        "Björk": "Bjork",
+        "Motorhead??": "Motorhead",
+    }
+    assert mapping.loc["Björk", "match"] == EXACT
+    assert mapping.loc["Motorhead??", "match"] == FUZZY
+    assert mapping.loc["Motorhead??", "similarity"] == 1
+    # Valid spellings need three times their rows to be matched fuzzily
+    assert index.canonicalize("Metalica") == "Metalica"
+    assert index.canonicalize("AC-DC") == "AC-DC"
+    # Other numbers, and keys too short to match fuzzily, are kept
+    assert index.canonicalize("Blink-183") == "Blink-183"
+    assert index.canonicalize("U 2") == "U 2"
+    assert index.canonicalize("Not indexed") == "Not indexed"
+
+    summary = index.summary().set_index("match")
+    assert summary["spellings"].sum() == len(index)
+    assert summary.loc[UNCHANGED, "rows"] == len(ARTISTS.dropna()) - 4
+    with pytest.raises(ValueError):
+        index.update(ARTISTS)
+
+
+def test_artist_index_fuzzy_matches_need_more_rows() -> None:
+    artists = pd.Series(["Emil Richards", "Emily Richards", "Motorhead??"])
+
+    index = ArtistIndex.from_artists(pd.concat([artists, pd.Series(["Motorhead"])]))
+
+    # Each spelling is seen once, so none is rewritten
+    assert index.to_frame().empty
+    index = ArtistIndex.from_artists(pd.concat([artists, artists]))
+    assert index.to_frame().empty
+    with pytest.raises(ValueError):
+        ArtistIndex(min_rows_ratio=1)
+
+
+def test_artist_index_matches_valid_spellings_strictly() -> None:
+    artists = pd.Series(
+        ["Elvis Presley"] * 9 + ["Presley Elvis"] * 3 + ["Presley, Elvis"]
+    )
+    richards = pd.Series(["Emil Richards"] * 3 + ["Emily Richards"])
+
+    index = ArtistIndex.from_artists(pd.concat([artists, richards]))
+
+    mapping = index.to_frame().set_index("artist")
+    # Matched spellings are not targets, so both map to "Elvis Presley"
+    assert mapping["canonical_artist"].to_dict() == {
+        "Presley Elvis": "Elvis Presley",
+        "Presley, Elvis": "Elvis Presley",
+    }
+    assert (mapping["match"] == FUZZY).all()
+    # Too far apart for valid spellings
+    assert index.canonicalize("Emily Richards") == "Emily Richards"
+    with pytest.raises(ValueError):
+        ArtistIndex(valid_min_rows_ratio=1)
+
+
+def test_artist_index_skips_common_ngrams() -> None:
+    artists = pd.Series(["Motorhead", "Motorhead", "Motorhead??"])
+
+    # Every n-gram is shared by both keys, so none is used to find candidates
+    index = ArtistIndex.from_artists(artists, max_block_size=1)
+
+    assert index.to_frame().empty
+
+
+def test_artist_index_built_in_chunks_matches_whole_index() -> None:
+    artists = generate_cddb(2000, seed=3)["artist"]
+    chunked = ArtistIndex()
+    for start in range(0, len(artists), 300):
+        chunked.update(artists.iloc[start : start + 300])
+
+    pd.testing.assert_frame_equal(
+        chunked.to_frame(), ArtistIndex.from_artists(artists).to_frame()
+    )
+
+
+def test_canonicalization_stage_runs_fused_before_rejections() -> None:
+    df = pd.DataFrame({"artist": ARTISTS.fillna("N/A")}).assign(
+        id="100001",
+        category="rock",
+        genre="Rock",
+        year="1999",
+        title="Title",
+        tracks="A|B",
+    )
+    index = ArtistIndex.from_artists(df["artist"])
+
+    fused = get_cleaning_pipeline(reject_sentinel=True, artist_index=index)
+    unfused = get_cleaning_pipeline(
+        reject_sentinel=True, artist_index=index, fuse=False
+    )
+    cleaned = fused.run(df)
+
+    assert "clean_df_canonicalize_artists" in fused.plan()[0].name
+    pd.testing.assert_frame_equal(cleaned, unfused.run(df))
+    # "Motorhead??" is repaired rather than rejected
+    assert cleaned["artist"].tolist()[14:17] == ["Motorhead"] * 3
+    assert cleaned["artist"].str.contains("REJECT_ROW").sum() == 0
+    pd.testing.assert_frame_equal(
+        clean_df_canonicalize_artists(df), clean_df_canonicalize_artists(df, index)
+    )
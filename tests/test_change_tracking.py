@@ -0,0 +1,48 @@
+import pandas as pd
+import pytest
+
+import clean_cddb
+from clean_cddb.change_tracking import diff_frames
+from clean_cddb.id_index import IdIndex
+from clean_cddb.synthetic import generate_cddb
+
+
+@pytest.mark.parametrize("reject_sentinel", [False, True])
+def test_diff_frames_matches_compare(reject_sentinel: bool) -> None:
+    df = generate_cddb(2000, mojibake_rate=0.05, dash_genre_rate=0.05)
+    ids = IdIndex().update(df["id"])
+    for func, kwargs in clean_cddb.get_cleaning_steps(
+        ids=ids, reject_sentinel=reject_sentinel
+    ):
+        before_df = df
+        df = func(df, **kwargs)
+        expected = before_df.reindex(columns=df.columns).compare(df)
+
+        # Only the columns the step declares are compared
+        changes = diff_frames(before_df, df, clean_cddb.get_step_columns(func, kwargs))
+
+        assert len(changes) == len(expected), func.__name__
+        assert set(changes.columns) == set(
+            expected.columns.get_level_values(0)
+        ), func.__name__
+
+
+def test_changes_sample() -> None:
+    before_df = pd.DataFrame({"a": ["x", "y", None], "b": ["1", "2", "3"]})
+    after_df = before_df.assign(a=["x", "z", "w"], year=[None, None, 2000])
+
+    changes = diff_frames(before_df, after_df)
+
+    assert changes.columns == ["a", "year"]
+    assert changes.row_positions().tolist() == [1, 2]
+    sample = changes.sample(5)
+    assert sample.columns.tolist() == [
+        ("a", "before"),
+        ("a", "after"),
+        ("year", "before"),
+        ("year", "after"),
+    ]
+    assert sample.loc[1, ("a", "after")] == "z"
+    assert pd.isna(sample.loc[1, ("year", "after")])
+    assert sample.loc[2, ("year", "after")] == 2000
+    assert len(diff_frames(before_df, before_df.copy())) == 0
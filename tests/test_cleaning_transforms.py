@@ -1,10 +1,16 @@
 from typing import Any
 
+import pandas as pd
 import pytest
 
 from clean_cddb.cleaning_transforms import (
+    clean_df_genre_invalid,
+    clean_df_id_format,
+    clean_df_invalid_symbols,
+    clean_df_year,
     clean_value_standardize_various_artist,
     clean_value_try_to_fix_encoding_errors,
+    drop_rejected_rows,
 )
 
 
@@ -48,5 +54,62 @@ def test_clean_value_try_to_fix_encoding_errors(
     assert clean_value_try_to_fix_encoding_errors(input_value) == expected_output
 
 
+def make_albums_df() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "artist": ["Tool", "?? ??", "Björk", "Various Artists"],
+            "genre": ["Metal", "Rock", "Rock--Pop", None],
+            "id": ["100001", "1234", "5678", "100004"],
+        }
+    )
+
+
+def test_clean_df_reject_rows_with_rejection_reason() -> None:
+    clean_df = (
+        make_albums_df().pipe(clean_df_invalid_symbols).pipe(clean_df_genre_invalid)
+    )
+
+    assert clean_df["rejection_reason"].fillna("").tolist() == [
+        "",
+        "invalid artist",
+        "invalid genre",
+        "invalid artist",
+    ]
+    assert clean_df["genre"].tolist() == ["Metal", "Rock", "Rock--Pop", "N/A"]
+    assert drop_rejected_rows(clean_df)["id"].tolist() == ["100001"]
+
+
+def test_clean_df_reject_rows_with_sentinel() -> None:
+    clean_df = make_albums_df().pipe(clean_df_invalid_symbols, reject_sentinel=True)
+
+    assert "rejection_reason" not in clean_df.columns
+    assert clean_df.loc[1].tolist() == ["REJECT_ROW - invalid artist"] * 3
+    assert clean_df.query("~id.str.contains('REJECT_ROW')").index.tolist() == [0, 2]
+
+
+def test_clean_df_id_format() -> None:
+    df = pd.DataFrame({"id": ["100001", "1234", "5678", "105678", "REJECT_ROW"]})
+
+    assert clean_df_id_format(df)["id"].tolist() == [
+        "100001",
+        "101234",
+        "5678",  # "105678" is taken
+        "105678",
+        "REJECT_ROW",
+    ]
+
+
+@pytest.mark.parametrize("dtype", ["int64", "Int16"])
+def test_clean_df_year_keeps_integer_type(dtype: str) -> None:
+    df = pd.DataFrame({"year": pd.Series([0, 1999, 5000], dtype=dtype)})
+    text_df = df.astype(str)
+
+    clean_df = clean_df_year(df)
+
+    assert clean_df["year"].dtype == dtype.capitalize()
+    assert clean_df["year"].tolist() == clean_df_year(text_df)["year"].tolist()
+    assert clean_df["year"].isna().tolist() == [True, False, True]
+
+
 if __name__ == "__main__":
     pytest.main()
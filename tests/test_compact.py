@@ -0,0 +1,51 @@
+import pandas as pd
+import pytest
+
+import clean_cddb
+from clean_cddb.compact import compact_frame, expand_frame, memory_report
+from clean_cddb.id_index import IdIndex
+from clean_cddb.synthetic import generate_cddb
+
+
+@pytest.mark.parametrize("reject_sentinel", [False, True])
+def test_compact_cleaning_matches_regular(reject_sentinel: bool) -> None:
+    source_df = generate_cddb(2000, mojibake_rate=0.05, dash_genre_rate=0.05)
+    ids = IdIndex().update(source_df["id"])
+    steps = clean_cddb.get_cleaning_steps(ids=ids, reject_sentinel=reject_sentinel)
+
+    df = source_df
+    compact_df = compact_frame(source_df)
+    for func, kwargs in steps:
+        df = func(df, **kwargs)
+        compact_df = func(compact_df, **kwargs)
+        assert isinstance(compact_df["category"].dtype, pd.CategoricalDtype)
+        if not reject_sentinel:
+            # Sentinels are strings, so they make the year an object column
+            assert compact_df["year"].dtype == "Int16"
+
+    pd.testing.assert_frame_equal(expand_frame(compact_df), df)
+
+
+def test_compact_frame_dtypes() -> None:
+    source_df = generate_cddb(500)
+
+    compact_df = compact_frame(source_df)
+
+    assert isinstance(compact_df["genre"].dtype, pd.CategoricalDtype)
+    assert compact_df["year"].dtype == "Int16"
+    assert compact_df["title"].dtype == source_df["title"].dtype
+
+
+def test_memory_report() -> None:
+    source_df = generate_cddb(500)
+
+    report = memory_report(source_df, compact_frame(source_df)).set_index("column")
+
+    assert report.loc["category", "dtype_after"] == "category"
+    assert (
+        report.loc["category", "bytes_after"] < report.loc["category", "bytes_before"]
+    )
+    assert (
+        report.loc["total", "bytes_before"] == source_df.memory_usage(deep=True).sum()
+    )
+    assert report.loc["title", "ratio"] == 1
@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pandera as pa
+import pytest
+
+from clean_cddb.distinct_validation import (
+    FAILURE_CASE_COLUMNS,
+    distinct_failure_cases,
+    factorize,
+)
+from clean_cddb.schema import schema
+from clean_cddb.synthetic import generate_cddb
+from clean_cddb.utils import get_check_func_descriptions
+
+
+def full_failure_cases(df: pd.DataFrame) -> pd.DataFrame:
+    with pytest.raises(pa.errors.SchemaErrors) as err:
+        schema(df, lazy=True)
+    failure_cases: pd.DataFrame = err.value.failure_cases
+    return failure_cases
+
+
+def as_sorted_strings(failure_cases: pd.DataFrame) -> pd.DataFrame:
+    return (
+        failure_cases[FAILURE_CASE_COLUMNS]
+        .astype(str)
+        .sort_values(by=FAILURE_CASE_COLUMNS)
+        .reset_index(drop=True)
+    )
+
+
+def test_factorize_keeps_missing_types_apart() -> None:
+    series = pd.Series(["a", None, "b", "a", np.nan, None], dtype=object)
+
+    codes, n_codes = factorize(series)
+
+    assert n_codes == 4
+    assert codes.tolist() == [0, 2, 1, 0, 3, 2]
+
+
+def test_distinct_failure_cases_match_full_validation() -> None:
+    df = generate_cddb(3000, mojibake_rate=0.05, dash_genre_rate=0.05)
+    df.index = df.index + 1000
+
+    failure_cases = distinct_failure_cases(df, schema)
+
+    pd.testing.assert_frame_equal(
+        as_sorted_strings(failure_cases), as_sorted_strings(full_failure_cases(df))
+    )
+    # Ordered by column, check and row
+    year = failure_cases[failure_cases["column"] == "year"]
+    for _, rows in year.groupby("check", sort=False):
+        assert rows["index"].is_monotonic_increasing
+    assert "check_source_code" in get_check_func_descriptions(failure_cases, schema)
+
+
+def test_distinct_failure_cases_of_mixed_and_categorical_columns() -> None:
+    df = pd.DataFrame(
+        {
+            "artist": ["Various Artists", "Björk", "BjÃ¶rk", None] * 3,
+            "category": pd.Categorical(["rock", "data", "misc", "folk"] * 3),
+            "genre": ["Rock", "--", None, np.nan] * 3,
+            "title": ["Greatest Hits", "中文", None, "Live"] * 3,
+            "year": ["1999", 1890, True, None] * 3,
+            "id": ["100001", "1234", "100003", "100004"] * 3,
+        }
+    ).astype({"artist": object, "genre": object, "title": object, "id": object})
+
+    pd.testing.assert_frame_equal(
+        as_sorted_strings(distinct_failure_cases(df, schema)),
+        as_sorted_strings(full_failure_cases(df)),
+    )
+
+
+def test_distinct_failure_cases_of_missing_column() -> None:
+    df = generate_cddb(100).drop(columns=["genre"])
+
+    failure_cases = distinct_failure_cases(df, schema)
+
+    assert "genre" in failure_cases["failure_case"].tolist()
+    pd.testing.assert_frame_equal(
+        as_sorted_strings(failure_cases), as_sorted_strings(full_failure_cases(df))
+    )
+
+
+def test_distinct_failure_cases_of_valid_frame() -> None:
+    valid_schema = pa.DataFrameSchema({"x": pa.Column(int, pa.Check.ge(0))})
+
+    failure_cases = distinct_failure_cases(pd.DataFrame({"x": [1, 2, 2]}), valid_schema)
+
+    assert failure_cases.empty
+    assert failure_cases.columns.tolist() == FAILURE_CASE_COLUMNS
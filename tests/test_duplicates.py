@@ -0,0 +1,137 @@
+import pandas as pd
+import pytest
+
+from clean_cddb.cleaning_transforms import (
+    REJECTION_REASON,
+    clean_df_collapse_duplicates,
+    exclude_rejected_albums,
+    get_cleaning_pipeline,
+)
+from clean_cddb.duplicates import (
+    CLUSTER_COLUMNS,
+    DuplicateIndex,
+    album_tokens,
+    normalize_text,
+)
+from clean_cddb.synthetic import generate_cddb
+
+TRACKS = [
+    "Papercut",
+    "One Step Closer",
+    "With You",
+    "Points Of Authority",
+    "Crawling",
+    "Runaway",
+    "By Myself",
+    "In The End",
+]
+ALBUMS = pd.DataFrame(
+    {
+        "id": ["100001", "100002", "100003", "100004", "100005", "100006"],
+        "artist": ["Linkin Park", "LINKIN PARK", "Linkin Park"]
+        + ["Other Artist", "Someone", "Someone Else"],
+        "title": ["Hybrid Theory", "Hybrid Theory!", "Hybrid Theory"]
+        + ["Other Album", "Data Disc", "Data Disc 2"],
+        "tracks": [
+            " | ".join(TRACKS + ["Forgotten"]),
+            " | ".join(TRACKS).upper(),
+            " | ".join(TRACKS[:4] + ["Bonus", "Remix"]),
+            "A Song | Another Song | A Third Song",
+            "Track 01 | Track 02 | Track 03 | Data",
+            "Track 01 | Track 02 | Track 03 | Data",
+        ],
+    },
+    index=[10, 11, 12, 13, 14, 15],
+)
+
+
+def test_normalize_text() -> None:
+    assert normalize_text(" Hybrid  THEORY! ") == "hybrid theory"
+    assert normalize_text("Björk") == normalize_text("bjork")
+    assert normalize_text(None) == ""
+
+
+def test_album_tokens_drop_placeholder_tracks() -> None:
+    hashes, offsets, track_counts = album_tokens(ALBUMS)
+
+    assert len(offsets) == len(ALBUMS) + 1
+    assert track_counts.tolist() == [9, 8, 6, 3, 0, 0]
+    # Each album has its distinct tracks plus its artist and title
+    assert (offsets[1:] - offsets[:-1]).tolist() == [11, 10, 8, 5, 2, 2]
+
+
+def test_duplicate_index_finds_clusters() -> None:
+    index = DuplicateIndex.from_albums(ALBUMS)
+
+    clusters = index.to_frame()
+    assert list(clusters.columns) == CLUSTER_COLUMNS
+    assert clusters["index"].tolist() == [10, 11]
+    assert clusters["is_representative"].tolist() == [True, False]
+    assert (clusters["cluster"] == 10).all()
+    assert clusters["jaccard"].iloc[1] == pytest.approx(10 / 11)
+    assert index.duplicate_rows().tolist() == [11]
+    # Albums of placeholder tracks only are not fingerprinted
+    assert len(index) == 4
+
+    summary = index.summary()
+    assert summary[["clusters", "duplicates"]].values.tolist() == [[1, 1]]
+    with pytest.raises(ValueError):
+        index.update(ALBUMS)
+
+
+def test_duplicate_index_built_in_chunks_matches_whole_index() -> None:
+    albums = generate_cddb(3000, seed=5)
+    chunked = DuplicateIndex()
+    for start in range(0, len(albums), 700):
+        chunked.update(albums.iloc[start : start + 700])
+
+    whole = DuplicateIndex.from_albums(albums)
+    assert len(whole.to_frame()) > 0
+    pd.testing.assert_frame_equal(chunked.to_frame(), whole.to_frame())
+
+
+def test_collapse_stage_keeps_representatives() -> None:
+    df = ALBUMS.assign(category="rock", genre="Rock", year="2000")
+    index = DuplicateIndex.from_albums(df)
+
+    collapsed = clean_df_collapse_duplicates(df, index)
+    assert collapsed[REJECTION_REASON].dropna().to_dict() == {11: "duplicate album"}
+    pd.testing.assert_frame_equal(collapsed, clean_df_collapse_duplicates(df))
+
+    # A row already rejected keeps its reason
+    rejected = df.assign(**{REJECTION_REASON: [None, "invalid id", *[None] * 4]})
+    collapsed = clean_df_collapse_duplicates(rejected, index)
+    assert collapsed[REJECTION_REASON].dropna().to_dict() == {11: "invalid id"}
+
+    pipeline = get_cleaning_pipeline(reject_sentinel=True, duplicates=index)
+    cleaned = pipeline.run(df)
+    assert pipeline.plan()[-1].name == "clean_df_collapse_duplicates"
+    assert cleaned.loc[11, "id"] == "REJECT_ROW - duplicate album"
+    assert not cleaned.drop(index=11)["id"].str.contains("REJECT_ROW").any()
+
+
+def test_collapse_stage_keeps_a_valid_album() -> None:
+    df = pd.DataFrame(
+        {
+            "id": ["100001", "100002"],
+            "artist": ["Queen??", "Queen"],
+            "title": ["A Night At The Opera"] * 2,
+            "tracks": [" | ".join(TRACKS[:6]), " | ".join(TRACKS[:5])],
+            "category": "rock",
+            "genre": "Rock",
+            "year": "1975",
+        },
+        index=[0, 1],
+    )
+    index = DuplicateIndex.from_albums(df, similarity=0.5)
+    # The album with the most tracks is rejected for its artist
+    assert index.duplicate_rows().tolist() == [1]
+
+    cleaned = get_cleaning_pipeline(duplicates=index).run(df)
+    assert cleaned[REJECTION_REASON].dropna().to_dict() == {0: "invalid artist"}
+
+    # Rejected in another chunk or partition
+    exclude_rejected_albums(index, df)
+    assert index.duplicate_rows().tolist() == [0]
+    cleaned = get_cleaning_pipeline(duplicates=index).run(df.loc[[1]])
+    assert cleaned[REJECTION_REASON].isna().all()
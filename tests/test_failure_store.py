@@ -0,0 +1,109 @@
+import sqlite3
+
+import pandas as pd
+import pandera as pa
+import pytest
+
+from clean_cddb.distinct_validation import FAILURE_CASE_COLUMNS
+from clean_cddb.failure_store import (
+    CHECKS_TABLE,
+    FAILURE_COLUMNS,
+    CheckDictionary,
+    create_view,
+    failure_counts,
+    normalize,
+)
+from clean_cddb.schema import schema
+from clean_cddb.sqlite_export import write_table
+from clean_cddb.synthetic import generate_cddb
+from clean_cddb.utils import (
+    get_check_func_descriptions,
+    get_failure_cases_summary_as_formatted_table,
+)
+
+
+def failure_cases_of(df: pd.DataFrame) -> pd.DataFrame:
+    with pytest.raises(pa.errors.SchemaErrors) as err:
+        schema(df, lazy=True)
+    failure_cases: pd.DataFrame = err.value.failure_cases
+    return failure_cases
+
+
+def store(failure_cases: pd.DataFrame) -> sqlite3.Connection:
+    checks = CheckDictionary.from_schema(schema)
+    conn = sqlite3.connect(":memory:")
+    write_table(conn, "failures", normalize(failure_cases, checks))
+    write_table(conn, CHECKS_TABLE, checks.to_frame())
+    create_view(conn, "failures", "failures_view")
+    return conn
+
+
+def test_check_ids_are_stable() -> None:
+    checks = CheckDictionary.from_schema(schema)
+    n_schema_checks = len(checks)
+    failure_cases = failure_cases_of(generate_cddb(500, mojibake_rate=0.1))
+
+    ids = checks.ids(failure_cases)
+    assert ids.index.equals(failure_cases.index)
+    # Dtype and nullable checks have ids from the schema too
+    assert len(checks) == n_schema_checks
+    assert CheckDictionary.from_schema(schema).to_frame().equals(checks.to_frame())
+    # Whatever check is seen first
+    reversed_ids = CheckDictionary.from_schema(schema).ids(failure_cases[::-1])
+    assert reversed_ids[::-1].equals(ids)
+
+    # Read back from the table, the same checks get the same ids
+    conn = sqlite3.connect(":memory:")
+    assert CheckDictionary.read(conn) is None
+    write_table(conn, CHECKS_TABLE, checks.to_frame())
+    read_checks = CheckDictionary.read(conn)
+    assert read_checks is not None
+    assert read_checks.ids(failure_cases).equals(ids)
+    assert len(read_checks) == len(checks)
+
+
+def test_view_gives_back_the_failure_cases() -> None:
+    failure_cases = failure_cases_of(generate_cddb(500, mojibake_rate=0.1))
+    conn = store(failure_cases)
+
+    assert list(pd.read_sql("SELECT * FROM failures", conn).columns) == [
+        "level_0",
+        *FAILURE_COLUMNS,
+    ]
+    view = pd.read_sql("SELECT * FROM failures_view", conn)
+    expected = get_check_func_descriptions(failure_cases, schema)
+    columns = [*FAILURE_CASE_COLUMNS, "check_source_code"]
+
+    def as_sorted_strings(df: pd.DataFrame) -> pd.DataFrame:
+        return (
+            df[columns]
+            .astype({"check_number": float, "index": float})
+            .astype(str)
+            .sort_values(columns)
+            .reset_index(drop=True)
+        )
+
+    pd.testing.assert_frame_equal(as_sorted_strings(view), as_sorted_strings(expected))
+
+
+def test_failure_counts_match_groupby() -> None:
+    failure_cases = failure_cases_of(generate_cddb(500, mojibake_rate=0.1))
+    conn = store(failure_cases)
+
+    counts = failure_counts(conn, "failures")
+    expected = (
+        failure_cases.groupby(["column", "check"], as_index=False)
+        .size()
+        .rename(columns={"size": "counts"})
+    )
+    pd.testing.assert_frame_equal(counts, expected, check_dtype=False)
+
+    table = get_failure_cases_summary_as_formatted_table(
+        failure_counts(conn, "failures", source_code=True)
+    )
+    assert "def check_col_has_valid_characters" in table
+    assert "not_nullable" not in table
+    # Failure cases with check descriptions are counted as they are
+    assert table == get_failure_cases_summary_as_formatted_table(
+        get_check_func_descriptions(failure_cases, schema)
+    )
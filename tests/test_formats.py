@@ -0,0 +1,106 @@
+import gzip
+import zipfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from clean_cddb import formats
+from clean_cddb.synthetic import generate_cddb
+
+
+def test_read_source_tsv(tmp_path: Path) -> None:
+    source_df = generate_cddb(50)
+    tsv_path = tmp_path / "cddb.tsv"
+    source_df.to_csv(tsv_path, sep="\t", index=False, encoding="latin1")
+
+    pd.testing.assert_frame_equal(formats.read_source(str(tsv_path)), source_df)
+    chunks = list(formats.read_source_chunks(str(tsv_path), 20, columns=["id"]))
+    assert [chunk.index[0] for chunk in chunks] == [0, 20, 40]
+    assert chunks[0].columns.tolist() == ["id"]
+
+
+def test_as_str_columns_keeps_missing_values() -> None:
+    df = pd.DataFrame({"genre": ["Rock", None, np.nan], "year": [1999, None, 2001]})
+
+    str_df = formats.as_str_columns(df)
+
+    assert str_df.isna().sum().tolist() == [2, 1]
+    assert str_df["genre"].iloc[0] == "Rock"
+    assert all(pd.api.types.is_string_dtype(dtype) for dtype in str_df.dtypes)
+    assert generate_cddb(50)["merged_values"].isna().all()
+
+
+def test_parquet_round_trip(tmp_path: Path) -> None:
+    pytest.importorskip("pyarrow")
+    source_df = generate_cddb(50)
+    tsv_path = tmp_path / "cddb.tsv"
+    parquet_path = tmp_path / "cddb.parquet"
+    source_df.to_csv(tsv_path, sep="\t", index=False, encoding="latin1")
+
+    assert formats.convert_tsv_to_parquet(str(tsv_path), str(parquet_path), 20) == 50
+
+    pd.testing.assert_frame_equal(formats.read_source(str(parquet_path)), source_df)
+    chunks = list(formats.read_source_chunks(str(parquet_path), 20))
+    pd.testing.assert_frame_equal(pd.concat(chunks), source_df)
+
+
+def test_write_parquet_chunk(tmp_path: Path) -> None:
+    pytest.importorskip("pyarrow")
+    df = pd.DataFrame(
+        {
+            "column": ["artist", "artist", "year"],
+            "failure_case": ["x", 1999, None],
+        },
+        index=[3, 5, 7],
+    )
+    dataset_dir = str(tmp_path / "failure_cases")
+
+    formats.write_parquet_chunk(df, dataset_dir, ["column"], part=0, index=True)
+    formats.write_parquet_chunk(df, dataset_dir, ["column"], part=1, append=True)
+
+    assert sorted(path.name for path in Path(dataset_dir).iterdir()) == [
+        "column=artist",
+        "column=year",
+    ]
+    written = pd.read_parquet(dataset_dir)
+    assert len(written) == 6
+    assert sorted(written["failure_case"].dropna().unique()) == ["1999", "x"]
+
+
+def test_require_pyarrow(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(formats, "pa", None)
+    with pytest.raises(ImportError, match="pyarrow"):
+        formats.read_source("cddb.parquet")
+
+
+@pytest.mark.parametrize("suffix", [".zip", ".gz", ".zst"])
+def test_read_compressed_source(tmp_path: Path, suffix: str) -> None:
+    if suffix == ".zst":
+        zstandard = pytest.importorskip("zstandard")
+    source_df = generate_cddb(50)
+    tsv_bytes = source_df.to_csv(sep="\t", index=False).encode("latin1")
+    path = tmp_path / f"cddb.tsv{suffix}"
+    if suffix == ".zip":
+        with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("cddb.tsv", tsv_bytes)
+            archive.writestr("__MACOSX/._cddb.tsv", b"\x00\x05\x16\x07")
+    elif suffix == ".gz":
+        path.write_bytes(gzip.compress(tsv_bytes))
+    else:
+        path.write_bytes(zstandard.ZstdCompressor().compress(tsv_bytes))
+
+    pd.testing.assert_frame_equal(formats.read_source(str(path)), source_df)
+    chunks = list(formats.read_source_chunks(str(path), 20))
+    pd.testing.assert_frame_equal(pd.concat(chunks), source_df)
+
+
+def test_zip_with_several_data_files(tmp_path: Path) -> None:
+    path = tmp_path / "cddb.tsv.zip"
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("a.tsv", "id\n1\n")
+        archive.writestr("b.tsv", "id\n2\n")
+
+    with pytest.raises(ValueError, match="Expected one data file"):
+        formats.read_source(str(path))
@@ -0,0 +1,63 @@
+import pandas as pd
+
+from clean_cddb.cleaning_transforms import clean_df_id_format
+from clean_cddb.id_index import (
+    REMAPPED,
+    SKIPPED_DUPLICATE_ID,
+    SKIPPED_EXISTING_ID,
+    IdIndex,
+    reformat_short_ids,
+)
+
+
+def test_reformat_short_ids() -> None:
+    ids = pd.Series(["100001", "1234", "01234", "250000", "REJECT_ROW", None])
+
+    assert reformat_short_ids(ids).to_dict() == {
+        1: "101234",
+        2: "101234",
+        3: "350000",
+    }
+
+
+def test_id_index_remap_reports_collisions() -> None:
+    ids = pd.Series(["100001", "1234", "01234", "5678", "105678", "42"])
+    index = IdIndex.from_ids(ids)
+
+    report = index.remap(ids)
+
+    assert report.to_dict(orient="index") == {
+        1: {
+            "original_id": "1234",
+            "formatted_id": "101234",
+            "status": SKIPPED_DUPLICATE_ID,
+        },
+        2: {
+            "original_id": "01234",
+            "formatted_id": "101234",
+            "status": SKIPPED_DUPLICATE_ID,
+        },
+        3: {
+            "original_id": "5678",
+            "formatted_id": "105678",
+            "status": SKIPPED_EXISTING_ID,
+        },
+        5: {"original_id": "42", "formatted_id": "100042", "status": REMAPPED},
+    }
+
+
+def test_id_index_built_in_chunks_detects_collisions_across_chunks() -> None:
+    index = IdIndex()
+    index.update(pd.Series(["1234", "100002"]))
+    index.update(pd.Series(["01234", "100042"], index=[2, 3]))
+
+    assert "100042" in index
+    assert len(index) == 4
+    # "1234" and "01234" were indexed in different chunks
+    assert clean_df_id_format(pd.DataFrame({"id": ["1234"]}), ids=index)[
+        "id"
+    ].tolist() == ["1234"]
+    # "42" would collide with "100042" from the other chunk
+    assert clean_df_id_format(pd.DataFrame({"id": ["42"]}), ids=index)[
+        "id"
+    ].tolist() == ["42"]
@@ -1,7 +1,56 @@
+import subprocess
+import sys
+
+
 def test_imports() -> None:
     """Attempt to import all the modules to test for ModuleNotFoundError."""
 
+    from clean_cddb import artist_index  # noqa
+    from clean_cddb import change_tracking  # noqa
     from clean_cddb import checks  # noqa
+    from clean_cddb import compact  # noqa
+    from clean_cddb import distinct_validation  # noqa
+    from clean_cddb import duplicates  # noqa
+    from clean_cddb import failure_store  # noqa
+    from clean_cddb import formats  # noqa
+    from clean_cddb import id_index  # noqa
+    from clean_cddb import incremental  # noqa
+    from clean_cddb import overlap  # noqa
+    from clean_cddb import parallel  # noqa
+    from clean_cddb import pipeline  # noqa
+    from clean_cddb import profiling  # noqa
+    from clean_cddb import repair_cache  # noqa
+    from clean_cddb import rules  # noqa
+    from clean_cddb import sampled_validation  # noqa
     from clean_cddb import cleaning_transforms  # noqa
     from clean_cddb import schema  # noqa
+    from clean_cddb import sqlite_export  # noqa
+    from clean_cddb import streaming  # noqa
+    from clean_cddb import synthetic  # noqa
+    from clean_cddb import tracks  # noqa
     from clean_cddb import utils  # noqa
+    from clean_cddb import value_cache  # noqa
+    from clean_cddb import vectorized_checks  # noqa
+
+
+def test_import_is_lazy() -> None:
+    """Importing the package or a value-level check doesn't load pandas."""
+    code = (
+        "import sys; import clean_cddb; from clean_cddb import checks; "
+        "checks.check_artist_is_valid('Various Artists'); "
+        "print(sorted({'ftfy', 'numpy', 'pandas', 'pandera'} & set(sys.modules)))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True, text=True
+    ).stdout
+    assert output.strip() == "[]"
+
+
+def test_lazy_attributes() -> None:
+    import clean_cddb
+
+    assert callable(clean_cddb.get_cleaning_steps)
+    assert clean_cddb.formats.source_format("cddb.parquet") == "parquet"
+    assert (
+        clean_cddb.schema.columns.keys() == clean_cddb.vectorized_schema.columns.keys()
+    )
@@ -0,0 +1,76 @@
+import sqlite3
+
+import pandas as pd
+
+from clean_cddb.id_index import IdIndex
+from clean_cddb.incremental import (
+    CHANGED,
+    DELETED,
+    NEW,
+    UNCHANGED,
+    delete_rows,
+    diff_row_hashes,
+    hash_rows,
+    insert_df,
+    load_row_hashes,
+    move_rows,
+    save_row_hashes,
+)
+
+
+def _hash(source_df: pd.DataFrame) -> pd.DataFrame:
+    return hash_rows(source_df, IdIndex.from_ids(source_df["id"]))
+
+
+def test_diff_row_hashes() -> None:
+    previous_df = pd.DataFrame(
+        {"artist": ["a", "b", "c"], "id": ["100001", "100002", "100003"]}
+    )
+    current_df = pd.DataFrame(
+        {"artist": ["d", "a", "B"], "id": ["100004", "100001", "100002"]}
+    )
+
+    delta = diff_row_hashes(_hash(current_df), _hash(previous_df))
+
+    assert delta["status"].to_dict() == {
+        "100001": UNCHANGED,
+        "100002": CHANGED,
+        "100003": DELETED,
+        "100004": NEW,
+    }
+    assert delta.loc["100001", ["row_index", "row_index_previous"]].tolist() == [1, 0]
+
+
+def test_hash_rows_covers_id_remapping() -> None:
+    source_df = pd.DataFrame({"artist": ["a"], "id": ["5"]})
+    with_target_df = pd.DataFrame({"artist": ["a", "b"], "id": ["5", "100005"]})
+
+    delta = diff_row_hashes(_hash(with_target_df), _hash(source_df))
+
+    # "5" is no longer reformatted to "100005", so its row must be cleaned again
+    assert delta.loc["5", "status"] == CHANGED
+
+
+def test_row_hashes_round_trip() -> None:
+    conn = sqlite3.connect(":memory:")
+    assert load_row_hashes(conn) is None
+
+    row_hashes = _hash(pd.DataFrame({"artist": ["a", "b"], "id": ["1", "2"]}))
+    save_row_hashes(conn, row_hashes)
+
+    pd.testing.assert_frame_equal(load_row_hashes(conn), row_hashes)
+
+
+def test_delete_move_and_insert_rows() -> None:
+    conn = sqlite3.connect(":memory:")
+    pd.DataFrame({"id": ["a", "b", "c"]}).to_sql("clean_df", conn)
+
+    delete_rows(conn, "clean_df", "index", [1])
+    move_rows(conn, "clean_df", "index", pd.Series([0, 1], index=[0, 2]))
+    insert_df(conn, "clean_df", pd.DataFrame({"id": ["d"]}, index=[2]))
+
+    assert conn.execute('SELECT "index", id FROM clean_df ORDER BY 1').fetchall() == [
+        (0, "a"),
+        (1, "c"),
+        (2, "d"),
+    ]
@@ -0,0 +1,86 @@
+import functools
+import threading
+import time
+from typing import Iterator, List
+
+import pytest
+
+from clean_cddb.overlap import BackgroundWriter, OverlapReport, prefetch
+
+
+def slow_items(n: int, seconds: float) -> Iterator[int]:
+    for item in range(n):
+        time.sleep(seconds)
+        yield item
+
+
+def test_prefetch_yields_items_in_order_and_reads_ahead() -> None:
+    report = OverlapReport()
+    items = []
+    start = time.perf_counter()
+    for item in prefetch(slow_items(5, 0.05), report=report):
+        time.sleep(0.05)
+        items.append(item)
+    elapsed = time.perf_counter() - start
+
+    assert items == [0, 1, 2, 3, 4]
+    # Serially this would take 0.5s
+    assert elapsed < 0.45
+    summary = report.summary().set_index("kind")
+    assert summary.loc["read", "tasks"] == 5
+    assert summary.loc["read", "waited_seconds"] < 0.2
+
+
+def test_prefetch_raises_errors_and_stops_early() -> None:
+    def failing() -> Iterator[int]:
+        yield 1
+        raise ValueError("bad chunk")
+
+    with pytest.raises(ValueError, match="bad chunk"):
+        list(prefetch(failing()))
+
+    items = prefetch(slow_items(100, 0.001), depth=2)
+    assert next(items) == 0
+    items.close()  # type: ignore[attr-defined]
+    assert not any(t.name == "prefetch read" for t in threading.enumerate())
+
+
+def test_background_writer_keeps_order_per_key() -> None:
+    written: List[str] = []
+
+    def write(value: str, seconds: float) -> None:
+        time.sleep(seconds)
+        written.append(value)
+
+    with BackgroundWriter(max_workers=4, max_pending=3) as writer:
+        for i in range(4):
+            # Earlier writes of a key take longer, but still come first
+            writer.submit("a", functools.partial(write, f"a{i}", 0.04 - 0.01 * i))
+        writer.submit("b", lambda: write("b0", 0))
+
+    assert [value for value in written if value.startswith("a")] == [
+        "a0",
+        "a1",
+        "a2",
+        "a3",
+    ]
+    assert "b0" in written
+    summary = writer.report.summary().set_index("kind")
+    assert summary.loc["write", "tasks"] == 5
+    assert summary.loc["total", "saved_seconds"] == pytest.approx(
+        summary.loc["total", "task_cpu_seconds"]
+        - summary.loc["total", "waited_seconds"]
+    )
+    # Sleeping uses no CPU time, so little time is counted as saved
+    low, high = writer.report.saved_seconds()
+    assert 0.0 <= low <= high < 0.05
+    elapsed = writer.report.elapsed_seconds
+    time.sleep(0.01)
+    assert writer.report.elapsed_seconds == elapsed
+
+
+def test_background_writer_raises_errors() -> None:
+    writer = BackgroundWriter()
+    writer.submit("a", lambda: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        writer.close()
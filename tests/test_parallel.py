@@ -0,0 +1,45 @@
+import pandas as pd
+
+from clean_cddb.cleaning_transforms import get_cleaning_steps
+from clean_cddb.parallel import run_steps, run_steps_parallel, split_frame
+
+
+def make_source_df() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "artist": ["Various Artists", "MÃ¶gel", "?? ??", "Björk", "Tool"],
+            "category": ["misc", "data", "rock", "folk", "rock"],
+            "genre": ["Pop", None, "Rock", "--", "Data"],
+            "title": ["Hits", "Live", None, "Post", "Lateralus"],
+            "tracks": ["A | B", "C", "D | E | ", "F", "G | H"],
+            "year": ["1999", None, "1890", "1995", "2001"],
+            "id": ["100001", "1234", "100003", "101234", "5678"],
+            "merged_values": [None] * 5,
+        },
+        dtype=object,
+    )
+
+
+def test_split_frame_keeps_rows_in_order() -> None:
+    df = make_source_df()
+
+    partitions = split_frame(df, 3)
+
+    assert len(partitions) == 3
+    pd.testing.assert_frame_equal(pd.concat(partitions), df)
+
+
+def test_split_frame_never_returns_empty_partitions() -> None:
+    assert len(split_frame(make_source_df(), 10)) == 5
+
+
+def test_run_steps_parallel_matches_serial() -> None:
+    df = make_source_df()
+    steps = get_cleaning_steps(ids=set(df["id"]))
+
+    serial_df, _timings = run_steps(df, steps)
+    parallel_df, report = run_steps_parallel(df, steps, workers=2, n_partitions=3)
+
+    pd.testing.assert_frame_equal(parallel_df, serial_df)
+    assert report["step"].tolist()[:-1] == [func.__name__ for func, _ in steps]
+    assert report["step"].iloc[-1] == "total (wall)"
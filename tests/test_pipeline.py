@@ -0,0 +1,109 @@
+import pandas as pd
+import pytest
+
+import clean_cddb
+from clean_cddb.id_index import IdIndex
+from clean_cddb.parallel import run_steps, run_steps_parallel
+from clean_cddb.pipeline import ComposedTransform, FusedStage, Pipeline, Stage
+from clean_cddb.synthetic import generate_cddb
+
+
+def upper(value: str) -> str:
+    return value.upper()
+
+
+def exclaim(value: str) -> str:
+    return value + "!"
+
+
+def upper_df(df: pd.DataFrame) -> pd.DataFrame:
+    return df.assign(a=df["a"].str.upper())
+
+
+def exclaim_df(df: pd.DataFrame) -> pd.DataFrame:
+    return df.assign(a=df["a"] + "!", b=df["b"] + "!")
+
+
+def drop_b_df(df: pd.DataFrame) -> pd.DataFrame:
+    return df[df["b"] != "y!"]
+
+
+def make_pipeline(fuse: bool = True) -> Pipeline:
+    return Pipeline(
+        [
+            Stage(upper_df, reads=["a"], writes=["a"], value_transforms={"a": upper}),
+            Stage(
+                exclaim_df,
+                reads=["a", "b"],
+                writes=["a", "b"],
+                value_transforms={"a": exclaim, "b": exclaim},
+            ),
+            Stage(drop_b_df, reads=["b"], rejects_rows=True),
+        ],
+        fuse=fuse,
+    )
+
+
+def test_plan_fuses_consecutive_column_local_stages() -> None:
+    plan = make_pipeline().plan()
+
+    assert [type(stage) for stage in plan] == [FusedStage, Stage]
+    assert plan[0].name == "upper_df + exclaim_df"
+    assert plan[0].changed_columns() == ["a", "b"]
+    assert len(make_pipeline(fuse=False).plan()) == 3
+
+
+def test_fused_pipeline_matches_unfused() -> None:
+    df = pd.DataFrame({"a": ["x", "x", "z"], "b": ["x", "y", "x"]})
+
+    fused_df = make_pipeline().run(df)
+
+    pd.testing.assert_frame_equal(fused_df, make_pipeline(fuse=False).run(df))
+    assert fused_df["a"].tolist() == ["X!", "Z!"]
+
+
+def test_composed_transform() -> None:
+    composed = ComposedTransform([upper, exclaim])
+
+    assert composed("a") == "A!"
+    assert composed == ComposedTransform([upper, exclaim])
+    assert hash(composed) == hash(ComposedTransform([upper, exclaim]))
+    assert composed != ComposedTransform([exclaim, upper])
+
+
+def test_stage_metadata() -> None:
+    with pytest.raises(ValueError):
+        Stage(upper_df, writes=["a", "b"], value_transforms={"a": upper})
+    stage = Stage(drop_b_df, {"reject_sentinel": True}, rejects_rows=True)
+    assert stage.changed_columns() is None
+    assert not stage.is_column_local
+
+
+@pytest.mark.parametrize("reject_sentinel", [False, True])
+def test_cleaning_pipeline_matches_cleaning_steps(reject_sentinel: bool) -> None:
+    source_df = generate_cddb(2000, mojibake_rate=0.05, dash_genre_rate=0.05)
+    ids = IdIndex().update(source_df["id"])
+    pipeline = clean_cddb.get_cleaning_pipeline(
+        ids=ids, reject_sentinel=reject_sentinel
+    )
+
+    expected_df, _timings = run_steps(
+        source_df,
+        clean_cddb.get_cleaning_steps(ids=ids, reject_sentinel=reject_sentinel),
+    )
+
+    assert any(isinstance(stage, FusedStage) for stage in pipeline.plan())
+    pd.testing.assert_frame_equal(pipeline.run(source_df), expected_df)
+    parallel_df, _report = run_steps_parallel(
+        source_df, pipeline.steps(), workers=2, n_partitions=3
+    )
+    pd.testing.assert_frame_equal(parallel_df, expected_df)
+
+
+def test_describe_cleaning_pipeline() -> None:
+    description = clean_cddb.get_cleaning_pipeline().describe().set_index("stage")
+
+    assert description.loc["clean_df_invalid_symbols", "rejects_rows"]
+    assert description.loc["clean_df_try_to_fix_encoding_errors", "runs_as"] == (
+        "clean_df_standardize_various_artists + clean_df_try_to_fix_encoding_errors"
+    )
@@ -0,0 +1,47 @@
+import json
+from pathlib import Path
+
+import pandas as pd
+
+from clean_cddb.cleaning_transforms import clean_df_year
+from clean_cddb.profiling import StageProfiler
+
+
+def test_stage_profiler_records_stages(tmp_path: Path) -> None:
+    profiler = StageProfiler(trace_memory=True, profile_dir=str(tmp_path / "prof"))
+    chunks = [pd.DataFrame({"year": ["1999", "abc"]})] * 2
+
+    for chunk in profiler.iterate("read", chunks):
+        chunk.pipe(profiler.wrap(clean_df_year))
+
+    records_df = profiler.records_df()
+    assert records_df["stage"].tolist() == ["read", "clean_df_year"] * 2
+    assert records_df["chunk"].tolist() == [0, 0, 1, 1]
+    assert records_df["rows"].tolist() == [2, 2, 2, 2]
+    assert records_df["peak_memory_bytes"].notna().all()
+    assert (tmp_path / "prof" / "clean_df_year_chunk1.prof").exists()
+
+    summary = profiler.summary().set_index("stage")
+    assert summary.loc["clean_df_year", "calls"] == 2
+    assert summary.loc["clean_df_year", "rows"] == 4
+
+
+def test_write_report(tmp_path: Path) -> None:
+    profiler = StageProfiler()
+    with profiler.stage("read", rows=10):
+        pass
+    profiler.add_record("clean_df_year (workers)", cpu_seconds=0.5)
+
+    json_path, csv_path = profiler.write_report(
+        str(tmp_path / "report"), metadata={"workers": 2}
+    )
+
+    report = json.loads(Path(json_path).read_text())
+    assert report["metadata"]["workers"] == 2
+    assert [stage["stage"] for stage in report["summary"]] == [
+        "read",
+        "clean_df_year (workers)",
+    ]
+    # Not measured, so reported as null rather than 0
+    assert report["summary"][1]["wall_seconds"] is None
+    assert len(pd.read_csv(csv_path)) == 2
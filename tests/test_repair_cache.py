@@ -0,0 +1,60 @@
+import pickle
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict
+
+import pandas as pd
+import pytest
+
+from clean_cddb.cleaning_transforms import clean_value_try_to_fix_encoding_errors
+from clean_cddb.repair_cache import RepairCache
+
+
+def test_repair_cache_matches_apply(tmp_path: Path) -> None:
+    series = pd.Series(
+        ["BeyoncÃ©", "Abba", None, "BeyoncÃ©", "漢字"], index=[4, 3, 2, 1, 0]
+    )
+    cache = RepairCache(str(tmp_path / "repairs.sqlite"))
+
+    pd.testing.assert_series_equal(
+        cache.apply(series, clean_value_try_to_fix_encoding_errors),
+        series.apply(clean_value_try_to_fix_encoding_errors),
+        check_dtype=False,
+    )
+    # Only the values failing the character check are cached
+    assert cache.get_many(["BeyoncÃ©", "漢字", "Abba"]) == {
+        "BeyoncÃ©": "Beyoncé",
+        "漢字": "漢字",
+    }
+
+
+def test_repair_cache_persists_across_instances(tmp_path: Path) -> None:
+    path = str(tmp_path / "repairs.sqlite")
+    series = pd.Series(["BeyoncÃ©", "Abba"])
+    RepairCache(path).apply(series, clean_value_try_to_fix_encoding_errors)
+
+    cache = pickle.loads(pickle.dumps(RepairCache(path)))
+    cache.apply(series, clean_value_try_to_fix_encoding_errors)
+    assert (cache.hits, cache.misses) == (1, 0)
+
+
+def test_repair_cache_is_cleared_on_version_change(tmp_path: Path) -> None:
+    path = str(tmp_path / "repairs.sqlite")
+    RepairCache(path, version="old").put_many({"BeyoncÃ©": "Beyoncé"})
+
+    assert len(RepairCache(path, version="old")) == 1
+    assert len(RepairCache(path)) == 0
+
+
+def test_failed_put_many_rolls_back(tmp_path: Path) -> None:
+    cache = RepairCache(str(tmp_path / "repairs.sqlite"))
+    cache.put_many({"BeyoncÃ©": "Beyoncé"})
+    # A list can't be bound as an SQL value, so the insert fails
+    unbindable: Dict[str, Any] = {"MotÃ¶rhead": "Motörhead", "Bad": ["a", "b"]}
+
+    with pytest.raises(sqlite3.Error):
+        cache.put_many(unbindable)
+
+    assert not cache.conn.in_transaction
+    cache.put_many({"MotÃ¶rhead": "Motörhead"})
+    assert len(cache) == 2
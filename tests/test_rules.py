@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from clean_cddb import rules
+from clean_cddb.utils import get_fired_rules
+
+
+@pytest.mark.parametrize(
+    "value",
+    ["Björn", "BjÃ¶rn", "back\\slash", "^", "中文", "ひらがな", "カタカナ", "�"],
+)
+def test_invalid_characters_is_symbols_or_cjk(value: str) -> None:
+    assert rules.INVALID_CHARACTERS.fires(value) == (
+        rules.INVALID_SYMBOL.fires(value) or rules.CJK_CHARACTER.fires(value)
+    )
+
+
+def test_rules_are_registered() -> None:
+    for rule_names in rules.CHECK_RULES.values():
+        for rule_name in rule_names:
+            assert rules.RULES[rule_name].name == rule_name
+    assert not rules.VARIOUS_ARTIST.fires(np.nan)
+
+
+@pytest.mark.parametrize(
+    "check_name,value,expected",
+    [
+        ("check_artist_is_valid", "Various Artists", "various_artist"),
+        ("check_artist_is_valid", "?? ??", "question_marks"),
+        ("check_col_has_valid_characters", "BjÃ¶rn", "invalid_symbol"),
+        ("check_col_has_valid_characters", "ひらがな", "cjk_character"),
+        ("check_col_has_valid_characters", np.nan, None),
+        ("check_genre_is_valid", "Rock--Pop", "double_dash"),
+        ("check_year_is_numeric", "19xx", None),
+    ],
+)
+def test_fired_rule(check_name: str, value: str, expected: str) -> None:
+    assert rules.fired_rule(check_name, value) == expected
+
+
+def test_get_fired_rules() -> None:
+    failure_cases_df = pd.DataFrame(
+        {
+            "check": ["Check for invalid artist values.", "not_nullable"],
+            "failure_case": ["VA / Various", None],
+        }
+    )
+
+    fired_rules = get_fired_rules(failure_cases_df)["rule"]
+
+    assert fired_rules[0] == "various_artist"
+    assert pd.isna(fired_rules[1])
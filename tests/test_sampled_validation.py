@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pandera as pa
+
+import clean_cddb
+from clean_cddb.sampled_validation import (
+    crossed_thresholds,
+    estimate_failures,
+    stratified_sample,
+    wilson_interval,
+)
+from clean_cddb.synthetic import generate_cddb
+
+
+def test_stratified_sample_keeps_strata_proportions() -> None:
+    df = pd.DataFrame({"category": ["rock"] * 900 + ["jazz"] * 100, "x": range(1000)})
+
+    sample_df = stratified_sample(df, sample_size=100, seed=1)
+
+    assert sample_df["category"].value_counts().to_dict() == {"rock": 90, "jazz": 10}
+    assert sample_df.index.is_monotonic_increasing
+    assert stratified_sample(df, sample_size=1000) is df
+
+
+def test_wilson_interval() -> None:
+    low, high = wilson_interval([0, 50], 100)
+
+    assert low[0] == 0 and 0 < high[0] < 0.05
+    assert low[1] < 0.5 < high[1]
+    # A sample of the whole population has no uncertainty
+    low, high = wilson_interval([50], 100, population=100)
+    np.testing.assert_allclose([low[0], high[0]], [0.5, 0.5])
+
+
+def test_estimate_failures_covers_full_counts() -> None:
+    df = generate_cddb(5000, mojibake_rate=0.05, dash_genre_rate=0.05)
+    try:
+        clean_cddb.schema(df, lazy=True)
+    except pa.errors.SchemaErrors as err:
+        failure_cases = err.failure_cases
+    full_counts = (
+        failure_cases[failure_cases["index"].notna()]
+        .groupby(["column", "check"])["index"]
+        .nunique()
+    )
+
+    estimates = estimate_failures(df, sample_size=2000, seed=3)
+    element = estimates.dropna(subset=["failure_rate"]).set_index(["column", "check"])
+
+    common = element.index.intersection(full_counts.index)
+    assert len(common) >= 0.8 * len(full_counts)
+    covered = (element.loc[common, "estimated_low"] <= full_counts[common]) & (
+        full_counts[common] <= element.loc[common, "estimated_high"]
+    )
+    assert covered.mean() >= 0.8
+
+
+def test_estimate_failures_of_whole_frame_is_exact() -> None:
+    df = generate_cddb(300)
+
+    estimates = estimate_failures(df, sample_size=1000).dropna(subset=["failure_rate"])
+
+    assert (estimates["estimated_low"] == estimates["sample_failures"]).all()
+    assert (estimates["estimated_high"] == estimates["sample_failures"]).all()
+
+
+def test_crossed_thresholds() -> None:
+    estimates = pd.DataFrame(
+        {
+            "column": ["artist", "genre", "title"],
+            "check": ["a", "b", "dtype('object')"],
+            "failure_rate": [0.02, 0.3, np.nan],
+        }
+    )
+
+    assert crossed_thresholds(estimates, 0.01)["column"].tolist() == [
+        "artist",
+        "genre",
+    ]
+    assert crossed_thresholds(estimates, 0.01, {"genre": 0.5})["column"].tolist() == [
+        "artist"
+    ]
+    assert crossed_thresholds(estimates, 0.5).empty
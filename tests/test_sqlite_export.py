@@ -0,0 +1,82 @@
+import sqlite3
+from typing import Any, List, Tuple
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from clean_cddb.sqlite_export import (
+    EXPORT_LOG_TABLE,
+    connect,
+    create_indexes,
+    export_tables,
+    write_table,
+)
+
+
+def _table_info(conn: sqlite3.Connection, table: str) -> List[Tuple[Any, ...]]:
+    return [row[1:3] for row in conn.execute(f'PRAGMA table_info("{table}")')]
+
+
+def test_write_table_matches_to_sql() -> None:
+    df = pd.DataFrame(
+        {
+            "artist": ["a", None, "c"],
+            "year": pd.array([1999, None, 2001], dtype="Int32"),
+            "score": [1.5, np.nan, 3.0],
+            "index": [7, 8, 9],
+            "mixed": [1, "", 3],
+        },
+        index=[3, 5, 8],
+    )
+    conn = sqlite3.connect(":memory:")
+    df.to_sql("expected", conn, index=True)
+    write_table(conn, "actual", df, batch_size=2)
+
+    assert _table_info(conn, "actual") == _table_info(conn, "expected")
+    pd.testing.assert_frame_equal(
+        pd.read_sql("SELECT * FROM actual", conn),
+        pd.read_sql("SELECT * FROM expected", conn),
+    )
+
+
+def test_export_tables(tmp_path: Path) -> None:
+    conn = connect(str(tmp_path / "cddb.db"))
+    first = pd.DataFrame({"id": ["100001", "100002"]})
+    second = pd.DataFrame({"id": ["100003"]}, index=[2])
+
+    export_tables(conn, {"clean_df": first, "track_level_df": first})
+    export_log = export_tables(conn, {"clean_df": second}, append=True, chunk=1)
+    create_indexes(conn, [("clean_df", "id")])
+
+    assert export_log[["table_name", "chunk", "rows"]].values.tolist() == [
+        ["clean_df", 1, 1]
+    ]
+    assert pd.read_sql("SELECT * FROM clean_df", conn)["index"].tolist() == [0, 1, 2]
+    assert pd.read_sql(f"SELECT rows FROM {EXPORT_LOG_TABLE}", conn)[
+        "rows"
+    ].tolist() == [2, 2, 1]
+    assert conn.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+    plan = conn.execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM clean_df WHERE id = '100001'"
+    ).fetchall()
+    assert "ix_clean_df_id" in str(plan)
+
+
+def test_failed_export_keeps_previous_tables(tmp_path: Path) -> None:
+    conn = connect(str(tmp_path / "cddb.db"))
+    first = pd.DataFrame({"id": ["100001", "100002"]})
+    export_tables(conn, {"clean_df": first, "track_level_df": first})
+    # A list can't be bound as an SQL value, so its insert fails
+    unbindable = pd.DataFrame({"id": ["100003", ["not", "a", "value"]]})
+
+    with pytest.raises(sqlite3.Error):
+        export_tables(conn, {"track_level_df": first.head(1), "clean_df": unbindable})
+
+    assert not conn.in_transaction
+    for table in ["clean_df", "track_level_df"]:
+        pd.testing.assert_frame_equal(
+            pd.read_sql(f"SELECT id FROM {table}", conn), first
+        )
+    assert len(pd.read_sql(f"SELECT * FROM {EXPORT_LOG_TABLE}", conn)) == 2
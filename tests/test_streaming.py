@@ -0,0 +1,125 @@
+import sqlite3
+from pathlib import Path
+from typing import Set, Tuple
+
+import pandas as pd
+
+import clean_cddb
+from clean_cddb.distinct_validation import distinct_failure_cases
+from clean_cddb.streaming import (
+    ColumnFailureCases,
+    collect_ids,
+    dedupe_column_failure_cases,
+    read_source_chunks,
+    write_df_chunk,
+)
+
+
+def write_tsv(path: Path) -> str:
+    pd.DataFrame(
+        {
+            "artist": ["A", "B", "C", "D", "E"],
+            "id": ["100001", "1234", "100003", "101234", "100005"],
+        }
+    ).to_csv(path, sep="\t", index=False, encoding="latin1")
+    return str(path)
+
+
+def test_read_source_chunks_keeps_global_index(tmp_path: Path) -> None:
+    filepath = write_tsv(tmp_path / "cddb.tsv")
+
+    chunks = list(read_source_chunks(filepath, chunksize=2))
+
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert pd.concat(chunks).index.tolist() == [0, 1, 2, 3, 4]
+
+
+def test_collect_ids(tmp_path: Path) -> None:
+    filepath = write_tsv(tmp_path / "cddb.tsv")
+
+    assert collect_ids(filepath, chunksize=2).ids == {
+        "100001",
+        "1234",
+        "100003",
+        "101234",
+        "100005",
+    }
+
+
+def test_write_df_chunk_appends(tmp_path: Path) -> None:
+    conn = sqlite3.connect(tmp_path / "cddb.db")
+    first = pd.DataFrame({"id": ["100001"]}, index=[0])
+    second = pd.DataFrame({"id": ["100002"]}, index=[1])
+
+    write_df_chunk(first, "clean_df", conn, str(tmp_path), append=False)
+    write_df_chunk(second, "clean_df", conn, str(tmp_path), append=True)
+
+    assert pd.read_csv(tmp_path / "clean_df.csv", dtype="str")["id"].tolist() == [
+        "100001",
+        "100002",
+    ]
+    assert pd.read_sql("select * from clean_df", conn)["index"].tolist() == [0, 1]
+
+
+def test_dedupe_column_failure_cases() -> None:
+    seen: Set[Tuple[str, str, str]] = set()
+    failure_cases_df = pd.DataFrame(
+        {
+            "column": ["year", "year"],
+            "check": ["dtype('Int32')", "Check if year is numeric."],
+            "failure_case": ["object", "abc"],
+            "index": [None, 3],
+        }
+    )
+
+    first = dedupe_column_failure_cases(failure_cases_df, seen)
+    second = dedupe_column_failure_cases(failure_cases_df, seen)
+
+    assert len(first) == 2
+    assert second["check"].tolist() == ["Check if year is numeric."]
+
+
+def test_chunked_failure_cases_match_whole_frame() -> None:
+    source_df = clean_cddb.synthetic.generate_cddb(300, seed=2)
+    # Every year of the first chunk coerces; the last chunk has "abc"
+    source_df["year"] = ["1999"] * 299 + ["abc"]
+    failure_cases = ColumnFailureCases()
+
+    chunks = [
+        failure_cases.update(
+            distinct_failure_cases(
+                source_df.iloc[start : start + 100], clean_cddb.schema
+            )
+        )
+        for start in range(0, len(source_df), 100)
+    ]
+    chunked = pd.concat([*chunks, failure_cases.remaining()])
+    whole = distinct_failure_cases(source_df, clean_cddb.schema)
+
+    def summary(failure_cases_df: pd.DataFrame) -> pd.Series:
+        return failure_cases_df.groupby(["column", "check"]).size().sort_index()
+
+    pd.testing.assert_series_equal(summary(chunked), summary(whole))
+    year_dtype = whole[
+        (whole["column"] == "year") & whole["check"].str.startswith("dtype")
+    ]
+    assert year_dtype["failure_case"].tolist() == ["abc"]
+
+
+def test_column_failure_cases_carry_over_earlier_failure_cases() -> None:
+    source_df = clean_cddb.synthetic.generate_cddb(100, seed=2)
+    # Every year of the changed rows coerces; an unchanged row has "abc"
+    source_df["year"] = "1999"
+
+    failure_cases = ColumnFailureCases(element_level_dtype_columns=["year"])
+    reported = pd.concat(
+        [
+            failure_cases.update(distinct_failure_cases(source_df, clean_cddb.schema)),
+            failure_cases.remaining(),
+        ]
+    )
+
+    is_year_dtype = (reported["column"] == "year") & reported["check"].str.startswith(
+        "dtype"
+    )
+    assert not is_year_dtype.any()
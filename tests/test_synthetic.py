@@ -0,0 +1,50 @@
+import io
+from typing import Any, Dict
+
+import pandas as pd
+import pytest
+
+from clean_cddb import vectorized_checks
+from clean_cddb.synthetic import COLUMNS, generate_cddb
+
+
+def test_generate_cddb_shape_and_round_trip() -> None:
+    source_df = generate_cddb(1000)
+
+    assert source_df.columns.tolist() == COLUMNS
+    assert len(source_df) == 1000
+    pd.testing.assert_frame_equal(generate_cddb(1000), source_df)
+
+    # Reads back like cddb.tsv
+    buffer = io.BytesIO()
+    source_df.to_csv(buffer, sep="\t", index=False, encoding="latin1")
+    buffer.seek(0)
+    pd.testing.assert_frame_equal(
+        pd.read_csv(buffer, sep="\t", dtype="str", encoding="latin1"), source_df
+    )
+
+
+@pytest.mark.parametrize(
+    "rate_name, column_name, check_name",
+    [
+        ("mojibake_rate", "artist", "check_col_has_valid_characters"),
+        ("various_rate", "artist", "check_artist_is_valid"),
+        ("invalid_category_rate", "category", "check_category_is_valid"),
+        ("dash_genre_rate", "genre", "check_genre_is_valid"),
+        ("invalid_year_rate", "year", "check_year_range_is_valid"),
+        ("short_id_rate", "id", "check_id_six_digit_starting_one"),
+    ],
+)
+def test_generate_cddb_rates(rate_name: str, column_name: str, check_name: str) -> None:
+    check = getattr(vectorized_checks, check_name)
+
+    clean_rates: Dict[str, Any] = {rate_name: 0.0}
+    dirty_rates: Dict[str, Any] = {rate_name: 0.5}
+    clean_df = generate_cddb(5000, **clean_rates)
+    dirty_df = generate_cddb(5000, **dirty_rates)
+
+    def failure_rate(df: pd.DataFrame) -> float:
+        values = df[column_name].dropna()
+        return float((~check(values)).sum() / len(df))
+
+    assert failure_rate(dirty_df) > failure_rate(clean_df) + 0.1
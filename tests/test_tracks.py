@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+from clean_cddb.tracks import AlbumTracks, to_track_level
+
+
+def albums() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "id": ["100001", "100002", "100003", "100004"],
+            "tracks": ["Intro | Song |  ", None, "", " One|Two"],
+        },
+        index=[10, 11, 12, 13],
+    )
+
+
+def test_to_track_level() -> None:
+    track_level_df = to_track_level(albums(), track_id_offset=5)
+
+    pd.testing.assert_frame_equal(
+        track_level_df,
+        pd.DataFrame(
+            {
+                "track_id": [5, 6, 7, 8, 9],
+                "album_row_id": ["100001", "100001", "100002", "100004", "100004"],
+                "track_position": [1, 2, 1, 1, 2],
+                "track_name": pd.Series(
+                    ["Intro", "Song", np.nan, "One", "Two"], dtype="str"
+                ),
+            }
+        ),
+        check_dtype=False,
+    )
+    assert track_level_df["track_name"].dtype == "str"
+
+
+def test_to_track_level_matches_explode() -> None:
+    df = albums()
+    expected = df["tracks"].str.split("|").explode().str.strip()
+    expected = expected[expected != ""]
+
+    track_level_df = to_track_level(df)
+
+    assert track_level_df["track_name"].tolist() == pd.Series(expected).tolist()
+    assert (
+        track_level_df["album_row_id"].tolist() == df.loc[expected.index, "id"].tolist()
+    )
+
+
+def test_album_tracks_offsets() -> None:
+    album_tracks = AlbumTracks.from_albums(albums())
+
+    assert album_tracks.n_albums == 4
+    assert len(album_tracks) == 5
+    assert album_tracks.offsets.tolist() == [0, 2, 3, 3, 5]
+    assert album_tracks.counts().tolist() == [2, 1, 0, 2]
+    assert album_tracks.tracks_of(3).tolist() == ["One", "Two"]
+    assert album_tracks.tracks_of(2).tolist() == []
+
+
+def test_album_tracks_without_albums() -> None:
+    album_tracks = AlbumTracks.from_albums(albums().iloc[:0])
+
+    assert len(album_tracks) == 0
+    assert len(album_tracks.to_frame()) == 0
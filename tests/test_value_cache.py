@@ -0,0 +1,76 @@
+import gc
+import weakref
+
+import pandas as pd
+
+from clean_cddb.artist_index import ArtistIndex
+from clean_cddb.cleaning_transforms import (
+    clean_value_invalid_categories,
+    clean_value_standardize_various_artist,
+    clean_value_year,
+)
+from clean_cddb.pipeline import ComposedTransform
+from clean_cddb.value_cache import (
+    DEFAULT_VALUE_CACHE_SIZE,
+    apply_value_transform,
+    set_value_cache_size,
+    value_cache_info,
+)
+
+
+def test_apply_value_transform_matches_apply() -> None:
+    series = pd.Series(["rock", "data", None, "rock", "data"], index=[5, 4, 3, 2, 1])
+
+    pd.testing.assert_series_equal(
+        apply_value_transform(series, clean_value_invalid_categories, cache=False),
+        series.apply(clean_value_invalid_categories),
+    )
+
+
+def test_apply_value_transform_caches_across_calls() -> None:
+    set_value_cache_size(2)
+    series = pd.Series(["1999", "1999", "2001", "abc"])
+
+    apply_value_transform(series, clean_value_year)
+    apply_value_transform(series.tail(2), clean_value_year)
+
+    cache_info = value_cache_info().set_index("transform").loc["clean_value_year"]
+    assert cache_info["misses"] == 3
+    assert cache_info["hits"] == 2
+    assert cache_info["currsize"] == 2
+    set_value_cache_size(DEFAULT_VALUE_CACHE_SIZE)
+
+
+def test_apply_value_transform_to_categories() -> None:
+    series = pd.Series(["rock", "data", None, "rock", "jazz"], index=[5, 4, 3, 2, 1])
+
+    transformed = apply_value_transform(
+        series.astype("category"), clean_value_invalid_categories, cache=False
+    )
+
+    assert isinstance(transformed.dtype, pd.CategoricalDtype)
+    # "data" and the missing value both map to "N/A"
+    assert sorted(transformed.cat.categories) == ["N/A", "jazz", "rock"]
+    pd.testing.assert_series_equal(
+        transformed.astype(object),
+        series.apply(clean_value_invalid_categories).astype(object),
+    )
+
+
+def test_bound_methods_are_not_cached() -> None:
+    series = pd.Series(["Bjork", "BJORK", "Bjork"])
+    index = ArtistIndex.from_artists(series)
+    composed = ComposedTransform(
+        [clean_value_standardize_various_artist, index.canonicalize]
+    )
+
+    apply_value_transform(series, index.canonicalize)
+    apply_value_transform(series, composed)
+
+    assert not {"canonicalize", composed.__name__} & set(
+        value_cache_info()["transform"]
+    )
+    reference = weakref.ref(index)
+    del index, composed
+    gc.collect()
+    assert reference() is None
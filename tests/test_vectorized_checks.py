@@ -0,0 +1,114 @@
+from typing import Any, List
+
+import numpy as np
+import pandas as pd
+import pandera as pa
+import pytest
+
+from clean_cddb import checks, vectorized_checks
+from clean_cddb.schema import schema, vectorized_schema
+
+VALUES: List[Any] = [
+    "Various",
+    "Various Artists",
+    "VaRiOuS aRtIsT",
+    "var.",
+    "Varé",
+    "?? ??",
+    "back\\slash",
+    "中文",
+    "BjÃ¶rn",
+    "Rock--Pop",
+    "rock",
+    "N/A",
+    "1999",
+    " 1999 ",
+    "1_999",
+    "-5",
+    "1999.0",
+    "１９９９",
+    "",
+    np.nan,
+    None,
+    12,
+    1999.5,
+]
+
+
+@pytest.mark.parametrize(
+    "check_name",
+    [
+        "check_col_has_valid_characters",
+        "check_artist_is_valid",
+        "check_category_is_valid",
+        "check_genre_is_valid",
+        "check_year_range_is_valid",
+        "check_year_is_numeric",
+    ],
+)
+@pytest.mark.parametrize("dtype", [object, "string"])
+def test_vectorized_check_matches_element_wise(check_name: str, dtype: Any) -> None:
+    values = VALUES if dtype is object else [v for v in VALUES if isinstance(v, str)]
+    series = pd.Series(values, dtype=dtype)
+    element_wise_check = getattr(checks, check_name)
+    vectorized_check = getattr(vectorized_checks, check_name)
+
+    expected = [element_wise_check(value) for value in series]
+    assert vectorized_check(series).tolist() == expected
+
+
+@pytest.mark.parametrize(
+    "check_name",
+    [
+        "check_artist_is_valid",
+        "check_genre_is_valid",
+        "check_year_range_is_valid",
+        "check_year_is_numeric",
+    ],
+)
+@pytest.mark.parametrize("dtype", [object, "str"])
+def test_vectorized_check_on_repeated_values(check_name: str, dtype: Any) -> None:
+    # Checked once per distinct value, then spread back to every row
+    strings = [value for value in VALUES if isinstance(value, str)]
+    series = pd.Series(strings * 3 + [None] + strings[::-1], dtype=dtype)
+    element_wise_check = getattr(checks, check_name)
+    vectorized_check = getattr(vectorized_checks, check_name)
+
+    result = vectorized_check(series)
+    assert result.index.equals(series.index)
+    assert result.tolist() == [element_wise_check(value) for value in series]
+
+
+def test_vectorized_year_checks_on_nullable_integers() -> None:
+    series = pd.Series([1999, 1950, 2029, -1, None], dtype="Int32")
+    valid_series = series.dropna()
+
+    assert vectorized_checks.check_year_range_is_valid(valid_series).tolist() == [
+        checks.check_year_range_is_valid(value) for value in valid_series
+    ]
+    assert vectorized_checks.check_year_is_numeric(valid_series).tolist() == [
+        checks.check_year_is_numeric(value) for value in valid_series
+    ]
+
+
+def test_vectorized_schema_failure_cases_match_element_wise() -> None:
+    df = pd.DataFrame(
+        {
+            "artist": ["Various Artists", "Björk", "BjÃ¶rk", None],
+            "category": ["rock", "data", "misc", "folk"],
+            "genre": ["Rock", "--", None, "Folk"],
+            "title": ["Greatest Hits", "中文", None, "Live"],
+            "year": ["1999", "1890", "abc", None],
+            "id": ["100001", "1234", "100003", "100004"],
+        },
+        dtype=object,
+    )
+
+    with pytest.raises(pa.errors.SchemaErrors) as element_wise_err:
+        schema(df, lazy=True)
+    with pytest.raises(pa.errors.SchemaErrors) as vectorized_err:
+        vectorized_schema(df, lazy=True)
+
+    pd.testing.assert_frame_equal(
+        element_wise_err.value.failure_cases, vectorized_err.value.failure_cases
+    )